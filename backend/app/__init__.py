@@ -3,16 +3,33 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager 
 from config import Config
+from app.routing_session import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession}) # reads can be routed to replicas
 jwt = JWTManager() 
 
 def create_app():
     app = Flask(__name__)
     jwt.init_app(app)
     app.config.from_object(Config)
-    
+
+    from app.json_provider import configure_json
+    configure_json(app)
+
+    from app.services.replicas import configure_replicas
+    configure_replicas(app) # SQLALCHEMY_REPLICA_URIS -> replica binds
+
+    from app.services.engine import configure_engine, install_sqlite_pragmas
+    configure_engine(app) # pool settings per APP_ENV
     db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(app, db.engines.values())
+        from app.services.instrumentation import init_instrumentation
+        init_instrumentation(app, dict(db.engines)) # per-request timing, SQL counts, /metrics
+        if app.config.get('SCHEMA_CHECK_ON_STARTUP', True):
+            from app.services.schema import ensure_columns, ensure_indexes
+            ensure_columns() # e.g. product.updated_at on databases created before it
+            ensure_indexes() # e.g. the unique cart item index the cart upserts rely on
     CORS(app)
 
     from app.routes.auth import auth_bp
@@ -27,11 +44,28 @@ def create_app():
     from app.routes.cart import cart_bp
     app.register_blueprint(cart_bp, url_prefix='/api')
 
-    app.jwt_blacklist = set()
+    from app.routes.internal import internal_bp, metrics_bp
+    app.register_blueprint(internal_bp, url_prefix='/internal')
+    app.register_blueprint(metrics_bp)
+
+    from app.services.chat_sessions import create_session_store
+    app.chatbot_sessions = create_session_store(app.config)
+
+    from app.services.response_cache import create_response_cache
+    app.response_cache = create_response_cache(app.config)
+
+    from app.services.catalog_events import sync_version
+    app.before_request(sync_version) # catalog writes made by other processes drop the caches here too
+
+    from app.services.password_hashing import create_password_hashing_service
+    app.password_hasher = create_password_hashing_service(app.config)
+
+    from app.services.token_revocation import create_revocation_store
+    app.token_revocations = create_revocation_store(app.config)
 
     @jwt.token_in_blocklist_loader
     def check_if_token_in_blocklist(jwt_header, jwt_payload):
         jti = jwt_payload["jti"]
-        return jti in app.jwt_blacklist
+        return app.token_revocations.is_revoked(jti)
 
     return app
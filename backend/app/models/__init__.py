@@ -3,4 +3,10 @@ from .product import Product
 
 from .users import User
 
-from .cart import Cart
\ No newline at end of file
+from .cart import Cart
+
+from .revoked_token import RevokedToken
+
+from .recommendation import ProductRecommendation
+
+from .catalog_version import CatalogVersion
@@ -44,6 +44,11 @@ class CartItem(db.Model):
    
     product = db.relationship('Product', lazy=True) # Eager load product details when retrieving cart items
 
+    __table_args__ = (
+        # One row per product per cart; target of the ON CONFLICT upserts in cart_repository
+        db.Index('uq_cart_item_cart_product', 'cart_id', 'product_id', unique=True),
+    )
+
     def to_dict(self):
         """Converts the cart item object to a dictionary, including product details."""
         product_data = self.product.to_dict() if self.product else None
@@ -57,7 +62,7 @@ class CartItem(db.Model):
                 'id': product_data.get('id'),
                 'name': product_data.get('name'),
                 'image_url': product_data.get('image_url'),
-                'discounted_price': product_data.get('discounted_price')
+                'discounted_price': product_data.get('price')
             } if product_data else None
         }
 
@@ -0,0 +1,15 @@
+# app/models/catalog_version.py
+
+from app import db
+
+class CatalogVersion(db.Model):
+    """
+    A single-row counter bumped by every transaction that writes products (ORM
+    commits and seed_data.py's bulk loads), so each process can notice catalog
+    changes made by other processes and drop its in-memory caches.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False)
+
+    def __repr__(self):
+        return f'<CatalogVersion {self.version}>'
@@ -0,0 +1,24 @@
+# app/models/recommendation.py
+
+from app import db
+
+class ProductRecommendation(db.Model):
+    """
+    One precomputed recommendation: the `rank`-th product of kind `kind`
+    ('similar' or 'bought_together') for `product_id`. Written by
+    app/services/recommendations.py; a product's list is a primary key range
+    read, however large the catalog.
+    """
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id', ondelete='CASCADE'), primary_key=True)
+    kind = db.Column(db.String(16), primary_key=True)
+    rank = db.Column(db.SmallInteger, primary_key=True)
+    recommended_id = db.Column(db.Integer, db.ForeignKey('product.id', ondelete='CASCADE'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        # Dropping a product's rows from every other product's lists
+        db.Index('ix_product_recommendation_recommended_id', 'recommended_id'),
+    )
+
+    def __repr__(self):
+        return f'<ProductRecommendation {self.kind} #{self.rank} for {self.product_id}: {self.recommended_id}>'
@@ -0,0 +1,25 @@
+# app/models/revoked_token.py
+
+from app import db
+from datetime import datetime
+
+class RevokedToken(db.Model):
+    """
+    A JWT revoked by logout. Rows are only needed until the token would have
+    expired anyway; expired rows are purged by the revocation store.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    token_type = db.Column(db.String(10), nullable=False)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime) # NULL for tokens that never expire
+
+    __table_args__ = (
+        # Periodic purge: DELETE ... WHERE expires_at < now
+        db.Index('ix_revoked_token_expires_at', 'expires_at'),
+        # Incremental sync of the per-worker bloom filters
+        db.Index('ix_revoked_token_revoked_at', 'revoked_at'),
+    )
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
@@ -1,7 +1,7 @@
 
 from app import db 
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -13,12 +13,18 @@ class User(db.Model):
  
 
     def set_password(self, password):
-      
-        self.password_hash = generate_password_hash(password)
+        # Hashed on the app's process pool with the configured algorithm and cost
+        self.password_hash = current_app.password_hasher.hash(password)
 
     def check_password(self, password):
-        
-        return check_password_hash(self.password_hash, password)
+        """
+        Verifies the password. A hash made with outdated parameters is replaced
+        in place; the caller commits it.
+        """
+        matches, new_hash = current_app.password_hasher.verify(self.password_hash, password)
+        if new_hash:
+            self.password_hash = new_hash
+        return matches
 
     def to_dict(self, include_email=False):
         """
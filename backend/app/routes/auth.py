@@ -3,6 +3,7 @@
 from flask import Blueprint, request, jsonify, make_response, current_app
 from app import db # Import your SQLAlchemy instance
 from app.models.users import User # Import your User model
+from app.services.password_hashing import HashingBusy
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
@@ -11,11 +12,23 @@ from flask_jwt_extended import (
     set_access_cookies,
     set_refresh_cookies,
     unset_jwt_cookies, # For logging out
-    get_jwt # To get the unique ID (jti) of the token for blacklisting
+    get_jwt # To get the unique ID (jti) of the token for revocation
 )
 
+def _revoke_current_token():
+    """Revokes the token of the current request until its own expiry."""
+    token = get_jwt()
+    current_app.token_revocations.revoke(token["jti"], token["type"], token.get("exp"))
+
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(HashingBusy)
+def hashing_busy(error):
+    # Backpressure from the password hashing pool: ask the client to retry
+    response = jsonify({"message": str(error)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 # User registration logic remains the same
 @auth_bp.route('/register', methods=['POST'])
 def register_user():
@@ -50,6 +63,8 @@ def login_user():
     user = User.query.filter_by(email=email).first()
 
     if user and user.check_password(password):
+        if db.session.is_modified(user):
+            db.session.commit() # password was rehashed with the current parameters
         # Create the tokens
         access_token = create_access_token(identity=user.id)
         refresh_token = create_refresh_token(identity=user.id)
@@ -91,10 +106,8 @@ def refresh_access_token():
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required() # Requires a valid access token to perform logout
 def logout_user():
-    # Get the unique identifier of the access token being used
-    jti = get_jwt()["jti"] # 'jti' is the JWT ID claim
-    # Add the JTI to your blacklist.
-    current_app.jwt_blacklist.add(jti) # Using app.jwt_blacklist set for demonstration
+    # Revoke the access token being used (by its 'jti', the JWT ID claim)
+    _revoke_current_token()
 
     response = jsonify({"message": "Successfully logged out (access token revoked)"})
     unset_jwt_cookies(response) # Clear both access and refresh cookies (if they were set by Flask-JWT-Extended)
@@ -104,8 +117,7 @@ def logout_user():
 @auth_bp.route('/logout_refresh', methods=['POST'])
 @jwt_required(refresh=True) # CHANGED: Use jwt_required with refresh=True
 def logout_refresh_token():
-    jti = get_jwt()["jti"]
-    current_app.jwt_blacklist.add(jti) # Blacklist the refresh token's jti
+    _revoke_current_token() # Revoke the refresh token's jti
 
     response = jsonify({"message": "Refresh token successfully revoked"})
     unset_jwt_cookies(response)
@@ -122,4 +134,10 @@ def protected_route():
             message=f"Hello, {user.username}! You accessed a protected route.",
             user_id=current_user_id
         ), 200
-    return jsonify({"message": "User not found."}), 404
\ No newline at end of file
+    return jsonify({"message": "User not found."}), 404
+
+# Password hashing pool metrics (queue depth, rejections, mean hash time)
+@auth_bp.route('/hashing/stats', methods=['GET'])
+@jwt_required()
+def hashing_stats():
+    return jsonify(current_app.password_hasher.stats()), 200
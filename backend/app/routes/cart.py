@@ -3,20 +3,14 @@
 from flask import Blueprint, request, jsonify
 from app import db
 from app.models.product import Product # Needed to check if product exists
-from app.models.cart import Cart, CartItem # New models
+from app.models.cart import CartItem
+from app.services.cart_repository import (
+    apply_batch, clear_cart_items, get_or_create_cart_id, load_cart, set_item_quantity, upsert_items
+)
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 cart_bp = Blueprint('cart', __name__)
 
-def _get_or_create_user_cart(user_id):
-    """Helper function to get a user's cart or create one if it doesn't exist."""
-    cart = Cart.query.filter_by(user_id=user_id).first()
-    if not cart:
-        cart = Cart(user_id=user_id)
-        db.session.add(cart)
-        db.session.commit()
-    return cart
-
 @cart_bp.route('/cart/add', methods=['POST'])
 @jwt_required()
 def add_to_cart():
@@ -36,18 +30,13 @@ def add_to_cart():
     if not product:
         return jsonify({"message": "Product not found."}), 404
 
-    cart = _get_or_create_user_cart(user_id)
-
-    # Check if item already exists in cart
-    cart_item = CartItem.query.filter_by(cart_id=cart.id, product_id=product_id).first()
-
-    if cart_item:
-        cart_item.quantity += quantity
-    else:
-        cart_item = CartItem(cart_id=cart.id, product_id=product_id, quantity=quantity)
-        db.session.add(cart_item)
+    cart_id = get_or_create_cart_id(user_id)
 
+    # Insert the item, or add to its quantity if it's already in the cart (one UPSERT)
+    upsert_items(cart_id, {product_id: quantity}, increment=True)
     db.session.commit()
+
+    cart_item = CartItem.query.filter_by(cart_id=cart_id, product_id=product_id).first()
     return jsonify({"message": f"Added {quantity} x {product.name} to cart.", "cart_item": cart_item.to_dict()}), 200
 
 @cart_bp.route('/cart', methods=['GET'])
@@ -57,20 +46,73 @@ def view_cart():
     Retrieves the current user's shopping cart contents.
     """
     user_id = get_jwt_identity()
-    cart = Cart.query.filter_by(user_id=user_id).first()
+    cart = load_cart(user_id) # cart, items and product columns in one query
 
-    if not cart or not cart.items.first():
+    if cart.is_empty:
         return jsonify({"message": "Your cart is empty."}), 200 # 200 OK with empty cart message
 
-    cart_items = [item.to_dict() for item in cart.items.all()]
+    return jsonify({
+        "message": "Your cart contents:",
+        "items": cart.items,
+        "total_price": cart.total_price # Rounded to 2 decimal places
+    }), 200
 
-    # Calculate total price
-    total_price = sum(item.product.discounted_price * item.quantity for item in cart.items.all())
+BATCH_OPERATIONS = ('add', 'update', 'remove')
+MAX_BATCH_OPERATIONS = 500
 
+@cart_bp.route('/cart/batch', methods=['POST'])
+@jwt_required()
+def batch_update_cart():
+    """
+    Applies many cart changes in one transaction.
+    Body: {"operations": [{"op": "add"|"update"|"remove", "product_id": int, "quantity": int}, ...]}
+    'add' increases the quantity, 'update' sets it (0 removes the item) and 'remove'
+    deletes the item. Operations apply in order; the whole batch fails if any is invalid.
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "Body must be a JSON object with an 'operations' list."}), 400
+    operations = data.get('operations')
+
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"message": "'operations' must be a non-empty list."}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({"message": f"At most {MAX_BATCH_OPERATIONS} operations per batch."}), 400
+
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        product_id = operation.get('product_id') if op else None
+        quantity = operation.get('quantity', 1 if op == 'add' else None) if op else None
+        valid = (
+            op in BATCH_OPERATIONS
+            and isinstance(product_id, int)
+            and (op == 'remove'
+                 or (isinstance(quantity, int) and (quantity > 0 if op == 'add' else quantity >= 0)))
+        )
+        if not valid:
+            return jsonify({"message": f"Invalid operation at index {index}.", "operation": operation}), 400
+        operations[index] = {'op': op, 'product_id': product_id, 'quantity': quantity}
+
+    product_ids = {operation['product_id'] for operation in operations}
+    known_ids = {pid for (pid,) in db.session.query(Product.id).filter(Product.id.in_(product_ids))}
+    missing = sorted(product_ids - known_ids)
+    if missing:
+        return jsonify({"message": "Product not found.", "product_ids": missing}), 404
+
+    try:
+        cart_id = get_or_create_cart_id(user_id)
+        apply_batch(cart_id, operations)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    cart = load_cart(user_id)
     return jsonify({
-        "message": "Your cart contents:",
-        "items": cart_items,
-        "total_price": round(total_price, 2) # Round to 2 decimal places
+        "message": f"Applied {len(operations)} cart operation(s).",
+        "items": cart.items,
+        "total_price": cart.total_price
     }), 200
 
 @cart_bp.route('/cart/update/<int:item_id>', methods=['PUT'])
@@ -81,25 +123,24 @@ def update_cart_item(item_id):
     Requires 'quantity' in the JSON body. If quantity is 0, the item is removed.
     """
     user_id = get_jwt_identity()
-    cart = _get_or_create_user_cart(user_id)
     data = request.get_json()
     new_quantity = data.get('quantity')
 
     if not isinstance(new_quantity, int) or new_quantity < 0:
         return jsonify({"message": "Invalid quantity provided. Must be a non-negative integer."}), 400
 
-    cart_item = CartItem.query.filter_by(id=item_id, cart_id=cart.id).first()
+    cart = load_cart(user_id)
+    cart_item = cart.item(item_id)
     if not cart_item:
         return jsonify({"message": "Cart item not found or does not belong to your cart."}), 404
 
+    set_item_quantity(cart.cart_id, item_id, new_quantity)
+    db.session.commit()
+    product_name = cart_item['product']['name']
     if new_quantity == 0:
-        db.session.delete(cart_item)
-        db.session.commit()
-        return jsonify({"message": f"Item '{cart_item.product.name}' removed from cart."}), 200
-    else:
-        cart_item.quantity = new_quantity
-        db.session.commit()
-        return jsonify({"message": f"Quantity for '{cart_item.product.name}' updated to {new_quantity}.", "cart_item": cart_item.to_dict()}), 200
+        return jsonify({"message": f"Item '{product_name}' removed from cart."}), 200
+    return jsonify({"message": f"Quantity for '{product_name}' updated to {new_quantity}.",
+                    "cart_item": dict(cart_item, quantity=new_quantity)}), 200
 
 @cart_bp.route('/cart/remove/<int:item_id>', methods=['DELETE'])
 @jwt_required()
@@ -108,15 +149,15 @@ def remove_from_cart(item_id):
     Removes a specific item from the user's cart.
     """
     user_id = get_jwt_identity()
-    cart = _get_or_create_user_cart(user_id)
+    cart = load_cart(user_id)
 
-    cart_item = CartItem.query.filter_by(id=item_id, cart_id=cart.id).first()
+    cart_item = cart.item(item_id)
     if not cart_item:
         return jsonify({"message": "Cart item not found or does not belong to your cart."}), 404
 
-    db.session.delete(cart_item)
+    set_item_quantity(cart.cart_id, item_id, 0) # a single DELETE
     db.session.commit()
-    return jsonify({"message": f"Item '{cart_item.product.name}' removed from cart."}), 200
+    return jsonify({"message": f"Item '{cart_item['product']['name']}' removed from cart."}), 200
 
 @cart_bp.route('/cart/clear', methods=['DELETE'])
 @jwt_required()
@@ -125,15 +166,13 @@ def clear_cart():
     Clears all items from the user's cart.
     """
     user_id = get_jwt_identity()
-    cart = Cart.query.filter_by(user_id=user_id).first()
 
-    if not cart:
-        return jsonify({"message": "Your cart is already empty."}), 200
-
-    # Delete all items associated with this cart
-    for item in cart.items.all():
-        db.session.delete(item)
+    # Delete all items associated with this cart in a single statement
+    deleted = clear_cart_items(user_id=user_id)
     db.session.commit()
+
+    if not deleted:
+        return jsonify({"message": "Your cart is already empty."}), 200
     return jsonify({"message": "Your cart has been cleared."}), 200
 
 # Optional: Checkout Route (Placeholder)
@@ -146,25 +185,21 @@ def checkout():
     inventory updates, etc., and then clearing the cart.
     """
     user_id = get_jwt_identity()
-    cart = Cart.query.filter_by(user_id=user_id).first()
+    cart = load_cart(user_id)
 
-    if not cart or not cart.items.first():
+    if cart.is_empty:
         return jsonify({"message": "Your cart is empty. Nothing to checkout."}), 400
 
     # For demonstration, just clear the cart and return a success message
     # In a real app, this is where you'd integrate with payment gateways,
     # create an order record, send confirmation emails, etc.
 
-    total_items = sum(item.quantity for item in cart.items.all())
-    total_price = sum(item.product.discounted_price * item.quantity for item in cart.items.all())
-
     # Clear the cart after "checkout"
-    for item in cart.items.all():
-        db.session.delete(item)
+    clear_cart_items(cart_id=cart.cart_id)
     db.session.commit()
 
     return jsonify({
         "message": "Checkout successful! Your order has been placed. (Simulated)",
-        "total_items": total_items,
-        "total_price": round(total_price, 2)
+        "total_items": cart.total_items,
+        "total_price": cart.total_price
     }), 200
@@ -1,99 +1,114 @@
 # app/routes/chatbot.py
 
-from flask import Blueprint, request, jsonify, current_app 
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from app import db
-from app.models.product import Product
-from app.models.cart import Cart, CartItem 
+from app.models.product import PRODUCT_COLUMNS, Product
+from app.models.cart import CartItem
+from app.models.users import User
+from app.services.facets import facet_counts
+from app.services.fulltext import get_search_backend
+from app.services.cart_repository import (
+    clear_cart_items, delete_items, get_or_create_cart_id, load_cart, upsert_items
+)
+from app.services.chat_sessions import new_session
+from app.services.instrumentation import stream_event, tag_request, timed
+from app.services.intents import classify
+from app.services.name_index import resolve_product_name
+from app.services.product_filters import RangeFilter
+from app.services.recommendations import BOUGHT_TOGETHER, SIMILAR, recommended_products
+from app.services.semantic_index import get_semantic_index
+from app.services.replicas import iter_on_replica, run_on_replica
+from app.services.serialization import row_to_dict
+from app.services.taxonomy import category_filter, get_taxonomy
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import re 
 
 chatbot_bp = Blueprint('chatbot', __name__)
 
-def _get_or_create_user_cart(user_id):
-    """Helper function to get a user's cart or create one if it doesn't exist."""
-    cart = Cart.query.filter_by(user_id=user_id).first()
-    if not cart:
-        cart = Cart(user_id=user_id)
-        db.session.add(cart)
-        db.session.commit()
-    return cart
-
 def _extract_search_params(user_message):
     """Extracts keywords, categories, brands, and price ranges from a message."""
-    params = {
-        "keywords": [],
-        "category": None,
-        "brand": None, 
-        "min_price": None,
-        "max_price": None
+    _, slots = classify(user_message)
+    return _search_params_from_slots(slots)
+
+def _search_params_from_slots(slots):
+    return {
+        "keywords": slots["keywords"],
+        "category": slots["category"],
+        "brand": slots["brand"],
+        "min_price": slots["min_price"],
+        "max_price": slots["max_price"]
     }
 
-    # Extract keywords 
-    clean_message = user_message.lower()
-    clean_message = re.sub(r'(search for|find|look for|show me|what is|products|in category|by brand|under|over|between|and)', '', clean_message)
-    params["keywords"] = [word for word in clean_message.split() if word]
-
-    # Extract category
-    category_match = re.search(r'in category\s*(.+)', user_message)
-    if category_match:
-        params["category"] = category_match.group(1).strip()
-        # Remove category from keywords list if it was mistakenly included
-        params["keywords"] = [k for k in params["keywords"] if k.lower() not in params["category"].lower().split()]
-
-    # Extract brand (searching for brand name within product name/description)
-    brand_match = re.search(r'by brand\s*(.+)', user_message)
-    if brand_match:
-        params["brand"] = brand_match.group(1).strip()
-     
-        params["keywords"] = [k for k in params["keywords"] if k.lower() not in params["brand"].lower().split()]
-
-    # Extract price range
-    under_price_match = re.search(r'under\s*(\d+)', user_message)
-    if under_price_match:
-        params["max_price"] = float(under_price_match.group(1))
-    over_price_match = re.search(r'over\s*(\d+)', user_message)
-    if over_price_match:
-        params["min_price"] = float(over_price_match.group(1))
-    between_price_match = re.search(r'between\s*(\d+)\s*and\s*(\d+)', user_message)
-    if between_price_match:
-        params["min_price"] = float(between_price_match.group(1))
-        params["max_price"] = float(between_price_match.group(2))
-
-    return params
-
-def _perform_product_search(search_params):
-    """Constructs and executes SQLAlchemy query based on search parameters."""
-    products = Product.query
-
-    if search_params["keywords"]:
-        for keyword in search_params["keywords"]:
-           
-            products = products.filter(
-                (Product.name.ilike(f'%{keyword}%')) |
-                (Product.description.ilike(f'%{keyword}%'))
-            )
-
-    if search_params["category"]:
-        products = products.filter(Product.category.ilike(f'%{search_params["category"]}%'))
-
+def _search_terms(search_params):
+    terms = list(search_params["keywords"])
     if search_params["brand"]:
-        # Since Product model doesn't have a direct 'brand' column, search in name or description
-        brand_keyword = search_params["brand"]
-        products = products.filter(
-            (Product.name.ilike(f'%{brand_keyword}%')) |
-            (Product.description.ilike(f'%{brand_keyword}%'))
-        )
+        # Since Product model doesn't have a direct 'brand' column, match it like a keyword
+        terms.append(search_params["brand"])
+    return terms
 
+def _filter_search(products, search_params):
+    """Applies a chatbot search's category and price filters to a Product query."""
+    if search_params["category"]:
+        products = products.filter(category_filter(search_params["category"]))
     if search_params["min_price"] is not None:
-        products = products.filter(Product.discounted_price >= search_params["min_price"])
-
+        products = products.filter(Product.price >= search_params["min_price"])
     if search_params["max_price"] is not None:
-        products = products.filter(Product.discounted_price <= search_params["max_price"])
-
-    # Basic sorting (can be extended based on user query)
-    products = products.order_by(Product.name.asc()) # Default sort
-
-    return products.limit(20).all()
+        products = products.filter(Product.price <= search_params["max_price"])
+    return products
+
+def _chatbot_search_backend():
+    return get_search_backend(current_app.config.get('CHATBOT_SEARCH_BACKEND', 'memory'))
+
+def _iter_product_search(search_params, limit=20):
+    """
+    Runs a chatbot search. Keywords (and the brand) go through the configured
+    full-text backend (CHATBOT_SEARCH_BACKEND, the in-memory index by default);
+    category and price filters are applied in SQL on top of it.
+    Yields plain product rows (attribute access, no ORM instances) as the search finds them.
+    """
+    terms = _search_terms(search_params)
+    products = _filter_search(Product.query.with_entities(*PRODUCT_COLUMNS), search_params)
+
+    if not terms:
+        # Basic sorting (can be extended based on user query)
+        return iter(products.order_by(Product.name.asc()).limit(limit))
+
+    return _chatbot_search_backend().iter_search(products, terms, limit=limit)
+
+def _iter_semantic_search(search_params, limit=20, min_score=None):
+    """
+    Related products for a search that matched nothing literally, from the
+    semantic index, with the same category and price filters.
+    """
+    terms = _search_terms(search_params)
+    if not terms:
+        return iter(())
+    products = _filter_search(Product.query.with_entities(*PRODUCT_COLUMNS), search_params)
+    return get_search_backend('semantic').iter_search(products, terms, limit=limit, min_score=min_score)
+
+def _search_facets(search_params):
+    """Facet counts over everything a chatbot search matches, not only the results shown."""
+    terms = _search_terms(search_params)
+    category = search_params["category"]
+    category_nodes = get_taxonomy().resolve(category) if category else None
+    price_filters = []
+    if search_params["min_price"] is not None or search_params["max_price"] is not None:
+        price_filters.append(RangeFilter('price', search_params["min_price"], search_params["max_price"]))
+    if not terms and category_nodes != []:
+        return facet_counts(category_nodes=category_nodes, range_filters=price_filters)
+
+    backend = _chatbot_search_backend()
+    matched = backend.matching_ids(terms) if terms else None
+    if matched is None:
+        ids = _filter_search(Product.query.with_entities(Product.id), search_params)
+        if terms:
+            ids = backend.apply(ids, terms)
+        return facet_counts(id_query=ids.order_by(None))
+    if category_nodes == []:
+        # A category name only SQL can substring-match
+        in_category = Product.query.with_entities(Product.id).filter(category_filter(category))
+        matched = set(matched).intersection(product_id for (product_id,) in in_category)
+        category_nodes = None
+    return facet_counts(product_ids=matched, category_nodes=category_nodes, range_filters=price_filters)
 
 def _get_product_details_response(product, full_details=False):
     """Formats a response for a single product."""
@@ -104,8 +119,8 @@ def _get_product_details_response(product, full_details=False):
     name = getattr(product, 'name', 'N/A')
     category = getattr(product, 'category', 'N/A')
     description = getattr(product, 'description', 'N/A')
-    discounted_price = getattr(product, 'discounted_price', 'N/A')
-    actual_price = getattr(product, 'actual_price', 'N/A')
+    discounted_price = getattr(product, 'price', 'N/A')
+    actual_price = getattr(product, 'original_price', 'N/A')
     rating = getattr(product, 'rating', 'N/A')
     rating_count = getattr(product, 'rating_count', 'N/A')
     product_url = getattr(product, 'product_url', 'N/A')
@@ -134,225 +149,548 @@ def _get_product_details_response(product, full_details=False):
         )
 
 
-#  Main Chatbot Converse Route 
+#  Intent handlers
+#  Each handler takes (user_id, session_data, slots) and returns (response_message, products_to_send).
+
+def _product_id_from_ordinal(session_data, slots):
+    """Resolves 'the 2nd one' to a product id from the last search results."""
+    index = slots["ordinal"]
+    if index is not None and 0 <= index < len(session_data["last_product_ids"]):
+        return session_data["last_product_ids"][index]
+    return None
+
+def _product_from_ordinal(session_data, slots):
+    product_id = _product_id_from_ordinal(session_data, slots)
+    return db.session.get(Product, product_id) if product_id is not None else None
+
+def _product_from_name(slots, product_ids=None):
+    """
+    Resolves a product the shopper named ('boat airdops 141') through the fuzzy
+    name index, optionally among `product_ids` only. Returns (product, name_match
+    payload field), or (None, None) when no name is close enough.
+    """
+    identifier = slots["product_identifier"]
+    match = resolve_product_name(identifier, product_ids=product_ids) if identifier else None
+    if match is None:
+        return None, None
+    product_id, confidence = match
+    return db.session.get(Product, product_id), {
+        "name_match": {"query": identifier, "product_id": product_id, "confidence": confidence}
+    }
 
-@chatbot_bp.route('/converse', methods=['POST'])
-@jwt_required()
-def converse():
-    data = request.get_json()
-    user_message = data.get('message', '').lower().strip()
-    current_user_id = get_jwt_identity()
+def _handle_greeting(user_id, session_data, slots):
+    session_data["last_intent"] = "greeting"
+    return "Hello! I'm your sales chatbot. How can I assist you with finding products today?", []
 
-    # Initialize user session for conversational context (e.g., last shown products)
-    # Access using current_app to ensure it's bound to the correct app context
-    if not hasattr(current_app, 'chatbot_sessions'):
-        current_app.chatbot_sessions = {}
-        
-    if current_user_id not in current_app.chatbot_sessions:
-        current_app.chatbot_sessions[current_user_id] = {
-            "last_products_shown": [],
-            "last_intent": None
-        }
-
-    session_data = current_app.chatbot_sessions[current_user_id]
-    response_message = "I'm not sure how to help with that. Can you rephrase or ask about a product?"
-    products_to_send = [] 
-
-    # 1. Basic Greetings & Utilities
-    if "hello" in user_message or "hi" in user_message:
-        response_message = "Hello! I'm your sales chatbot. How can I assist you with finding products today?"
-        session_data["last_intent"] = "greeting"
-    elif "thank you" in user_message or "thanks" in user_message:
-        response_message = "You're welcome! Let me know if you need anything else."
-        session_data["last_intent"] = "gratitude"
-    elif "reset" in user_message or "start over" in user_message:
-        current_app.chatbot_sessions[current_user_id] = {"last_products_shown": [], "last_intent": None} # Clear session data
-        response_message = "Conversation reset. How can I assist you now?"
-        products_to_send = [] # Clear frontend display
-
-    # 2. Cart Management Intents
-    elif any(phrase in user_message for phrase in ["add to cart", "buy this", "purchase this"]):
-        product_identifier = user_message.replace("add to cart", "").replace("buy this", "").replace("purchase this", "").strip()
-        product_to_add = None
-        quantity = 1 
-
-        num_match = re.search(r'the (\d+)(st|nd|rd|th) one', product_identifier)
-        if num_match and session_data["last_products_shown"]:
-            index = int(num_match.group(1)) - 1
-            if 0 <= index < len(session_data["last_products_shown"]):
-                product_to_add = session_data["last_products_shown"][index]
-        elif product_identifier:
-            # Try to find by name from DB
-            product_to_add = Product.query.filter(Product.name.ilike(f'%{product_identifier}%')).first()
-
-        if product_to_add:
-            try:
-                cart = _get_or_create_user_cart(current_user_id)
-                cart_item = CartItem.query.filter_by(cart_id=cart.id, product_id=product_to_add.id).first()
-
-                if cart_item:
-                    cart_item.quantity += quantity
-                    db.session.commit()
-                    response_message = f"Updated quantity for '{product_to_add.name}' to {cart_item.quantity} in your cart!"
-                else:
-                    new_cart_item = CartItem(cart_id=cart.id, product_id=product_to_add.id, quantity=quantity)
-                    db.session.add(new_cart_item)
-                    db.session.commit()
-                    response_message = f"Added '{product_to_add.name}' to your cart!"
-
-                products_to_send = [product_to_add.to_dict()] # Show the added product
-                session_data["last_intent"] = "add_to_cart"
-            except Exception as e:
-                db.session.rollback() # Rollback in case of error
-                response_message = f"Sorry, I couldn't add that to your cart right now. Please try again. Error: {e}"
-        else:
-            response_message = "I couldn't identify which product to add to cart. Can you specify by name or number from my last search?"
+def _handle_gratitude(user_id, session_data, slots):
+    session_data["last_intent"] = "gratitude"
+    return "You're welcome! Let me know if you need anything else.", []
 
-    elif "view cart" in user_message or "show my cart" in user_message or "what's in my cart" in user_message:
-        cart = Cart.query.filter_by(user_id=current_user_id).first()
-        if not cart or not cart.items.first():
-            response_message = "Your cart is empty."
-        else:
-            cart_items = cart.items.all()
-            cart_summary = "Here's what's in your cart:\n"
-            total_price = 0
-            for i, item in enumerate(cart_items):
-                product = item.product # Access the related product object
-                cart_summary += f"{i+1}. {product.name} (Qty: {item.quantity}) - ₹{product.discounted_price * item.quantity}\n"
-                total_price += product.discounted_price * item.quantity
-                products_to_send.append(product.to_dict()) # Add product to display
-
-            cart_summary += f"Total: ₹{round(total_price, 2)}"
-            response_message = cart_summary
-        session_data["last_intent"] = "view_cart"
-
-    elif "remove from cart" in user_message or "delete from cart" in user_message:
-        product_identifier = user_message.replace("remove from cart", "").replace("delete from cart", "").strip()
-        cart_item_to_remove = None
-
-        cart = _get_or_create_user_cart(current_user_id)
-        if not cart.items.first():
-            response_message = "Your cart is already empty."
-        else:
-            #
-            num_match = re.search(r'the (\d+)(st|nd|rd|th) one', product_identifier)
-            if num_match and session_data["last_products_shown"]:
-                index = int(num_match.group(1)) - 1
-                if 0 <= index < len(session_data["last_products_shown"]):
-                    product_from_last_search = session_data["last_products_shown"][index]
-                    cart_item_to_remove = CartItem.query.filter_by(
-                        cart_id=cart.id, product_id=product_from_last_search.id
-                    ).first()
-            elif product_identifier:
-                # Try to find by name directly in the cart
-                for item in cart.items.all():
-                    if item.product and product_identifier in item.product.name.lower():
-                        cart_item_to_remove = item
-                        break
-
-            if cart_item_to_remove:
-                product_name = cart_item_to_remove.product.name if cart_item_to_remove.product else "an item"
-                db.session.delete(cart_item_to_remove)
-                db.session.commit()
-                response_message = f"Removed '{product_name}' from your cart."
-                session_data["last_intent"] = "remove_from_cart"
-            else:
-                response_message = "I couldn't find that item in your cart. Please specify which item to remove."
+def _handle_reset(user_id, session_data, slots):
+    session_data.update(new_session()) # Clear session data
+    return "Conversation reset. How can I assist you now?", [] # Clear frontend display
 
-    elif "clear cart" in user_message or "empty my cart" in user_message:
-        cart = _get_or_create_user_cart(current_user_id)
-        if not cart.items.first():
-            response_message = "Your cart is already empty."
-        else:
-            for item in cart.items.all(): # Fetch all items to delete
-                db.session.delete(item)
-            db.session.commit()
-            response_message = "Your cart has been cleared."
-        session_data["last_intent"] = "clear_cart"
-
-    elif "checkout" in user_message or "buy now" in user_message or "place order" in user_message:
-        cart = _get_or_create_user_cart(current_user_id)
-        if not cart or not cart.items.first():
-            response_message = "Your cart is empty. Nothing to checkout."
-        else:
-            total_items = sum(item.quantity for item in cart.items.all())
-            total_price = sum(item.product.discounted_price * item.quantity for item in cart.items.all())
-
-       
-            for item in cart.items.all():
-                db.session.delete(item)
-            db.session.commit()
-
-            response_message = (
-                f"Thank you for your order! Your purchase of {total_items} items "
-                f"for a total of ₹{round(total_price, 2)} has been placed. (This is a simulated action)"
-            )
-            session_data["last_intent"] = "checkout"
-            products_to_send = [] # Clear products after checkout
-
-
-    # 3. Exploration Intents (Product Listing, Details)
-    elif "list categories" in user_message or "show categories" in user_message:
-        categories = db.session.query(Product.category).distinct().all()
-        # Clean up categories which can be pipe-separated like "Category1|Subcategory2"
-        all_unique_categories = set()
-        for cat_tuple in categories:
-            if cat_tuple[0]: # Ensure category string is not None or empty
-                for c in cat_tuple[0].split('|'):
-                    all_unique_categories.add(c.strip())
-
-        category_list = sorted(list(all_unique_categories)) # Sort for better readability
-
-        if category_list:
-            response_message = "Available categories: " + ", ".join(category_list) + ".\nWhat product are you looking for within these?"
-        else:
-            response_message = "No categories found."
-        session_data["last_intent"] = "list_categories"
-
-    elif any(phrase in user_message for phrase in ["details about", "more about", "specs of", "tell me about"]):
-        product_identifier = user_message.replace("details about", "").replace("more about", "").replace("specs of", "").replace("tell me about", "").strip()
-        product = None
-
-        num_match = re.search(r'the (\d+)(st|nd|rd|th) one', product_identifier)
-        if num_match and session_data["last_products_shown"]:
-            index = int(num_match.group(1)) - 1
-            if 0 <= index < len(session_data["last_products_shown"]):
-                product = session_data["last_products_shown"][index]
-        elif product_identifier:
-            product = Product.query.filter(Product.name.ilike(f'%{product_identifier}%')).first()
-
-        if product:
-            response_message = _get_product_details_response(product, full_details=True)
-            products_to_send = [product.to_dict()]
-            session_data["last_intent"] = "product_details"
-        else:
-            response_message = "I couldn't find specific details for that product. Can you be more precise or refer to a number from my last search?"
-
-    # 4. Search Intent (Fallback if no other specific intent matches)
-    elif any(keyword in user_message for keyword in ["search", "find", "look for", "show me"]):
-        search_params = _extract_search_params(user_message)
-        products_found = _perform_product_search(search_params)
-
-        if products_found:
-            response_message = "Here are some products I found:\n"
-            for i, product in enumerate(products_found):
-                response_message += f"{i+1}. {product.name} (₹{product.price})\n"
-            products_to_send = [p.to_dict() for p in products_found]
-            session_data["last_products_shown"] = products_found
-            session_data["last_intent"] = "search"
+def _handle_add_to_cart(user_id, session_data, slots):
+    product_to_add = None
+    name_match = None
+    quantity = 1
+
+    if slots["ordinal"] is not None and session_data["last_product_ids"]:
+        product_to_add = _product_from_ordinal(session_data, slots)
+    elif slots["product_identifier"]:
+        product_to_add, name_match = _product_from_name(slots)
+
+    if not product_to_add:
+        return "I couldn't identify which product to add to cart. Can you specify by name or number from my last search?", []
+
+    try:
+        cart_id = get_or_create_cart_id(user_id)
+        upsert_items(cart_id, {product_to_add.id: quantity}, increment=True)
+        db.session.commit()
+
+        cart_quantity = db.session.query(CartItem.quantity).filter_by(
+            cart_id=cart_id, product_id=product_to_add.id
+        ).scalar()
+        if cart_quantity and cart_quantity > quantity:
+            response_message = f"Updated quantity for '{product_to_add.name}' to {cart_quantity} in your cart!"
         else:
-            response_message = "I couldn't find any products matching your criteria. Try different keywords or filters."
-            session_data["last_products_shown"] = []
-            session_data["last_intent"] = "no_search_results"
+            response_message = f"Added '{product_to_add.name}' to your cart!"
+
+        session_data["last_intent"] = "add_to_cart"
+        return (response_message, [product_to_add.to_dict()], # Show the added product
+                *([name_match] if name_match else []))
+    except Exception as e:
+        db.session.rollback() # Rollback in case of error
+        return f"Sorry, I couldn't add that to your cart right now. Please try again. Error: {e}", []
+
+def _handle_view_cart(user_id, session_data, slots):
+    products_to_send = []
+    cart = load_cart(user_id, full_products=True) # items and their products in one query
+    if cart.is_empty:
+        response_message = "Your cart is empty."
+    else:
+        cart_summary = "Here's what's in your cart:\n"
+        for i, (item, product) in enumerate(zip(cart.items, cart.products)):
+            cart_summary += f"{i+1}. {product.name} (Qty: {item['quantity']}) - ₹{product.price * item['quantity']}\n"
+            products_to_send.append(product.to_dict()) # Add product to display
+
+        cart_summary += f"Total: ₹{cart.total_price}"
+        response_message = cart_summary
+    session_data["last_intent"] = "view_cart"
+    return response_message, products_to_send
+
+def _handle_remove_from_cart(user_id, session_data, slots):
+    product_identifier = slots["product_identifier"]
+    cart_item_to_remove = None
+
+    cart = load_cart(user_id) # items and product names in one query, without creating a cart
+    if cart.is_empty:
+        return "Your cart is already empty.", []
+
+    cart_items = {item['product_id']: item for item in cart.items}
+    if slots["ordinal"] is not None and session_data["last_product_ids"]:
+        cart_item_to_remove = cart_items.get(_product_id_from_ordinal(session_data, slots))
+    elif product_identifier:
+        # Match the name against the products in the cart only
+        product, _ = _product_from_name(slots, product_ids=cart_items)
+        if product is not None:
+            cart_item_to_remove = cart_items[product.id]
+
+    if not cart_item_to_remove:
+        return "I couldn't find that item in your cart. Please specify which item to remove.", []
+
+    product_name = cart_item_to_remove['product']['name'] if cart_item_to_remove['product'] else "an item"
+    delete_items(cart.cart_id, [cart_item_to_remove['product_id']]) # a single DELETE
+    db.session.commit()
+    session_data["last_intent"] = "remove_from_cart"
+    return f"Removed '{product_name}' from your cart.", []
+
+def _handle_clear_cart(user_id, session_data, slots):
+    deleted = clear_cart_items(user_id=user_id) # single DELETE for the whole cart
+    db.session.commit()
+    if not deleted:
+        response_message = "Your cart is already empty."
+    else:
+        response_message = "Your cart has been cleared."
+    session_data["last_intent"] = "clear_cart"
+    return response_message, []
+
+def _handle_checkout(user_id, session_data, slots):
+    cart = load_cart(user_id)
+    if cart.is_empty:
+        return "Your cart is empty. Nothing to checkout.", []
+
+    clear_cart_items(cart_id=cart.cart_id)
+    db.session.commit()
+
+    session_data["last_intent"] = "checkout"
+    return (
+        f"Thank you for your order! Your purchase of {cart.total_items} items "
+        f"for a total of ₹{cart.total_price} has been placed. (This is a simulated action)"
+    ), [] # Clear products after checkout
+
+def _handle_list_categories(user_id, session_data, slots):
+    # Every category name at any depth of the cached taxonomy, sorted for readability
+    category_list = get_taxonomy().names()
+
+    if category_list:
+        response_message = "Available categories: " + ", ".join(category_list) + ".\nWhat product are you looking for within these?"
     else:
-        # Default response if no specific intent is recognized
-        response_message = "I can help you search for products, view your cart, or get product details. Try asking 'Show me laptops' or 'What's in my cart?'."
-        session_data["last_intent"] = "unrecognized"
+        response_message = "No categories found."
+    session_data["last_intent"] = "list_categories"
+    return response_message, []
+
+def _handle_product_details(user_id, session_data, slots):
+    product = None
+    name_match = None
+    if slots["ordinal"] is not None and session_data["last_product_ids"]:
+        product = _product_from_ordinal(session_data, slots)
+    elif slots["product_identifier"]:
+        product, name_match = _product_from_name(slots)
 
-    # Prepare the final response payload for the frontend
+    if not product:
+        return "I couldn't find specific details for that product. Can you be more precise or refer to a number from my last search?", []
+
+    session_data["last_intent"] = "product_details"
+    return (_get_product_details_response(product, full_details=True), [product.to_dict()],
+            *([name_match] if name_match else []))
+
+def _handle_recommendations(kind, user_id, session_data, slots):
+    """'Similar to the 2nd one' / 'what goes with the first one', from the precomputed lists."""
+    product = None
+    if slots["ordinal"] is not None and session_data["last_product_ids"]:
+        product = _product_from_ordinal(session_data, slots)
+    elif slots["product_identifier"]:
+        product, _ = _product_from_name(slots)
+    if not product:
+        return "Which product do you mean? Refer to a number from my last search or give me its name.", []
+
+    recommended = recommended_products(product.id, kind, limit=5)
+    if not recommended:
+        session_data["last_intent"] = "no_recommendations"
+        if kind == SIMILAR:
+            return f"I don't have similar products for {product.name} yet.", []
+        return f"I don't know what people buy with {product.name} yet.", []
+
+    intro = f"Products similar to {product.name}:\n" if kind == SIMILAR \
+        else f"Customers often buy these with {product.name}:\n"
+    response_message, products_to_send, *extra = _search_results_response(session_data, recommended, intro=intro)
+    session_data["last_intent"] = kind
+    return (response_message, products_to_send, *extra)
+
+def _handle_similar_products(user_id, session_data, slots):
+    return _handle_recommendations(SIMILAR, user_id, session_data, slots)
+
+def _handle_bought_together(user_id, session_data, slots):
+    return _handle_recommendations(BOUGHT_TOGETHER, user_id, session_data, slots)
+
+#  Search replies
+#  Built as a sequence of parts, so /converse/stream can send each one as soon
+#  as it exists: ("text", chunk of the reply), ("product", product dict) and
+#  ("fields", extra payload fields such as facets). /converse collects them.
+
+def _result_parts(session_data, products, search_params=None, intro="Here are some products I found:\n"):
+    """
+    Lists search results and remembers them for follow-ups. Facets cover
+    everything `search_params` matches, or only the listed products without it.
+    Returns the number of products listed (nothing is sent when it is 0).
+    """
+    shown = []
+    for product in products:
+        if not shown:
+            yield "text", intro
+        shown.append(product.id)
+        yield "text", f"{len(shown)}. {product.name} (₹{product.price})\n"
+        yield "product", row_to_dict(product)
+    if not shown:
+        return 0
+    session_data["last_product_ids"] = tuple(shown)
+    session_data["last_intent"] = "search"
+    if current_app.config.get('CHATBOT_FACETS', True):
+        # Counts per category, price bucket and rating band, so the UI can offer refinements
+        facets = _search_facets(search_params) if search_params is not None \
+            else facet_counts(product_ids=shown)
+        yield "fields", {"facets": facets}
+    return len(shown)
+
+def _collect_reply(parts):
+    """Joins reply parts into a handler's (message, products, *extra fields) result."""
+    text, products, fields = [], [], []
+    for kind, value in parts:
+        if kind == "text":
+            text.append(value)
+        elif kind == "product":
+            products.append(value)
+        else:
+            fields.append(value)
+    return ("".join(text), products, *fields)
+
+def _search_results_response(session_data, products_found, search_params=None,
+                             intro="Here are some products I found:\n"):
+    return _collect_reply(_result_parts(session_data, products_found, search_params, intro))
+
+def _search_reply(user_id, session_data, slots):
+    search_params = _search_params_from_slots(slots)
+    if (yield from _result_parts(session_data, _iter_product_search(search_params), search_params)):
+        return
+
+    if current_app.config.get('CHATBOT_SEMANTIC_FALLBACK', True) and get_semantic_index() is not None:
+        # Nothing matched every word; fall back to products with related wording
+        intro = "I couldn't find exact matches, but these look related:\n"
+        if (yield from _result_parts(session_data, _iter_semantic_search(search_params), intro=intro)):
+            return
+
+    session_data["last_product_ids"] = ()
+    session_data["last_intent"] = "no_search_results"
+    yield "text", "I couldn't find any products matching your criteria. Try different keywords or filters."
+
+def _unrecognized_reply(user_id, session_data, slots):
+    if current_app.config.get('CHATBOT_SEMANTIC_FALLBACK', True):
+        # Shopper phrasing the intent rules don't know ("cheap earbuds for running");
+        # answer with close semantic matches only, so small talk isn't met with products
+        search_params = _search_params_from_slots(slots)
+        index = get_semantic_index()
+        if index is not None and index.names_products(_search_terms(search_params)):
+            related = _iter_semantic_search(search_params, limit=10, min_score=current_app.config.get(
+                'SEMANTIC_UNRECOGNIZED_MIN_SCORE', 0.45))
+            intro = "Here are some products that might be what you're after:\n"
+            if (yield from _result_parts(session_data, related, intro=intro)):
+                return
+
+    # Default response if no specific intent is recognized
+    session_data["last_intent"] = "unrecognized"
+    yield "text", "I can help you search for products, view your cart, or get product details. Try asking 'Show me laptops' or 'What's in my cart?'."
+
+def _handle_search(user_id, session_data, slots):
+    return _collect_reply(_search_reply(user_id, session_data, slots))
+
+def _handle_unrecognized(user_id, session_data, slots):
+    return _collect_reply(_unrecognized_reply(user_id, session_data, slots))
+
+INTENT_HANDLERS = {
+    "greeting": _handle_greeting,
+    "gratitude": _handle_gratitude,
+    "reset": _handle_reset,
+    "add_to_cart": _handle_add_to_cart,
+    "view_cart": _handle_view_cart,
+    "remove_from_cart": _handle_remove_from_cart,
+    "clear_cart": _handle_clear_cart,
+    "checkout": _handle_checkout,
+    "list_categories": _handle_list_categories,
+    "product_details": _handle_product_details,
+    "similar_products": _handle_similar_products,
+    "bought_together": _handle_bought_together,
+    "search": _handle_search,
+    "unrecognized": _handle_unrecognized,
+}
+
+# Intents that only read the catalog; served from a read replica when configured.
+# Cart intents stay on the primary so users always see their own writes.
+READ_ONLY_INTENTS = {"search", "product_details", "list_categories", "unrecognized",
+                     "similar_products", "bought_together"}
+
+
+def _answer(intent, user_id, session_data, slots):
+    """Runs the intent's handler, from a read replica for READ_ONLY_INTENTS."""
+    handler = INTENT_HANDLERS.get(intent, _handle_unrecognized)
+    if intent in READ_ONLY_INTENTS:
+        return run_on_replica(handler, user_id, session_data, slots)
+    return handler(user_id, session_data, slots)
+
+def _reply_payload(result):
+    # Handlers return (message, products) plus, optionally, extra payload fields
+    response_message, products_to_send, *extra = result
     response_payload = {
         "response": response_message,
         "products": products_to_send
     }
+    for fields in extra:
+        response_payload.update(fields)
+    return response_payload
+
 
-    return jsonify(response_payload), 200
+#  Main Chatbot Converse Route 
+
+@chatbot_bp.route('/converse', methods=['POST'])
+@jwt_required()
+def converse():
+    data = request.get_json()
+    user_message = data.get('message', '').lower().strip()
+    current_user_id = get_jwt_identity()
+
+    # Conversational context (e.g., ids of the last shown products) lives in the session store
+    session_data = current_app.chatbot_sessions.get(current_user_id)
+
+    with timed('intent'):
+        intent, slots = classify(user_message)
+    tag_request(intent=intent) # per-intent latency and query counts in /metrics
+    with timed('handler'):
+        result = _answer(intent, current_user_id, session_data, slots)
+    current_app.chatbot_sessions.save(current_user_id, session_data)
+
+    with timed('serialize'):
+        response = jsonify(_reply_payload(result))
+    return response, 200
+
+#  Streaming variant
+
+# Intents whose reply is produced incrementally (see _result_parts); the
+# others run their handler and are sent in one go
+REPLY_STREAMS = {
+    "search": _search_reply,
+    "unrecognized": _unrecognized_reply,
+}
+
+def _handler_parts(handler, user_id, session_data, slots):
+    response_message, products_to_send, *extra = handler(user_id, session_data, slots)
+    yield "text", response_message
+    for product in products_to_send:
+        yield "product", product
+    for fields in extra:
+        yield "fields", fields
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+def _reply_events(user_id, session_data, intent, slots):
+    yield _sse("intent", {"intent": intent})
+    if intent in REPLY_STREAMS:
+        parts_fn, args = REPLY_STREAMS[intent], (user_id, session_data, slots)
+    else:
+        parts_fn, args = _handler_parts, (INTENT_HANDLERS.get(intent, _handle_unrecognized), user_id, session_data, slots)
+    parts = iter_on_replica(parts_fn, *args) if intent in READ_ONLY_INTENTS else parts_fn(*args)
+
+    text, first_product = [], True
+    try:
+        for kind, value in parts:
+            if kind == "text":
+                text.append(value)
+                yield _sse("text", {"delta": value})
+            elif kind == "product":
+                if first_product:
+                    stream_event('first_product')
+                    first_product = False
+                yield _sse("product", value)
+            else:
+                for name, field in value.items():
+                    yield _sse(name, field)
+    except Exception:
+        # Headers are long gone; tell the client instead of cutting the stream short
+        current_app.logger.exception("Streamed chatbot reply failed")
+        db.session.rollback()
+        yield _sse("error", {"message": "Something went wrong while answering. Please try again."})
+        return
+    current_app.chatbot_sessions.save(user_id, session_data)
+    stream_event('done')
+    yield _sse("done", {"response": "".join(text)})
+
+@chatbot_bp.route('/converse/stream', methods=['POST'])
+@jwt_required()
+def converse_stream():
+    """
+    /converse as Server-Sent Events, so the UI can render the reply while it is
+    produced: `intent` right after classification, then `text` chunks
+    ({"delta": ...}) and one `product` event per product card as the search
+    yields them, extra fields (`facets`) as their own events, and finally
+    `done` with the whole reply text (or `error`).
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('message', ''), str):
+        return jsonify({"message": "Body must be a JSON object with a 'message' string."}), 400
+    user_message = data.get('message', '').lower().strip()
+    current_user_id = get_jwt_identity()
+    session_data = current_app.chatbot_sessions.get(current_user_id)
+
+    with timed('intent'):
+        intent, slots = classify(user_message)
+    tag_request(intent=intent)
+
+    events = stream_with_context(_reply_events(current_user_id, session_data, intent, slots))
+    # No proxy buffering (nginx honours X-Accel-Buffering), so each event reaches the client as it is sent
+    return Response(events, mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+#  Batch variant
+
+# Intents whose reply depends only on the message, never on the user or the
+# conversation so far; a batch answers each distinct one once
+SHARED_REPLY_INTENTS = {"search", "unrecognized", "list_categories"}
+
+class _RecordedSession(dict):
+    """A copy of session state that remembers what a handler set, to apply it to other sessions."""
+
+    def __init__(self, state):
+        super().__init__(state)
+        self.writes = {}
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.writes[key] = value
+
+def _shared_reply_key(intent, slots):
+    search_params = _search_params_from_slots(slots)
+    return (intent, tuple(search_params["keywords"]), search_params["category"], search_params["brand"],
+            search_params["min_price"], search_params["max_price"])
+
+def _batch_reply(user_id, session_data, message, classified, shared):
+    """
+    One message of a batch, answered as /converse would. `classified` and
+    `shared` live for the whole batch: the intent of each distinct message and
+    the reply (and session changes) of each distinct SHARED_REPLY_INTENTS query.
+    """
+    if message not in classified:
+        classified[message] = classify(message)
+    intent, slots = classified[message]
+
+    if intent not in SHARED_REPLY_INTENTS:
+        result = _answer(intent, user_id, session_data, slots)
+    else:
+        key = _shared_reply_key(intent, slots)
+        if key not in shared:
+            recorded = _RecordedSession(session_data)
+            shared[key] = (_answer(intent, user_id, recorded, slots), recorded.writes)
+        result, writes = shared[key]
+        session_data.update(writes)
+    return dict(_reply_payload(result), intent=intent)
+
+def _batch_messages(messages):
+    """The messages normalized as /converse does, or None unless they are a non-empty list of strings."""
+    if not isinstance(messages, list) or not messages or not all(isinstance(message, str) for message in messages):
+        return None
+    return [message.lower().strip() for message in messages]
+
+def _replay_conversations(conversations):
+    """[(user_id, messages)] from a replay body's conversations, or None if any is malformed."""
+    parsed = []
+    for conversation in conversations:
+        user_id = conversation.get('user_id') if isinstance(conversation, dict) else None
+        messages = _batch_messages(conversation.get('messages')) if isinstance(conversation, dict) else None
+        if not isinstance(user_id, int) or isinstance(user_id, bool) or messages is None:
+            return None
+        parsed.append((user_id, messages))
+    return parsed
+
+@chatbot_bp.route('/converse/batch', methods=['POST'])
+@jwt_required()
+def converse_batch():
+    """
+    Many messages in one request, answered in order exactly as /converse would
+    answer them one at a time.
+    Body: {"messages": ["...", ...]} for the caller's conversation, or, when
+    CHATBOT_BATCH_REPLAY is on, {"conversations": [{"user_id": int, "messages": [...]}, ...]}
+    to replay transcripts of several users. Identical searches in the batch are run once.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "Body must be a JSON object with 'messages' or 'conversations'."}), 400
+    replay = 'conversations' in data
+    if replay and not current_app.config.get('CHATBOT_BATCH_REPLAY', False):
+        return jsonify({"message": "Multi-user replay is disabled (CHATBOT_BATCH_REPLAY)."}), 403
+    if replay:
+        conversations = data['conversations']
+        if not isinstance(conversations, list) or not conversations:
+            return jsonify({"message": "'conversations' must be a non-empty list."}), 400
+        conversations = _replay_conversations(conversations)
+        if conversations is None:
+            return jsonify({"message": "Each conversation needs an integer 'user_id' and a non-empty list of 'messages'."}), 400
+    else:
+        messages = _batch_messages(data.get('messages'))
+        if messages is None:
+            return jsonify({"message": "'messages' must be a non-empty list of strings."}), 400
+        conversations = [(get_jwt_identity(), messages)]
+
+    max_messages = current_app.config.get('CHATBOT_BATCH_MAX_MESSAGES', 5000)
+    if sum(len(messages) for _, messages in conversations) > max_messages:
+        return jsonify({"message": f"At most {max_messages} messages per batch."}), 400
+    if replay:
+        user_ids = {user_id for user_id, _ in conversations}
+        known_ids = {uid for (uid,) in db.session.query(User.id).filter(User.id.in_(user_ids))}
+        missing = sorted(user_ids - known_ids)
+        if missing:
+            return jsonify({"message": "User not found.", "user_ids": missing}), 404
+
+    tag_request(intent='batch')
+    classified, shared = {}, {}
+    results = []
+    with timed('handler'):
+        for user_id, messages in conversations:
+            session_data = current_app.chatbot_sessions.get(user_id)
+            try:
+                replies = [_batch_reply(user_id, session_data, message, classified, shared) for message in messages]
+            finally:
+                # Whatever was answered stays answered (cart writes are already committed)
+                current_app.chatbot_sessions.save(user_id, session_data)
+            results.append({"user_id": user_id, "replies": replies})
+
+    with timed('serialize'):
+        if replay:
+            response = jsonify({"conversations": results})
+        else:
+            response = jsonify({"replies": results[0]["replies"]})
+    return response, 200
+
+@chatbot_bp.route('/sessions/stats', methods=['GET'])
+@jwt_required()
+def session_stats():
+    """Hit/miss/eviction counters of the conversation session store."""
+    return jsonify(current_app.chatbot_sessions.stats()), 200
@@ -0,0 +1,39 @@
+# app/routes/internal.py
+
+from functools import wraps
+from flask import Blueprint, Response, jsonify, request, current_app, abort
+from app import db
+from app.services.engine import pool_stats
+
+internal_bp = Blueprint('internal', __name__)
+metrics_bp = Blueprint('metrics', __name__)
+
+def internal_only(view):
+    """Serves the view only to INTERNAL_ALLOWED_IPS (localhost by default); 404 for everyone else."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.remote_addr not in current_app.config.get('INTERNAL_ALLOWED_IPS', ('127.0.0.1', '::1')):
+            abort(404)
+        return view(*args, **kwargs)
+    return wrapper
+
+@internal_bp.route('/db/replicas', methods=['GET'])
+@internal_only
+def database_replicas():
+    """Replica health and how many reads were routed to replicas or fell back to the primary."""
+    router = current_app.extensions.get('replica_router')
+    return jsonify(router.stats() if router else {"replicas": {}}), 200
+
+@internal_bp.route('/db/pool', methods=['GET'])
+@internal_only
+def database_pool():
+    """Connection pool state and checkout wait times for every database engine."""
+    return jsonify({
+        (bind_key or 'default'): pool_stats(engine) for bind_key, engine in db.engines.items()
+    }), 200
+
+@metrics_bp.route('/metrics', methods=['GET'])
+@internal_only
+def metrics():
+    """Request, SQL and pool metrics in the Prometheus text format."""
+    return Response(current_app.metrics.render(), mimetype='text/plain; version=0.0.4')
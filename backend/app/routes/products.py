@@ -3,63 +3,156 @@
 from flask import Blueprint, request, jsonify
 from app import db
 from app.models.product import Product
+from app.services.facets import facet_counts
+from app.services.fulltext import get_search_backend
+from app.services.pagination import (
+    apply_keyset, apply_sort, cached_count, decode_cursor, next_cursor, parse_sort
+)
+from app.services.product_filters import apply_range_filters, parse_range_filters, plan_range_filters
+from app.services.recommendations import BOUGHT_TOGETHER, SIMILAR, recommended_products
+from app.services.replicas import read_only
+from app.services.response_cache import cached_response
+from app.services.serialization import product_rows, rows_to_dicts
+from app.services.taxonomy import category_filter, get_taxonomy
 from flask_jwt_extended import jwt_required # To protect product routes if needed
 
 product_bp = Blueprint('product', __name__)
 
+def _result_facets(products_query, query_name, query_category, range_filters):
+    """
+    Facet counts for the whole filtered result. Category and range filters are
+    evaluated on the facet arrays; a text search (or a category name only SQL
+    can substring-match) reads the matching ids once instead.
+    """
+    category_nodes = get_taxonomy().resolve(query_category) if query_category else None
+    if query_name or category_nodes == []:
+        return facet_counts(id_query=products_query.order_by(None).with_entities(Product.id))
+    return facet_counts(category_nodes=category_nodes, range_filters=range_filters)
+
 @product_bp.route('/', methods=['GET'])
 # @jwt_required() # Uncomment if product listing should be protected
+@cached_response
+@read_only
 def fetch_products():
     """
     Fetches a list of products with optional search, filtering, and pagination.
     Query parameters:
-    - name: search term for product name
-    - category: filter by category
-    - page: current page number (1-indexed)
+    - name: full-text search term (name, category and description; results ranked by relevance)
+    - category: category id from /products/categories (e.g. 'electronics/headphones') or a category name
+    - min_/max_ price, rating, rating_count, discount_percentage: inclusive range filters
+    - sort: id, price, rating, rating_count or discount_percentage, '-' prefix for descending
+      (default: relevance when searching by name, otherwise id)
+    - after: opaque cursor from a previous response's `next_cursor`; switches to
+      keyset pagination, so any depth costs the same as the first page
+    - page: current page number (1-indexed, offset pagination)
     - per_page: number of items per page
+    - count: 'exact' (default), 'cached' (reuse a recent total) or 'none' (skip the COUNT)
+    - facets: 'true' to add counts per category node, price bucket and rating band
+      for the whole result set (not just the page)
     """
     query_name = request.args.get('name')
     query_category = request.args.get('category')
+    sort_param = request.args.get('sort')
+    after = request.args.get('after')
+    count_mode = request.args.get('count', 'exact')
+    want_facets = request.args.get('facets', '').lower() in ('1', 'true', 'yes')
 
     # Pagination parameters
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 12, type=int) # Default to 12 products per page
 
+    if count_mode not in ('exact', 'cached', 'none'):
+        return jsonify({"message": "count must be one of: exact, cached, none."}), 400
+
+    try:
+        cursor = decode_cursor(after) if after else None
+        if cursor and sort_param is None:
+            sort_key, descending = cursor[0], cursor[1]
+        elif sort_param is None and query_name:
+            sort_key, descending = None, False # relevance order from the search backend
+        else:
+            sort_key, descending = parse_sort(sort_param)
+        range_filters = parse_range_filters(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if cursor and (cursor[0], cursor[1]) != (sort_key, descending):
+        return jsonify({"message": "The 'after' cursor belongs to a different sort order."}), 400
+
     products_query = Product.query
 
+    if query_category:
+        products_query = products_query.filter(category_filter(query_category))
+
+    range_plan = plan_range_filters(range_filters, sort_key, limit=per_page + 1)
+    products_query = apply_range_filters(products_query, range_plan)
+
     if query_name:
-        products_query = products_query.filter(Product.name.ilike(f'%{query_name}%'))
+        products_query = get_search_backend().apply(products_query, query_name)
 
-    if query_category:
-        products_query = products_query.filter(Product.category.ilike(f'%{query_category}%'))
+    facets = _result_facets(products_query, query_name, query_category, range_filters) if want_facets else None
 
     # Get total count BEFORE applying pagination limits
-    total_products = products_query.count()
+    if count_mode == 'exact':
+        total_products = products_query.order_by(None).count()
+    elif count_mode == 'cached':
+        total_products = cached_count(products_query, (query_name, query_category, tuple(range_filters)))
+    else:
+        total_products = None
+
+    if sort_key is not None:
+        products_query = apply_sort(products_query, sort_key, descending, use_index=range_plan.sort_by_index)
 
-    # Apply pagination
-    # Calculate offset: (page - 1) * per_page
-    products_query = products_query.offset((page - 1) * per_page).limit(per_page)
+    if cursor:
+        # Keyset pagination: seek past the last row of the previous page
+        products_query = apply_keyset(products_query, sort_key, descending, cursor[2], cursor[3])
+    else:
+        # Calculate offset: (page - 1) * per_page
+        products_query = products_query.offset((page - 1) * per_page)
 
-    all_products = products_query.all()
+    # One extra row tells us whether there is a next page. Plain rows, no ORM objects.
+    all_products = product_rows(products_query.limit(per_page + 1))
+    cursor_token = next_cursor(all_products, per_page, sort_key, descending) if sort_key else None
+    all_products = all_products[:per_page]
 
-    if not all_products and total_products == 0:
+    if not all_products and not total_products:
         return jsonify({
             "message": "No products found matching your criteria.",
             "products": [],
-            "total_products": 0,
+            "total_products": total_products,
             "page": page,
-            "per_page": per_page
+            "per_page": per_page,
+            "next_cursor": None,
+            **({"facets": facets} if want_facets else {})
         }), 200 # Changed to 200 OK as it's a valid empty result
 
     return jsonify({
-        "products": [product.to_dict() for product in all_products],
+        "products": rows_to_dicts(all_products),
         "total_products": total_products,
         "page": page,
-        "per_page": per_page
+        "per_page": per_page,
+        "next_cursor": cursor_token,
+        **({"facets": facets} if want_facets else {})
+    }), 200
+
+@product_bp.route('/categories', methods=['GET'])
+@cached_response
+@read_only
+def fetch_categories():
+    """
+    Returns the category tree with product counts per node.
+    Node ids can be passed as the `category` filter of /products/.
+    """
+    taxonomy = get_taxonomy()
+    return jsonify({
+        "categories": taxonomy.to_list(),
+        "total_products": taxonomy.total_products
     }), 200
 
 @product_bp.route('/<int:id>', methods=['GET'])
 # @jwt_required() # Uncomment if single product view should be protected
+@cached_response
+@read_only
 def fetch_single_product(id):
     """
     Fetches a single product by its ID.
@@ -70,3 +163,22 @@ def fetch_single_product(id):
         return jsonify({"message": "Product not found"}), 404
 
     return jsonify(product.to_dict()), 200
+
+@product_bp.route('/<int:id>/similar', methods=['GET'])
+@read_only
+def fetch_similar_products(id):
+    """
+    Precomputed recommendations for a product: `similar` products (category,
+    name and price band) and products `bought_together` with it. Both come
+    from the product_recommendation table, so the cost doesn't grow with the
+    catalog; run `python -m app.services.recommendations` to fill it.
+    """
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    if db.session.get(Product, id) is None:
+        return jsonify({"message": "Product not found"}), 404
+
+    return jsonify({
+        "product_id": id,
+        "similar": rows_to_dicts(recommended_products(id, SIMILAR, limit)),
+        "bought_together": rows_to_dicts(recommended_products(id, BOUGHT_TOGETHER, limit)),
+    }), 200
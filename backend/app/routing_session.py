@@ -0,0 +1,20 @@
+# app/routing_session.py
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.selectable import Select, CompoundSelect
+
+
+class RoutingSession(Session):
+    """
+    db.session class that can send reads to a read replica. While
+    session.info['replica'] names a replica bind (see app.services.replicas),
+    SELECT statements go to that engine; flushes, INSERT/UPDATE/DELETE and
+    anything that isn't a plain SELECT still use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('replica')
+        if (replica is not None and bind is None and not self._flushing
+                and isinstance(clause, (Select, CompoundSelect))):
+            return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
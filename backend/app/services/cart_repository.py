@@ -0,0 +1,197 @@
+# app/services/cart_repository.py
+
+from datetime import datetime
+from sqlalchemy import select
+from app import db
+from app.models.cart import Cart, CartItem
+from app.models.product import Product
+
+# Product columns the cart views need; everything else stays in the database.
+CART_PRODUCT_COLUMNS = (Product.id, Product.name, Product.image_url, Product.price)
+
+
+class CartView:
+    """Read-only snapshot of a cart, its items and totals, loaded in one query."""
+
+    def __init__(self, cart_id, items, products=None):
+        self.cart_id = cart_id
+        self.items = items              # list of CartItem-shaped dicts
+        self.products = products or []  # full Product objects, when requested
+        self.total_items = sum(item['quantity'] for item in items)
+        self.total_price = round(sum(
+            (item['product']['discounted_price'] or 0) * item['quantity']
+            for item in items if item['product']
+        ), 2)
+
+    @property
+    def exists(self):
+        return self.cart_id is not None
+
+    @property
+    def is_empty(self):
+        return not self.items
+
+    def item(self, item_id):
+        """The item dict with this CartItem id, or None if it isn't in the cart."""
+        return next((item for item in self.items if item['id'] == item_id), None)
+
+
+def load_cart(user_id, full_products=False):
+    """
+    Loads a user's cart with a single Cart -> CartItem -> Product outer join.
+    With `full_products=True` the whole Product row is loaded as well (the
+    chatbot shows full product cards); otherwise only CART_PRODUCT_COLUMNS.
+    """
+    product_columns = (Product,) if full_products else CART_PRODUCT_COLUMNS
+    statement = (
+        select(Cart.id, CartItem.id, CartItem.quantity, CartItem.added_at, CartItem.product_id, *product_columns)
+        .select_from(Cart)
+        .outerjoin(CartItem, CartItem.cart_id == Cart.id)
+        .outerjoin(Product, Product.id == CartItem.product_id)
+        .where(Cart.user_id == user_id)
+        .order_by(CartItem.id)
+    )
+
+    cart_id = None
+    items = []
+    products = []
+    for row in db.session.execute(statement):
+        cart_id = row[0]
+        item_id, quantity, added_at, product_id = row[1:5]
+        if item_id is None:
+            continue # cart exists but has no items
+        if full_products:
+            product = row[5]
+            products.append(product)
+            product_data = (product.id, product.name, product.image_url, product.price) if product else None
+        else:
+            product_data = row[5:] if row[5] is not None else None
+        items.append({
+            'id': item_id,
+            'cart_id': cart_id,
+            'product_id': product_id,
+            'quantity': quantity,
+            'added_at': added_at.isoformat() + 'Z',
+            'product': {
+                'id': product_data[0],
+                'name': product_data[1],
+                'image_url': product_data[2],
+                'discounted_price': product_data[3]
+            } if product_data else None
+        })
+    return CartView(cart_id, items, products)
+
+
+#  Writes
+#  These only flush/execute; callers own the transaction and commit once.
+
+def get_or_create_cart_id(user_id):
+    """Returns the id of the user's cart, inserting the cart (without committing) if needed."""
+    cart_id = db.session.execute(select(Cart.id).where(Cart.user_id == user_id)).scalar()
+    if cart_id is None:
+        cart = Cart(user_id=user_id)
+        db.session.add(cart)
+        db.session.flush()
+        cart_id = cart.id
+    return cart_id
+
+def _upsert_statement(rows, increment):
+    """
+    INSERT ... ON CONFLICT (cart_id, product_id) for the current dialect.
+    increment=True adds to an existing quantity, otherwise it replaces it.
+    Returns None when the dialect has no native upsert.
+    """
+    table = CartItem.__table__
+    dialect = db.session.get_bind(mapper=CartItem.__mapper__).dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table).values(rows)
+        quantity = table.c.quantity + statement.excluded.quantity if increment else statement.excluded.quantity
+        return statement.on_conflict_do_update(
+            index_elements=[table.c.cart_id, table.c.product_id], set_={'quantity': quantity}
+        )
+    if dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table).values(rows)
+        quantity = table.c.quantity + statement.inserted.quantity if increment else statement.inserted.quantity
+        return statement.on_duplicate_key_update(quantity=quantity)
+    return None
+
+def upsert_items(cart_id, quantities, increment=True):
+    """
+    Writes {product_id: quantity} into a cart with one set-based statement.
+    increment=True adds to existing quantities (add to cart), False sets them.
+    """
+    if not quantities:
+        return
+    rows = [
+        {'cart_id': cart_id, 'product_id': product_id, 'quantity': quantity, 'added_at': datetime.utcnow()}
+        for product_id, quantity in quantities.items()
+    ]
+    statement = _upsert_statement(rows, increment)
+    if statement is not None:
+        db.session.execute(statement)
+        return
+
+    # Portable fallback: look up existing rows, then update/insert them
+    existing = {item.product_id: item for item in CartItem.query.filter(
+        CartItem.cart_id == cart_id, CartItem.product_id.in_(list(quantities))
+    )}
+    for product_id, quantity in quantities.items():
+        item = existing.get(product_id)
+        if item is None:
+            db.session.add(CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity))
+        else:
+            item.quantity = item.quantity + quantity if increment else quantity
+    db.session.flush()
+
+def delete_items(cart_id, product_ids):
+    """Removes the given products from a cart in one DELETE."""
+    if not product_ids:
+        return 0
+    return CartItem.query.filter(
+        CartItem.cart_id == cart_id, CartItem.product_id.in_(list(product_ids))
+    ).delete(synchronize_session=False)
+
+def set_item_quantity(cart_id, item_id, quantity):
+    """Sets one item's quantity with a single UPDATE, or DELETEs it when the quantity is 0."""
+    items = CartItem.query.filter(CartItem.id == item_id, CartItem.cart_id == cart_id)
+    if quantity == 0:
+        return items.delete(synchronize_session=False)
+    return items.update({CartItem.quantity: quantity}, synchronize_session=False)
+
+def clear_cart_items(user_id=None, cart_id=None):
+    """
+    Deletes every item of a cart with a single DELETE ... WHERE cart_id = ?
+    (a subquery on the user id when the cart id isn't known). Returns the row count.
+    """
+    if cart_id is None:
+        cart_id = select(Cart.id).where(Cart.user_id == user_id).scalar_subquery()
+    return CartItem.query.filter(CartItem.cart_id == cart_id).delete(synchronize_session=False)
+
+def apply_batch(cart_id, operations):
+    """
+    Folds an ordered list of {'op': 'add'|'update'|'remove', 'product_id', 'quantity'}
+    operations into their net effect per product and applies it with at most
+    three statements: a DELETE, an incrementing upsert and a replacing upsert.
+    """
+    increments = {}   # product_id -> quantity to add to whatever is stored
+    absolutes = {}    # product_id -> final quantity (0 means remove)
+    for operation in operations:
+        product_id = operation['product_id']
+        if operation['op'] == 'add':
+            if product_id in absolutes:
+                absolutes[product_id] += operation['quantity']
+            else:
+                increments[product_id] = increments.get(product_id, 0) + operation['quantity']
+        else:
+            quantity = 0 if operation['op'] == 'remove' else operation['quantity']
+            increments.pop(product_id, None)
+            absolutes[product_id] = quantity
+
+    delete_items(cart_id, [pid for pid, qty in absolutes.items() if qty == 0])
+    upsert_items(cart_id, increments, increment=True)
+    upsert_items(cart_id, {pid: qty for pid, qty in absolutes.items() if qty > 0}, increment=False)
@@ -0,0 +1,135 @@
+# app/services/catalog_events.py
+
+import threading
+import time
+from flask import current_app, has_app_context
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+from app import db
+from app.models.catalog_version import CatalogVersion
+from app.models.product import Product
+
+# Callbacks interested in catalog writes. Each one is called as
+# callback(upserted, deleted_ids) after a successful commit, where `upserted`
+# maps product id -> plain dict of column values (safe to use outside the session).
+# Empty arguments mean "anything may have changed" (a bulk load, or a write
+# made by another process); subscribers drop what they cached.
+_subscribers = []
+
+def subscribe(callback):
+    """Registers a callback that runs after every commit touching products."""
+    if callback not in _subscribers:
+        _subscribers.append(callback)
+    return callback
+
+def notify(upserted=None, deleted_ids=None):
+    """Dispatches a catalog change to every subscriber (also used by bulk loaders)."""
+    upserted = upserted or {}
+    deleted_ids = set(deleted_ids or ())
+    for callback in list(_subscribers):
+        callback(upserted, deleted_ids)
+
+def _pending(session):
+    return session.info.setdefault('catalog_changes', {"upserted": {}, "deleted": set()})
+
+@event.listens_for(Session, 'after_flush')
+def _collect_product_changes(session, flush_context):
+    """
+    Snapshots the products written in this flush so they can be published on
+    commit, and bumps the shared catalog version in the same transaction.
+    """
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Product):
+            changes = _pending(session)
+            changes["upserted"][obj.id] = obj.to_dict()
+            changes["deleted"].discard(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            changes = _pending(session)
+            changes["upserted"].pop(obj.id, None)
+            changes["deleted"].add(obj.id)
+    changes = session.info.get('catalog_changes')
+    if changes is not None and "version" not in changes:
+        changes["version"] = bump_version(session.connection(bind_arguments={"mapper": Product.__mapper__}))
+
+@event.listens_for(Session, 'after_commit')
+def _publish_product_changes(session):
+    changes = session.info.pop('catalog_changes', None)
+    if changes:
+        _saw_own_version(changes.get("version"))
+        notify(changes["upserted"], changes["deleted"])
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_product_changes(session):
+    session.info.pop('catalog_changes', None)
+
+
+#  Changes made by other processes
+
+_ready_engines = set()  # engine URLs whose catalog_version table is known to exist
+_sync_lock = threading.Lock()
+
+def _ensure_version_table(connection):
+    # Databases created before the table existed get it on first use (like revoked_token)
+    url = str(connection.engine.url)
+    if url not in _ready_engines:
+        CatalogVersion.__table__.create(connection, checkfirst=True)
+        _ready_engines.add(url)
+
+def bump_version(connection):
+    """
+    Bumps the shared catalog version inside the caller's transaction and
+    returns it. A missing row starts at the current time in milliseconds, so a
+    recreated table (seed_data.py --mode replace) never repeats an old version.
+    """
+    _ensure_version_table(connection)
+    table = CatalogVersion.__table__
+    if connection.execute(update(table).where(table.c.id == 1).values(version=table.c.version + 1)).rowcount:
+        return connection.execute(select(table.c.version).where(table.c.id == 1)).scalar_one()
+    version = int(time.time() * 1000)
+    connection.execute(insert(table).values(id=1, version=version))
+    return version
+
+def read_version(engine):
+    """The shared catalog version (None before the first catalog write)."""
+    with engine.begin() as connection:
+        _ensure_version_table(connection)
+        table = CatalogVersion.__table__
+        return connection.execute(select(table.c.version).where(table.c.id == 1)).scalar()
+
+def _version_state():
+    return current_app.extensions.setdefault('catalog_version', {"seen": None, "checked_at": None})
+
+def _saw_own_version(version):
+    # This process's own commit moved the version by one: its subscribers were
+    # told the details, so the next check mustn't report a change from elsewhere
+    if version is None or not has_app_context():
+        return
+    with _sync_lock:
+        state = _version_state()
+        if state["seen"] is not None and state["seen"] + 1 == version:
+            state["seen"] = version
+
+def sync_version():
+    """
+    before_request hook: at most every CATALOG_VERSION_SYNC_INTERVAL seconds
+    (default 2; None turns checks off), compares the shared catalog version
+    with the last one this process saw. When another process moved it
+    (another worker, seed_data.py), every subscriber is told that anything may
+    have changed, so in-memory caches are stale for at most one interval.
+    """
+    interval = current_app.config.get('CATALOG_VERSION_SYNC_INTERVAL', 2)
+    if interval is None:
+        return
+    state = _version_state()
+    now = time.monotonic()
+    if state["checked_at"] is not None and now - state["checked_at"] < interval:
+        return
+    with _sync_lock:
+        if state["checked_at"] is not None and now - state["checked_at"] < interval:
+            return
+        version = read_version(db.engine)
+        changed = state["checked_at"] is not None and version != state["seen"]
+        state["seen"], state["checked_at"] = version, now
+    if changed:
+        notify()
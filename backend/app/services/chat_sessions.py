@@ -0,0 +1,140 @@
+# app/services/chat_sessions.py
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+def new_session():
+    """Conversation state for one user. Products are kept as ids, never ORM objects."""
+    return {"last_product_ids": (), "last_intent": None}
+
+
+class SessionStore:
+    """
+    Chatbot conversation state keyed by user id.
+    `get()` returns a copy; changes are only kept once passed to `save()`.
+    """
+
+    def __init__(self):
+        self._counter_lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _count(self, name, amount=1):
+        with self._counter_lock:
+            self.counters[name] += amount
+
+    def get(self, user_id):
+        raise NotImplementedError
+
+    def save(self, user_id, state):
+        raise NotImplementedError
+
+    def delete(self, user_id):
+        raise NotImplementedError
+
+    def stats(self):
+        with self._counter_lock:
+            return dict(self.counters, backend=type(self).__name__)
+
+
+class MemorySessionStore(SessionStore):
+    """Per-process store with LRU eviction once `max_entries` is reached and an idle TTL."""
+
+    def __init__(self, max_entries=10000, ttl=1800):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # user_id -> (expires_at, last_intent, last_product_ids)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] <= now:
+                del self._entries[user_id]
+                entry = None
+                self._count("expirations")
+            if entry is None:
+                self._count("misses")
+                return new_session()
+            self._entries.move_to_end(user_id)
+        self._count("hits")
+        return {"last_product_ids": entry[2], "last_intent": entry[1]}
+
+    def save(self, user_id, state):
+        entry = (time.monotonic() + self.ttl, state.get("last_intent"), tuple(state.get("last_product_ids", ())))
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def purge_expired(self):
+        """Drops idle sessions; entries are otherwise only expired lazily on access."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [uid for uid, entry in self._entries.items() if entry[0] <= now]
+            for uid in expired:
+                del self._entries[uid]
+        if expired:
+            self._count("expirations", len(expired))
+        return len(expired)
+
+    def stats(self):
+        data = super().stats()
+        with self._lock:
+            data["size"] = len(self._entries)
+        data["max_entries"] = self.max_entries
+        return data
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Shared store for multi-worker deployments (Redis or any server speaking its
+    protocol). TTL is enforced by the server with SETEX; size bounds come from
+    the server's maxmemory/LRU policy.
+    """
+
+    def __init__(self, url, ttl=1800, prefix='chatbot:session:'):
+        super().__init__()
+        import redis  # optional dependency, only needed for this backend
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, user_id):
+        raw = self._client.get(f'{self.prefix}{user_id}')
+        if raw is None:
+            self._count("misses")
+            return new_session()
+        self._count("hits")
+        data = json.loads(raw)
+        return {"last_product_ids": tuple(data.get("p", ())), "last_intent": data.get("i")}
+
+    def save(self, user_id, state):
+        payload = json.dumps({"p": list(state.get("last_product_ids", ())), "i": state.get("last_intent")})
+        self._client.setex(f'{self.prefix}{user_id}', self.ttl, payload)
+
+    def delete(self, user_id):
+        self._client.delete(f'{self.prefix}{user_id}')
+
+
+def create_session_store(config):
+    """Builds the store selected by CHATBOT_SESSION_BACKEND ('memory' or 'redis')."""
+    backend = config.get('CHATBOT_SESSION_BACKEND', 'memory')
+    ttl = config.get('CHATBOT_SESSION_TTL', 1800)
+    if backend == 'redis':
+        return RedisSessionStore(config.get('CHATBOT_SESSION_REDIS_URL', 'redis://localhost:6379/0'), ttl=ttl)
+    if backend == 'memory':
+        return MemorySessionStore(max_entries=config.get('CHATBOT_SESSION_MAX_ENTRIES', 10000), ttl=ttl)
+    raise ValueError(f"Unknown CHATBOT_SESSION_BACKEND: {backend}")
@@ -0,0 +1,134 @@
+# app/services/engine.py
+
+import os
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Pool settings per deployment environment (APP_ENV config key or environment
+# variable). Individual DB_POOL_* config keys override them.
+POOL_PROFILES = {
+    'development': {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30, 'pool_recycle': 1800, 'pool_pre_ping': True},
+    'testing': {'pool_size': 2, 'max_overflow': 2, 'pool_timeout': 5, 'pool_recycle': -1, 'pool_pre_ping': False},
+    # Recycle below MySQL's and most proxies' idle timeouts; fail fast rather than queue for long
+    'production': {'pool_size': 20, 'max_overflow': 10, 'pool_timeout': 10, 'pool_recycle': 1800, 'pool_pre_ping': True},
+}
+POOL_OVERRIDES = {
+    'DB_POOL_SIZE': 'pool_size',
+    'DB_MAX_OVERFLOW': 'max_overflow',
+    'DB_POOL_TIMEOUT': 'pool_timeout',
+    'DB_POOL_RECYCLE': 'pool_recycle',
+    'DB_POOL_PRE_PING': 'pool_pre_ping',
+}
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.wait_stats = {"checkouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0, "timeouts": 0}
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.wait_stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.wait_stats["checkouts"] += 1
+                self.wait_stats["wait_seconds_total"] += waited
+                self.wait_stats["wait_seconds_max"] = max(self.wait_stats["wait_seconds_max"], waited)
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def pool_settings(config):
+    """The pool options for APP_ENV, with any DB_POOL_* overrides applied."""
+    environment = config.get('APP_ENV') or os.environ.get('APP_ENV', 'development')
+    if environment not in POOL_PROFILES:
+        raise ValueError(f"Unknown APP_ENV: {environment}")
+    settings = dict(POOL_PROFILES[environment])
+    for key, option in POOL_OVERRIDES.items():
+        if config.get(key) is not None:
+            settings[option] = config[key]
+    return settings
+
+def _options_for(url, config):
+    if _is_memory_sqlite(make_url(url)):
+        return {} # one shared in-memory database; Flask-SQLAlchemy picks the pool
+    return dict(pool_settings(config), poolclass=InstrumentedQueuePool)
+
+def configure_engine(app):
+    """
+    Fills SQLALCHEMY_ENGINE_OPTIONS (and the options of every SQLALCHEMY_BINDS
+    entry) with the pool settings. Options set explicitly in the config win.
+    Call before db.init_app().
+    """
+    config = app.config
+    options = dict(_options_for(config['SQLALCHEMY_DATABASE_URI'], config))
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    binds = {}
+    for key, bind in (config.get('SQLALCHEMY_BINDS') or {}).items():
+        bind = {'url': bind} if isinstance(bind, str) else dict(bind)
+        binds[key] = dict(_options_for(bind['url'], config), **bind)
+    if binds:
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+def _sqlite_pragmas(config, memory):
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        f"PRAGMA synchronous = {config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA mmap_size = {int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+    ]
+    if not memory:
+        # WAL lets readers run alongside the single writer instead of "database is locked"
+        pragmas.insert(0, f"PRAGMA journal_mode = {config.get('SQLITE_JOURNAL_MODE', 'WAL')}")
+    return pragmas
+
+def install_sqlite_pragmas(app, engines):
+    """Runs the SQLite pragmas on every new DBAPI connection of the SQLite engines."""
+    for engine in engines:
+        if engine.dialect.name != 'sqlite':
+            continue
+        pragmas = _sqlite_pragmas(app.config, _is_memory_sqlite(engine.url))
+
+        @event.listens_for(engine, 'connect')
+        def _set_pragmas(dbapi_connection, connection_record, pragmas=pragmas):
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+            finally:
+                cursor.close()
+
+
+def pool_stats(engine):
+    """Checked-out/overflow counts and checkout wait times of an engine's pool."""
+    pool = engine.pool
+    data = {"dialect": engine.dialect.name, "pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        data.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(),
+                    overflow=max(0, pool.overflow()), max_overflow=pool._max_overflow, timeout=pool.timeout())
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            stats = dict(pool.wait_stats)
+        checkouts = stats["checkouts"]
+        data.update(
+            checkouts=checkouts,
+            timeouts=stats["timeouts"],
+            wait_ms_mean=round(stats["wait_seconds_total"] / checkouts * 1000, 3) if checkouts else 0.0,
+            wait_ms_max=round(stats["wait_seconds_max"] * 1000, 3),
+        )
+    return data
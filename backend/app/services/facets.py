@@ -0,0 +1,173 @@
+# app/services/facets.py
+
+import threading
+import numpy as np
+from flask import current_app
+from app import db
+from app.models.product import Product
+from app.services import catalog_events
+from app.services.product_filters import RANGE_COLUMNS
+from app.services.taxonomy import get_taxonomy
+
+# Bucket lower bounds; each bucket runs up to (not including) the next bound
+PRICE_BUCKET_BOUNDS = (0, 500, 1000, 2000, 5000, 10000, 20000, 50000)
+RATING_BAND_BOUNDS = (0, 3.0, 3.5, 4.0, 4.5)
+
+
+class FacetIndex:
+    """
+    Per-product facet arrays, aligned by position with the sorted product ids:
+    the category path (an index into the distinct stored paths), the
+    range-filterable values, the price bucket and the rating band (-1 where
+    the value is missing). Counting the facets of a result set is a boolean
+    mask plus a few np.bincount calls instead of one GROUP BY per facet.
+    """
+
+    def __init__(self, rows, taxonomy):
+        columns = list(zip(*rows)) if rows else [()] * (2 + len(RANGE_COLUMNS))
+        self.ids = np.asarray(columns[0], dtype=np.int64)
+        order = np.argsort(self.ids, kind='stable')
+        self.ids = self.ids[order]
+
+        paths, path_index = np.unique(np.asarray([c or '' for c in columns[1]], dtype=object)[order],
+                                      return_inverse=True)
+        self.path_index = path_index.astype(np.int32)
+        # Range-filterable columns as float arrays, NaN where missing
+        self.values = {
+            key: np.asarray([np.nan if v is None else v for v in values], dtype=np.float64)[order]
+            for key, values in zip(RANGE_COLUMNS, columns[2:])
+        }
+        self.price_bucket = _bucketize(self.values['price'], PRICE_BUCKET_BOUNDS)
+        self.rating_band = _bucketize(self.values['rating'], RATING_BAND_BOUNDS)
+
+        # (path, node) pairs: every taxonomy node on each distinct path, so
+        # per-path counts roll up to every ancestor in one weighted bincount
+        self.nodes = list(taxonomy.nodes.values())
+        node_position = {node.id: position for position, node in enumerate(self.nodes)}
+        path_of_pair, node_of_pair = [], []
+        for position, path in enumerate(paths):
+            for node in taxonomy.path_nodes(path):
+                path_of_pair.append(position)
+                node_of_pair.append(node_position[node.id])
+        self.path_of_pair = np.asarray(path_of_pair, dtype=np.int32)
+        self.node_of_pair = np.asarray(node_of_pair, dtype=np.int32)
+        self.path_count = len(paths)
+        self.roots = list(taxonomy.roots.values())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def mask_for_ids(self, product_ids):
+        """Boolean mask selecting `product_ids` (ids unknown to the index are ignored)."""
+        mask = np.zeros(len(self.ids), dtype=bool)
+        wanted = np.fromiter(product_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, wanted)
+        known = positions < len(self.ids)
+        positions, wanted = positions[known], wanted[known]
+        mask[positions[self.ids[positions] == wanted]] = True
+        return mask
+
+    def filter_mask(self, category_nodes=None, range_filters=()):
+        """
+        Boolean mask of the products under any of `category_nodes` and inside
+        every RangeFilter, computed from the arrays alone (no SQL).
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+        if category_nodes is not None:
+            wanted = {node.id for node in category_nodes}
+            node_positions = [i for i, node in enumerate(self.nodes) if node.id in wanted]
+            paths = self.path_of_pair[np.isin(self.node_of_pair, node_positions)]
+            mask &= np.isin(self.path_index, paths)
+        for range_filter in range_filters:
+            values = self.values[range_filter.key]
+            if range_filter.low is not None:
+                mask &= values >= range_filter.low # NaN (missing) never matches
+            if range_filter.high is not None:
+                mask &= values <= range_filter.high
+        return mask
+
+    def counts(self, mask=None):
+        """Facet counts for the products selected by `mask` (every product when None)."""
+        paths = self.path_index if mask is None else self.path_index[mask]
+        path_counts = np.bincount(paths, minlength=self.path_count)
+        node_counts = np.bincount(self.node_of_pair, weights=path_counts[self.path_of_pair],
+                                  minlength=len(self.nodes)).astype(np.int64)
+        counts_by_id = {node.id: int(count) for node, count in zip(self.nodes, node_counts) if count}
+
+        price_bucket = self.price_bucket if mask is None else self.price_bucket[mask]
+        rating_band = self.rating_band if mask is None else self.rating_band[mask]
+        return {
+            "total": int(len(paths)),
+            "categories": _category_tree(self.roots, counts_by_id),
+            "price": _buckets(price_bucket, PRICE_BUCKET_BOUNDS),
+            "rating": _buckets(rating_band, RATING_BAND_BOUNDS)[::-1], # best rated first
+        }
+
+
+def _bucketize(values, bounds):
+    buckets = np.searchsorted(np.asarray(bounds, dtype=np.float64), values, side='right').astype(np.int8) - 1
+    buckets[np.isnan(values) | (buckets < 0)] = -1
+    return buckets
+
+def _buckets(bucket_index, bounds):
+    counts = np.bincount(bucket_index[bucket_index >= 0], minlength=len(bounds))
+    return [
+        {"min": low, "max": bounds[i + 1] if i + 1 < len(bounds) else None, "count": int(counts[i])}
+        for i, low in enumerate(bounds)
+    ]
+
+def _category_tree(nodes, counts_by_id):
+    tree = []
+    for node in sorted(nodes, key=lambda n: n.name):
+        count = counts_by_id.get(node.id)
+        if count:
+            tree.append({
+                "id": node.id,
+                "name": node.name,
+                "count": count,
+                "children": _category_tree(node.children.values(), counts_by_id),
+            })
+    return tree
+
+
+_build_lock = threading.Lock()
+_caches = []    # extensions dicts of the apps holding a cached facet index
+
+def _invalidate(upserted, deleted_ids):
+    # Rebuilt lazily on next use, from the same snapshot as the rebuilt taxonomy
+    for extensions in _caches:
+        extensions.pop('facet_index', None)
+
+def get_facet_index():
+    """Returns the cached FacetIndex for the current app, building it if needed."""
+    extensions = current_app.extensions
+    index = extensions.get('facet_index')
+    if index is not None:
+        return index
+    with _build_lock:
+        index = extensions.get('facet_index')
+        if index is None:
+            rows = db.session.query(Product.id, Product.category, *RANGE_COLUMNS.values()).all()
+            index = extensions['facet_index'] = FacetIndex(rows, get_taxonomy())
+            if not any(cache is extensions for cache in _caches):
+                _caches.append(extensions)
+            catalog_events.subscribe(_invalidate)
+    return index
+
+def facet_counts(id_query=None, category_nodes=None, range_filters=(), product_ids=None):
+    """
+    Category, price bucket and rating band counts for a result set: the
+    products matched by `id_query` (a query selecting product ids, without
+    LIMIT; read in one query) or listed in `product_ids`, narrowed to the products under
+    `category_nodes` and inside `range_filters`, which are selected from the facet
+    arrays without SQL. No arguments counts the whole catalog.
+    """
+    index = get_facet_index()
+    if id_query is not None:
+        product_ids = (product_id for (product_id,) in id_query)
+    if category_nodes is None and not range_filters:
+        return index.counts(None if product_ids is None else index.mask_for_ids(product_ids))
+    mask = index.filter_mask(category_nodes, range_filters)
+    if product_ids is not None:
+        mask &= index.mask_for_ids(product_ids)
+    return index.counts(mask)
@@ -0,0 +1,296 @@
+# app/services/fulltext.py
+
+import json
+import re
+import threading
+from flask import current_app
+from sqlalchemy import Integer, bindparam, case, column, desc, func, select, table, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from app import db
+from app.models.product import Product
+from app.services.search_index import get_product_index
+from app.services.semantic_index import get_semantic_index
+
+_RAW_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+def query_terms(terms):
+    """Splits user keywords into plain alphanumeric terms (never raw FTS syntax)."""
+    if isinstance(terms, str):
+        terms = [terms]
+    seen = []
+    for term in terms:
+        for token in _RAW_TOKEN_RE.findall((term or '').lower()):
+            if token not in seen:
+                seen.append(token)
+    return seen
+
+
+class SearchBackend:
+    """
+    A full-text search strategy over Product.name, category and description.
+    `apply()` narrows a Product query to rows matching every term and orders it
+    by relevance, so callers can still add filters, count and paginate.
+    """
+    name = 'base'
+
+    def ensure_schema(self, connection):
+        """Creates whatever index structures the backend needs (idempotent)."""
+
+    def apply(self, query, terms):
+        raise NotImplementedError
+
+    def search(self, query, terms, limit=20):
+        """Returns up to `limit` ranked products from `query` matching `terms`."""
+        return self.apply(query, terms).limit(limit).all()
+
+    def iter_search(self, query, terms, limit=20):
+        """Like search(), yielding products as they are read (for streamed responses)."""
+        yield from self.apply(query, terms).limit(limit)
+
+    def matching_ids(self, terms):
+        """
+        Ids of every product matching `terms`, for counting a whole result set;
+        None when only apply() can tell (the database engines, which don't cap it).
+        """
+        return None
+
+
+def _ranked_id_table(ranked_ids):
+    """
+    A (product_id, rank) table sent as one array parameter, so any number of
+    ranked ids can be joined without an IN list; None for dialects without one.
+    """
+    dialect = db.session.get_bind(mapper=Product.__mapper__).dialect.name
+    if dialect == 'sqlite':
+        items = func.json_each(bindparam('ranked_ids', json.dumps(ranked_ids), unique=True)).table_valued('key', 'value')
+        return select(items.c.value.label('product_id'), items.c.key.label('rank')).subquery('ranked_ids')
+    if dialect == 'postgresql':
+        return func.unnest(bindparam('ranked_ids', ranked_ids, type_=ARRAY(Integer), unique=True)).table_valued(
+            'product_id', with_ordinality='rank'
+        ).render_derived(name='ranked_ids')
+    return None
+
+
+class MemoryIndexBackend(SearchBackend):
+    """Answers keyword matching from the in-process InvertedIndex."""
+    name = 'memory'
+
+    def __init__(self, max_candidates=5000):
+        self.max_candidates = max_candidates # ranks ordered in SQL where ids go in an IN list
+
+    def _ranked_ids(self, terms, limit):
+        return [pid for pid, _ in get_product_index().search(query_terms(terms), limit=limit)]
+
+    def matching_ids(self, terms):
+        return get_product_index().matching_ids(query_terms(terms))
+
+    def apply(self, query, terms):
+        # Every match, so counts, facets and later pages cover the whole result set
+        ranked_ids = self._ranked_ids(terms, None)
+        if not ranked_ids:
+            return query.filter(db.false())
+        ranked = _ranked_id_table(ranked_ids)
+        if ranked is not None:
+            return query.join(ranked, ranked.c.product_id == Product.id).order_by(ranked.c.rank)
+        # Elsewhere only the best max_candidates are ordered by rank, the rest by id after them
+        top = ranked_ids[:self.max_candidates]
+        order = case({pid: rank for rank, pid in enumerate(top)}, value=Product.id, else_=len(top))
+        return query.filter(Product.id.in_(ranked_ids)).order_by(order, Product.id)
+
+    def search(self, query, terms, limit=20):
+        return list(self.iter_search(query, terms, limit))
+
+    def iter_search(self, query, terms, limit=20):
+        return self._iter_matching(query, self._ranked_ids(terms, None), limit)
+
+    def _iter_matching(self, query, ranked_ids, limit):
+        # Walk the ranked ids a chunk at a time so extra SQL filters (price, category)
+        # only ever touch a small IN list; each chunk's matches are yielded right away.
+        chunk_size = max(limit * 10, 200)
+        found = 0
+        for start in range(0, len(ranked_ids), chunk_size):
+            chunk = ranked_ids[start:start + chunk_size]
+            by_id = {p.id: p for p in query.filter(Product.id.in_(chunk)).all()}
+            for pid in chunk:
+                if pid in by_id:
+                    yield by_id[pid]
+                    found += 1
+                    if found >= limit:
+                        return
+
+
+class SemanticBackend(MemoryIndexBackend):
+    """
+    Ranks products by cosine similarity to the query in the semantic index
+    (TF-IDF + SVD vectors), so related words match without appearing
+    literally. Only the best SEMANTIC_MAX_CANDIDATES products scoring at least
+    SEMANTIC_MIN_SCORE are considered; SQL filters apply on top as usual.
+    """
+    name = 'semantic'
+
+    def _ranked_ids(self, terms, limit, min_score=None):
+        config = current_app.config
+        candidates = config.get('SEMANTIC_MAX_CANDIDATES', 1000)
+        if min_score is None:
+            min_score = config.get('SEMANTIC_MIN_SCORE', 0.2)
+        index = get_semantic_index()
+        if index is None:
+            raise RuntimeError("No semantic index has been built; run `python -m app.services.semantic_index`.")
+        hits = index.search(list(terms), limit=min(limit or candidates, candidates), min_score=min_score)
+        return [pid for pid, _ in hits]
+
+    def matching_ids(self, terms):
+        return self._ranked_ids(terms, None)
+
+    def search(self, query, terms, limit=20, min_score=None):
+        """Like the memory backend's search; min_score overrides SEMANTIC_MIN_SCORE."""
+        return list(self.iter_search(query, terms, limit, min_score))
+
+    def iter_search(self, query, terms, limit=20, min_score=None):
+        return self._iter_matching(query, self._ranked_ids(terms, None, min_score), limit)
+
+
+class SqliteFTS5Backend(SearchBackend):
+    """External-content FTS5 table kept in sync with `product` by triggers."""
+    name = 'sqlite_fts5'
+    fts = table('product_fts', column('rowid'))
+
+    _DDL = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5("
+        "name, category, description, content='product', content_rowid='id', "
+        "tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN "
+        "INSERT INTO product_fts(rowid, name, category, description) "
+        "VALUES (new.id, new.name, new.category, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN "
+        "INSERT INTO product_fts(product_fts, rowid, name, category, description) "
+        "VALUES ('delete', old.id, old.name, old.category, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE ON product BEGIN "
+        "INSERT INTO product_fts(product_fts, rowid, name, category, description) "
+        "VALUES ('delete', old.id, old.name, old.category, old.description); "
+        "INSERT INTO product_fts(rowid, name, category, description) "
+        "VALUES (new.id, new.name, new.category, new.description); END",
+    ]
+
+    def ensure_schema(self, connection):
+        existing = {row[0] for row in connection.execute(text(
+            "SELECT name FROM sqlite_master WHERE name LIKE 'product_fts%'"
+        ))}
+        if {'product_fts', 'product_fts_ai', 'product_fts_ad', 'product_fts_au'} <= existing:
+            return
+        for statement in self._DDL:
+            connection.execute(text(statement))
+        # Table or triggers were (re)created, e.g. after seed_data dropped `product`.
+        connection.execute(text("INSERT INTO product_fts(product_fts) VALUES ('rebuild')"))
+
+    def apply(self, query, terms):
+        match = ' '.join(f'"{term}"*' for term in query_terms(terms))
+        if not match:
+            return query
+        return (
+            query.join(self.fts, self.fts.c.rowid == Product.id)
+            .filter(text("product_fts MATCH :fts_query").bindparams(fts_query=match))
+            # Column weights: name, category, description (lower bm25 is better)
+            .order_by(text("bm25(product_fts, 10.0, 4.0, 1.0)"))
+        )
+
+
+class PostgresTsvectorBackend(SearchBackend):
+    """Weighted, generated tsvector column with a GIN index."""
+    name = 'postgres'
+
+    _DDL = [
+        "ALTER TABLE product ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'C')) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_product_search_vector ON product USING GIN (search_vector)",
+    ]
+
+    def ensure_schema(self, connection):
+        for statement in self._DDL:
+            connection.execute(text(statement))
+
+    def apply(self, query, terms):
+        words = query_terms(terms)
+        if not words:
+            return query
+        tsquery = ' & '.join(f'{word}:*' for word in words)
+        return (
+            query.filter(text("product.search_vector @@ to_tsquery('english', :ts_query)")
+                         .bindparams(ts_query=tsquery))
+            .order_by(desc(text("ts_rank_cd(product.search_vector, to_tsquery('english', :ts_rank_query))")
+                           .bindparams(ts_rank_query=tsquery)))
+        )
+
+
+class MySQLFulltextBackend(SearchBackend):
+    """InnoDB FULLTEXT index queried in boolean mode."""
+    name = 'mysql'
+
+    def ensure_schema(self, connection):
+        exists = connection.execute(text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'product' "
+            "AND index_name = 'ft_product_search'"
+        )).scalar()
+        if not exists:
+            connection.execute(text(
+                "ALTER TABLE product ADD FULLTEXT INDEX ft_product_search (name, category, description)"
+            ))
+
+    def apply(self, query, terms):
+        words = query_terms(terms)
+        if not words:
+            return query
+        against = ' '.join(f'+{word}*' for word in words)
+        match = "MATCH (product.name, product.category, product.description) AGAINST (:{} IN BOOLEAN MODE)"
+        return (
+            query.filter(text(match.format('ft_query')).bindparams(ft_query=against))
+            .order_by(desc(text(match.format('ft_rank_query')).bindparams(ft_rank_query=against)))
+        )
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (MemoryIndexBackend, SemanticBackend, SqliteFTS5Backend, PostgresTsvectorBackend, MySQLFulltextBackend)
+}
+
+_DIALECT_BACKENDS = {
+    'sqlite': SqliteFTS5Backend,
+    'postgresql': PostgresTsvectorBackend,
+    'mysql': MySQLFulltextBackend,
+    'mariadb': MySQLFulltextBackend,
+}
+
+_schema_lock = threading.Lock()
+
+def ensure_search_schema(backend=None):
+    """Creates the FTS structures for `backend` (defaults to SEARCH_BACKEND) in one transaction."""
+    backend = backend or get_search_backend()
+    with db.engine.begin() as connection:
+        backend.ensure_schema(connection)
+
+def get_search_backend(name=None):
+    """
+    Resolves a search backend by name ('auto', 'memory', 'semantic', 'sqlite_fts5',
+    'postgres', 'mysql'). 'auto' picks the database's native full-text engine. The backend's
+    schema is created the first time it is used by an app.
+    """
+    name = name or current_app.config.get('SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        backend_cls = _DIALECT_BACKENDS.get(db.engine.dialect.name, MemoryIndexBackend)
+    else:
+        backend_cls = BACKENDS[name]
+
+    cache = current_app.extensions.setdefault('search_backends', {})
+    backend = cache.get(backend_cls.name)
+    if backend is None:
+        with _schema_lock:
+            backend = cache.get(backend_cls.name)
+            if backend is None:
+                backend = backend_cls()
+                ensure_search_schema(backend)
+                cache[backend_cls.name] = backend
+    return backend
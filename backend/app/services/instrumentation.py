@@ -0,0 +1,215 @@
+# app/services/instrumentation.py
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from app.services.engine import pool_stats
+
+slow_query_log = logging.getLogger('app.slow_queries')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsRegistry:
+    """Minimal in-process counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._counters = defaultdict(int)         # (name, labels) -> value
+        self._histograms = {}                     # (name, labels) -> [bucket counts..., sum, count]
+        self.collectors = []                      # callables returning [(name, type, help, labels, value)]
+
+    def describe(self, name, metric_type, help_text):
+        self._types[name] = metric_type
+        self._help[name] = help_text
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += amount
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * len(DURATION_BUCKETS) + [0.0, 0]
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        samples = defaultdict(list)
+        for (name, labels), value in counters:
+            samples[name].append(f'{name}{_labels(labels)} {_number(value)}')
+        for (name, labels), histogram in histograms:
+            for bound, count in zip(DURATION_BUCKETS, histogram):
+                samples[name].append(f'{name}_bucket{_labels(labels + (("le", str(bound)),))} {count}')
+            samples[name].append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {histogram[-1]}')
+            samples[name].append(f'{name}_sum{_labels(labels)} {_number(histogram[-2])}')
+            samples[name].append(f'{name}_count{_labels(labels)} {histogram[-1]}')
+        for collect in self.collectors:
+            for name, metric_type, help_text, labels, value in collect():
+                self._types.setdefault(name, metric_type)
+                self._help.setdefault(name, help_text)
+                samples[name].append(f'{name}{_labels(tuple(sorted(labels.items())))} {_number(value)}')
+        for name in sorted(samples):
+            lines.append(f'# HELP {name} {self._help.get(name, name)}')
+            lines.append(f'# TYPE {name} {self._types.get(name, "untyped")}')
+            lines.extend(samples[name])
+        return '\n'.join(lines) + '\n'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}' if labels else ''
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+#  Per-request state, kept on flask.g
+
+def _current():
+    return g.get('_perf') if has_request_context() else None
+
+def tag_request(**tags):
+    """Adds labels (e.g. the chatbot intent) to the current request's metrics."""
+    metrics = _current()
+    if metrics is not None:
+        metrics["tags"].update(tags)
+
+def stream_event(name):
+    """
+    Records the time from the start of the request to `name` (e.g. 'first_product',
+    'done') of a streamed response, whose body is still being sent after the
+    request metrics were recorded.
+    """
+    metrics = _current()
+    if metrics is not None:
+        current_app.metrics.observe('http_stream_event_seconds', dict(_endpoint_labels(), event=name),
+                                    time.perf_counter() - metrics["started"])
+
+@contextmanager
+def timed(phase):
+    """Times a phase of the current request (reported in metrics and Server-Timing)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _current()
+        if metrics is not None:
+            metrics["phases"][phase] = metrics["phases"].get(phase, 0.0) + time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _make_after_cursor_execute(app):
+    threshold = app.config.get('SLOW_QUERY_MS', 100) / 1000
+
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        metrics = _current()
+        if metrics is not None:
+            metrics["sql_count"] += 1
+            metrics["sql_seconds"] += elapsed
+        if elapsed >= threshold:
+            endpoint = request.endpoint if has_request_context() else None
+            if metrics is not None:
+                metrics["slow"] += 1
+            slow_query_log.warning("Slow query %.1f ms [%s]: %s", elapsed * 1000, endpoint or '-',
+                                   ' '.join(statement.split())[:1000])
+    return _after_cursor_execute
+
+
+def _endpoint_labels():
+    metrics = g._perf
+    labels = {
+        "endpoint": request.endpoint or 'unmatched',
+        "blueprint": request.blueprint or '',
+        "method": request.method,
+    }
+    labels.update(metrics["tags"])
+    return labels
+
+def _pool_metrics(engines):
+    def collect():
+        for bind_key, engine in engines.items():
+            stats, labels = pool_stats(engine), {"bind": bind_key or 'default'}
+            for key, metric_type, help_text in (
+                ("checked_out", 'gauge', 'Connections currently checked out of the pool.'),
+                ("overflow", 'gauge', 'Overflow connections currently open.'),
+                ("checkouts", 'counter', 'Pool checkouts.'),
+                ("timeouts", 'counter', 'Pool checkouts that timed out.'),
+            ):
+                if key in stats:
+                    yield f'db_pool_{key}', metric_type, help_text, labels, stats[key]
+    return collect
+
+def init_instrumentation(app, engines):
+    """
+    Records wall time, SQL statement count and DB time per request, tagged by
+    endpoint/blueprint (plus tags like the chatbot intent), logs statements
+    slower than SLOW_QUERY_MS and, with SERVER_TIMING_HEADER, adds a
+    Server-Timing header. engines maps bind keys to engines (db.engines).
+    Metrics are served by /metrics (app.metrics).
+    """
+    registry = app.metrics = MetricsRegistry()
+    registry.describe('http_requests_total', 'counter', 'Requests by endpoint and status.')
+    registry.describe('http_request_duration_seconds', 'histogram', 'Request wall time.')
+    registry.describe('db_statements_total', 'counter', 'SQL statements executed while serving requests.')
+    registry.describe('db_duration_seconds_total', 'counter', 'Time spent in SQL statements while serving requests.')
+    registry.describe('db_slow_statements_total', 'counter', 'SQL statements slower than SLOW_QUERY_MS.')
+    registry.describe('request_phase_seconds_total', 'counter', 'Time spent in named request phases.')
+    registry.describe('http_stream_event_seconds', 'histogram', 'Time from request start to events of streamed responses.')
+
+    registry.collectors.append(_pool_metrics(engines))
+
+    after_cursor_execute = _make_after_cursor_execute(app)
+    for engine in engines.values():
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+    @app.before_request
+    def _start_request_metrics():
+        g._perf = {"started": time.perf_counter(), "sql_count": 0, "sql_seconds": 0.0, "slow": 0,
+                   "phases": {}, "tags": {}}
+
+    @app.after_request
+    def _record_request_metrics(response):
+        metrics = g.get('_perf')
+        if metrics is None:
+            return response
+        elapsed = time.perf_counter() - metrics["started"]
+        labels = _endpoint_labels()
+        registry.inc('http_requests_total', dict(labels, status=str(response.status_code)))
+        registry.observe('http_request_duration_seconds', labels, elapsed)
+        registry.inc('db_statements_total', labels, metrics["sql_count"])
+        registry.inc('db_duration_seconds_total', labels, metrics["sql_seconds"])
+        if metrics["slow"]:
+            registry.inc('db_slow_statements_total', labels, metrics["slow"])
+        for phase, seconds in metrics["phases"].items():
+            registry.inc('request_phase_seconds_total', dict(labels, phase=phase), seconds)
+
+        if app.config.get('SERVER_TIMING_HEADER', False):
+            entries = [f'app;dur={elapsed * 1000:.2f}',
+                       f'db;dur={metrics["sql_seconds"] * 1000:.2f};desc="{metrics["sql_count"]} queries"']
+            entries += [f'{phase};dur={seconds * 1000:.2f}' for phase, seconds in metrics["phases"].items()]
+            response.headers['Server-Timing'] = ', '.join(entries)
+        return response
+
+    return registry
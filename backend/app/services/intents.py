@@ -0,0 +1,146 @@
+# app/services/intents.py
+"""
+Chatbot intent classification.
+
+Every intent phrase and slot pattern is compiled once into a single
+alternation regex, so classifying a message is one `finditer` pass: each
+match is either an intent phrase, a slot (ordinal, price, category, brand)
+or filler, and whatever text is left over becomes the product identifier
+and search keywords.
+"""
+
+import re
+
+# Intents in priority order: when a message contains phrases for several
+# intents, the one listed first wins (e.g. "hi, show me laptops" is a greeting).
+# Within an intent, longer phrases must come first so they win the alternation.
+INTENT_PHRASES = [
+    ("greeting", [r"hello", r"hi"]),
+    ("gratitude", [r"thank you", r"thanks"]),
+    ("reset", [r"reset", r"start over", r"clear chat"]),
+    ("add_to_cart", [r"add to cart", r"buy this", r"purchase this", r"buy(?=\s+the\b)",
+                     r"(?:add|buy)\s+(?P<add_target>.+?)\s+to\s+(?:my\s+)?cart"]),
+    ("view_cart", [r"view cart", r"show my cart", r"what'?s in my cart"]),
+    ("remove_from_cart", [r"remove from cart", r"delete from cart",
+                          r"(?:remove|delete)\s+(?P<remove_target>.+?)\s+from\s+(?:my\s+)?cart"]),
+    ("clear_cart", [r"clear cart", r"empty my cart"]),
+    ("checkout", [r"checkout", r"buy now", r"place order"]),
+    ("list_categories", [r"list categories", r"show categories"]),
+    ("similar_products", [r"similar to", r"something like", r"alternatives to", r"more like"]),
+    ("bought_together", [r"bought together with", r"(?:what\s+)?goes (?:well )?with", r"buy (?:it )?with", r"accessories for"]),
+    ("product_details", [r"details about", r"tell me more about", r"more about", r"specs of", r"tell me about"]),
+    ("search", [r"search for", r"search", r"find", r"look for", r"show me"]),
+]
+INTENT_PRIORITY = {name: rank for rank, (name, _) in enumerate(INTENT_PHRASES)}
+DEFAULT_INTENT = "unrecognized"
+
+ORDINAL_WORDS = {
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+    "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10,
+}
+
+# Words that introduce a slot; category/brand values stop in front of them.
+_SLOT_STOP = r"(?=\s+(?:in category|by brand|under|over|between)\b|\s*$)"
+
+SLOT_PATTERNS = [
+    ("ordinal", r"the\s+(?:(?P<ord_num>\d+)(?:st|nd|rd|th)|(?P<ord_word>" + "|".join(ORDINAL_WORDS) + r"))(?:\s+one)?"),
+    ("between", r"between\s*(?P<between_min>\d+(?:\.\d+)?)\s*and\s*(?P<between_max>\d+(?:\.\d+)?)"),
+    ("under", r"under\s*(?P<under_value>\d+(?:\.\d+)?)"),
+    ("over", r"over\s*(?P<over_value>\d+(?:\.\d+)?)"),
+    ("category", r"in category\s*(?P<category_value>.+?)" + _SLOT_STOP),
+    ("brand", r"by brand\s*(?P<brand_value>.+?)" + _SLOT_STOP),
+    # Connective words that carry no search meaning. No bare "what": slots are tried
+    # before intents, so it would eat the start of "what's in my cart"
+    ("filler", r"what is|products|and|to cart|from cart"),
+]
+
+def _compile():
+    alternatives = []
+    for name, phrases in INTENT_PHRASES:
+        alternatives.append(rf"(?P<intent_{name}>\b(?:{'|'.join(phrases)})\b)")
+    for name, pattern in SLOT_PATTERNS:
+        alternatives.append(rf"(?P<slot_{name}>\b(?:{pattern})\b)")
+    # Slots are tried first at any position so "show me products in category x"
+    # splits into intent / filler / category rather than swallowing the slot words.
+    slots = alternatives[len(INTENT_PHRASES):]
+    intents = alternatives[:len(INTENT_PHRASES)]
+    return re.compile("|".join(slots + intents))
+
+_MESSAGE_RE = _compile()
+_WORD_RE = re.compile(r"[\w'&.-]+")
+
+
+def _ordinal_index(match):
+    number = match.group("ord_num")
+    return (int(number) if number else ORDINAL_WORDS[match.group("ord_word")]) - 1
+
+
+def classify(message):
+    """
+    Returns (intent, slots) for a chat message in one pass over the text.
+
+    slots: ordinal (0-based index or None), product_identifier, keywords,
+    category, brand, min_price, max_price.
+    """
+    text = (message or "").lower().strip()
+    slots = {
+        "ordinal": None,
+        "product_identifier": "",
+        "keywords": [],
+        "category": None,
+        "brand": None,
+        "min_price": None,
+        "max_price": None,
+    }
+    intent_matches = []
+    consumed = []   # (start, end) spans that are not part of the leftover text
+
+    for match in _MESSAGE_RE.finditer(text):
+        kind = match.lastgroup
+        if kind.startswith("intent_"):
+            intent_matches.append((INTENT_PRIORITY[kind[len("intent_"):]], match))
+            continue
+        consumed.append(match.span())
+        if kind == "slot_ordinal":
+            slots["ordinal"] = _ordinal_index(match)
+        elif kind == "slot_between":
+            slots["min_price"] = float(match.group("between_min"))
+            slots["max_price"] = float(match.group("between_max"))
+        elif kind == "slot_under":
+            slots["max_price"] = float(match.group("under_value"))
+        elif kind == "slot_over":
+            slots["min_price"] = float(match.group("over_value"))
+        elif kind == "slot_category":
+            slots["category"] = match.group("category_value").strip()
+        elif kind == "slot_brand":
+            slots["brand"] = match.group("brand_value").strip()
+
+    intent = DEFAULT_INTENT
+    target = None
+    if intent_matches:
+        # Phrases of losing intents stay in the leftover text
+        rank, intent_match = min(intent_matches, key=lambda item: item[0])
+        intent = INTENT_PHRASES[rank][0]
+        consumed.append(intent_match.span())
+        target = intent_match.group("add_target") or intent_match.group("remove_target")
+
+    leftover = []
+    position = 0
+    for start, end in sorted(consumed):
+        leftover.append(text[position:start])
+        position = end
+    leftover.append(text[position:])
+    leftover = " ".join(leftover)
+
+    if target:
+        # "add the 2nd one to cart": the ordinal lives inside the captured target
+        ordinal = _MESSAGE_RE.fullmatch(target)
+        if ordinal and ordinal.lastgroup == "slot_ordinal":
+            slots["ordinal"] = _ordinal_index(ordinal)
+        else:
+            slots["product_identifier"] = target.strip(" ?!.,")
+    else:
+        slots["product_identifier"] = " ".join(leftover.split()).strip(" ?!.,")
+
+    slots["keywords"] = [w.strip(".'") for w in _WORD_RE.findall(leftover) if w.strip(".'")]
+    return intent, slots
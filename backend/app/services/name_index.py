@@ -0,0 +1,214 @@
+# app/services/name_index.py
+
+import re
+import threading
+import unicodedata
+import numpy as np
+from flask import current_app
+from app import db
+from app.models.product import Product
+from app.services import catalog_events
+
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+# Trigram ids are base-38 numbers over these character codes; 0 marks the gap between two names
+_ALPHABET = " 0123456789abcdefghijklmnopqrstuvwxyz"
+_BASE = len(_ALPHABET) + 1
+_CODES = np.zeros(256, dtype=np.int64)
+for _code, _char in enumerate(_ALPHABET, start=1):
+    _CODES[ord(_char)] = _code
+_SPACE = _CODES[ord(' ')]
+
+def normalize_name(text):
+    """Lowercase ASCII letters and digits separated by single spaces ('boAt Airdopes-141' -> 'boat airdopes 141')."""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii').lower()
+    return _NON_ALNUM_RE.sub(' ', text).strip()
+
+def _trigrams(names):
+    """
+    (trigram id, row) for every character trigram of the words of normalized
+    names, each word padded with spaces (' ai', 'air', ..., 'es '). Trigrams
+    never span two words, so naming a product while skipping words costs nothing.
+    """
+    padded = [f" {name.replace(' ', '  ')} " for name in names]
+    text = "\0".join(padded)
+    codes = _CODES[np.frombuffer(text.encode('ascii'), dtype=np.uint8)]
+    rows = np.repeat(np.arange(len(names)), [len(name) + 1 for name in padded])[:len(codes)]
+    ids = (codes[:-2] * _BASE + codes[1:-1]) * _BASE + codes[2:]
+    within_word = (codes[:-2] > 0) & (codes[1:-1] > _SPACE) & (codes[2:] > 0)
+    return ids[within_word], rows[:-2][within_word]
+
+
+class NameIndex:
+    """
+    Character-trigram postings over normalized product names, for resolving
+    what a shopper calls a product ("boat airdopes 141", "airdops") to the
+    closest product with a confidence score.
+
+    Names are kept per product id; the postings (a CSR layout: trigram id ->
+    sorted rows) are rebuilt from them, without the database, on the first
+    lookup after a catalog change.
+    """
+
+    def __init__(self, max_df=0.05, max_candidates=256):
+        self.max_df = max_df                    # trigrams in more names than this share only rescore candidates
+        self.max_candidates = max_candidates
+        self._names = {}                        # product_id -> normalized name
+        self._ids = np.zeros(0, dtype=np.int64) # row -> product id, ascending
+        self._offsets = np.zeros(_BASE ** 3 + 1, dtype=np.int64)
+        self._postings = np.zeros(0, dtype=np.int32)
+        self._name_sizes = np.zeros(0, dtype=np.int64)  # row -> number of distinct trigrams
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._names)
+
+    #  Building / incremental maintenance
+
+    def build(self, rows):
+        """Bulk-loads the index from an iterable of (id, name) rows."""
+        with self._lock:
+            for product_id, name in rows:
+                self._names[product_id] = normalize_name(name)
+            self._dirty = True
+
+    def apply_changes(self, upserted, deleted_ids):
+        """Renamed, new and deleted products show up on the next lookup."""
+        with self._lock:
+            for product_id in deleted_ids:
+                self._names.pop(product_id, None)
+            for product_id, product in upserted.items():
+                self._names[product_id] = normalize_name(product.get("name"))
+            self._dirty = True
+
+    def _refresh_locked(self):
+        product_ids = sorted(self._names)
+        names = [self._names[product_id] for product_id in product_ids]
+        count = max(len(names), 1)
+        trigram_ids, rows = _trigrams(names)
+        # One posting per (trigram, name); sorting the combined key orders rows within each trigram
+        keys = np.unique(trigram_ids * count + rows)
+        trigram_ids, rows = keys // count, keys % count
+        self._ids = np.asarray(product_ids, dtype=np.int64)
+        self._offsets = np.concatenate(([0], np.cumsum(np.bincount(trigram_ids, minlength=_BASE ** 3))))
+        self._postings = rows.astype(np.int32)
+        self._name_sizes = np.bincount(rows, minlength=len(names))
+        self._dirty = False
+
+    #  Querying
+
+    def _contains(self, start, end, candidates):
+        """Which `candidates` rows appear in the posting list offsets[start:end]."""
+        postings = self._postings[start:end]
+        found = np.minimum(np.searchsorted(postings, candidates), postings.size - 1)
+        return postings[found] == candidates
+
+    def match(self, text, limit=1, product_ids=None, min_confidence=0.5):
+        """
+        [(product_id, confidence), ...], best first. Confidence is the share of
+        the query's trigrams (weighted by rarity) found in the name: 1.0 when
+        the name contains the query, lower for each typo or missing word.
+        Names under `min_confidence` are left out, and equal confidences go to
+        the shortest name. `product_ids` restricts the answer to those products.
+        """
+        query = normalize_name(text)
+        query_trigrams = np.unique(_trigrams([query])[0])
+        if not query_trigrams.size:
+            return []
+
+        with self._lock:
+            if self._dirty:
+                self._refresh_locked()
+            total = len(self._ids)
+            if not total:
+                return []
+            starts, ends = self._offsets[query_trigrams], self._offsets[query_trigrams + 1]
+            df = ends - starts
+            # Square-rooted IDF: rare trigrams (brands, model numbers) count more, but not so
+            # much that one typo in a brand sinks an otherwise exact match
+            idf = np.sqrt(np.log((total + 1) / (df + 0.5)))
+            needed = min_confidence * idf.sum()
+            # Rarest first; trigrams no name has (typos) only count against the confidence
+            present = np.flatnonzero(df)[np.argsort(df[df > 0], kind='stable')]
+            left = idf[present].sum()
+            if not present.size or left < needed:
+                return []
+
+            if product_ids is not None:
+                # A handful of products (a cart): score each one against every trigram
+                requested = np.unique(np.fromiter(product_ids, dtype=np.int64))
+                rows = np.searchsorted(self._ids, requested)
+                candidates = rows[(rows < total) & (self._ids[np.minimum(rows, total - 1)] == requested)]
+                candidates = candidates.astype(np.int32)  # the postings' dtype, so lookups don't copy them
+                scores = np.zeros(candidates.size)
+                rescore = present
+            else:
+                # Score names on the rare trigrams first: once the trigrams left can't lift an
+                # unseen name to `needed`, only names already scored can qualify. Common
+                # trigrams (' th', 'ing') are then looked up for the best of those alone
+                rare_df = max(self.max_df * total, 1)
+                done = 0
+                while done < present.size and (left >= needed or df[present[done]] <= rare_df):
+                    left -= idf[present[done]]
+                    done += 1
+                accumulated = present[:done]
+                postings = np.concatenate([self._postings[starts[t]:ends[t]] for t in accumulated])
+                all_scores = np.bincount(postings, weights=np.repeat(idf[accumulated], df[accumulated]),
+                                         minlength=total)
+                candidates = np.flatnonzero(all_scores >= max(needed - left, 1e-9)).astype(np.int32)
+                if candidates.size > self.max_candidates:
+                    best = np.argpartition(-all_scores[candidates], self.max_candidates)[:self.max_candidates]
+                    candidates = np.sort(candidates[best])
+                scores = all_scores[candidates]
+                rescore = present[done:]
+
+            if not candidates.size:
+                return []
+            for trigram in rescore:
+                scores = scores + idf[trigram] * self._contains(starts[trigram], ends[trigram], candidates)
+            confidence = scores / idf.sum()
+            order = np.lexsort((self._name_sizes[candidates], -confidence))[:limit]
+            return [(int(self._ids[candidates[i]]), round(float(confidence[i]), 3))
+                    for i in order if confidence[i] >= min_confidence]
+
+
+_build_lock = threading.Lock()
+_caches = []    # extensions dicts of the apps holding a name index
+
+def _on_catalog_change(upserted, deleted_ids):
+    for extensions in _caches:
+        index = extensions.get('name_index')
+        if index is None:
+            continue
+        if upserted or deleted_ids:
+            index.apply_changes(upserted, deleted_ids)
+        else:
+            # A bulk load or another process's write: reload the names on next use
+            extensions.pop('name_index', None)
+
+def get_name_index():
+    """Returns the app's product name index, building it from the database on first use."""
+    extensions = current_app.extensions
+    index = extensions.get('name_index')
+    if index is not None:
+        return index
+    with _build_lock:
+        index = extensions.get('name_index')
+        if index is None:
+            index = NameIndex()
+            index.build(db.session.query(Product.id, Product.name).yield_per(5000))
+            extensions['name_index'] = index
+            if not any(cache is extensions for cache in _caches):
+                _caches.append(extensions)
+            catalog_events.subscribe(_on_catalog_change)
+    return index
+
+def resolve_product_name(text, product_ids=None):
+    """
+    (product_id, confidence) of the product best matching a name the shopper
+    typed, or None when nothing reaches NAME_MATCH_MIN_CONFIDENCE.
+    """
+    matches = get_name_index().match(text, product_ids=product_ids,
+                                     min_confidence=current_app.config.get('NAME_MATCH_MIN_CONFIDENCE', 0.7))
+    return matches[0] if matches else None
@@ -0,0 +1,125 @@
+# app/services/pagination.py
+
+import base64
+import json
+import threading
+import time
+from flask import current_app
+from sqlalchemy import or_, tuple_
+from app import db
+from app.models.product import Product
+from app.services import catalog_events
+
+# Sortable columns. Each has a matching (column, id) composite index on Product
+# so both ORDER BY and the keyset predicate are served by one index range scan.
+SORT_COLUMNS = {
+    'id': Product.id,
+    'price': Product.price,
+    'rating': Product.rating,
+    'rating_count': Product.rating_count,
+    'discount_percentage': Product.discount_percentage,
+}
+
+def parse_sort(value):
+    """'price' -> ('price', False), '-rating' -> ('rating', True). Raises ValueError."""
+    value = (value or 'id').strip()
+    descending = value.startswith('-')
+    key = value.lstrip('-')
+    if key not in SORT_COLUMNS:
+        raise ValueError(f"Unsupported sort '{value}'. Use one of: {', '.join(SORT_COLUMNS)} (prefix '-' for descending).")
+    return key, descending
+
+def encode_cursor(sort_key, descending, value, last_id):
+    """Opaque token for the position after (value, last_id) in the given sort order."""
+    raw = json.dumps([sort_key, descending, value, last_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Returns (sort_key, descending, value, last_id). Raises ValueError for malformed tokens."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort_key, descending, value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid 'after' cursor.")
+    if sort_key not in SORT_COLUMNS or not isinstance(last_id, int):
+        raise ValueError("Invalid 'after' cursor.")
+    return sort_key, bool(descending), value, last_id
+
+def _nulls_low():
+    # SQLite and MySQL sort NULL before any value; Postgres sorts it after.
+    return db.session.get_bind(mapper=Product.__mapper__).dialect.name != 'postgresql'
+
+def apply_sort(query, sort_key, descending, use_index=True):
+    """
+    ORDER BY (column, id) with NULLs always treated as the smallest value.
+    Replaces any existing ordering, such as a search backend's relevance rank.
+    use_index=False orders by `column + 0` (same order), which keeps the
+    database from walking the sort index when a selective filter should
+    drive the query instead (see product_filters.plan_range_filters).
+    """
+    column = SORT_COLUMNS[sort_key]
+    id_column = Product.id
+    if not use_index:
+        column, id_column = column + 0, Product.id + 0
+    query = query.order_by(None)
+    if sort_key == 'id':
+        return query.order_by(id_column.desc() if descending else id_column.asc())
+    ordered = column.desc() if descending else column.asc()
+    if not _nulls_low():
+        ordered = ordered.nulls_last() if descending else ordered.nulls_first()
+    return query.order_by(ordered, id_column.desc() if descending else id_column.asc())
+
+def apply_keyset(query, sort_key, descending, value, last_id):
+    """Restricts `query` to rows strictly after (value, last_id) in the sort order."""
+    column = SORT_COLUMNS[sort_key]
+    if sort_key == 'id':
+        return query.filter(Product.id < last_id if descending else Product.id > last_id)
+    if value is None:
+        if descending:
+            # NULLs come last; only NULL rows with a smaller id remain
+            return query.filter(column.is_(None), Product.id < last_id)
+        return query.filter(or_(column.is_(None) & (Product.id > last_id), column.isnot(None)))
+    if descending:
+        return query.filter(or_(tuple_(column, Product.id) < tuple_(value, last_id), column.is_(None)))
+    return query.filter(tuple_(column, Product.id) > tuple_(value, last_id))
+
+def next_cursor(products, per_page, sort_key, descending):
+    """Cursor for the page after `products` (fetched with per_page + 1 rows), or None."""
+    if len(products) <= per_page:
+        return None
+    last = products[per_page - 1]
+    return encode_cursor(sort_key, descending, getattr(last, sort_key), last.id)
+
+
+#  Cached totals
+#  COUNT(*) over a large filter is a full scan; listings that only need an
+#  approximate total can reuse a recent value instead.
+
+MAX_CACHED_COUNTS = 1024
+_count_lock = threading.Lock()
+_count_caches = []
+
+def _clear_counts(upserted, deleted_ids):
+    for cache in _count_caches:
+        cache.clear()
+
+def cached_count(query, cache_key, ttl=None):
+    """Returns query.count(), reusing a value younger than COUNT_CACHE_TTL seconds."""
+    ttl = ttl if ttl is not None else current_app.config.get('COUNT_CACHE_TTL', 60)
+    cache = current_app.extensions.get('count_cache')
+    if cache is None:
+        with _count_lock:
+            cache = current_app.extensions.setdefault('count_cache', {})
+            if not any(existing is cache for existing in _count_caches):
+                _count_caches.append(cache)
+            catalog_events.subscribe(_clear_counts)
+
+    now = time.monotonic()
+    entry = cache.get(cache_key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    total = query.order_by(None).count()
+    if len(cache) >= MAX_CACHED_COUNTS:
+        cache.clear()
+    cache[cache_key] = (now + ttl, total)
+    return total
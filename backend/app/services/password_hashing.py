@@ -0,0 +1,206 @@
+# app/services/password_hashing.py
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import check_password_hash, generate_password_hash
+
+try:
+    from argon2 import PasswordHasher as Argon2Hasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError: # optional dependency, only needed for PASSWORD_HASH_ALGORITHM = 'argon2'
+    Argon2Hasher = None
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool's queue is full; auth routes answer 503."""
+
+
+def policy_from_config(config):
+    """The algorithm and cost parameters new hashes are made with."""
+    algorithm = config.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2')
+    if algorithm == 'pbkdf2':
+        return {'algorithm': 'pbkdf2', 'iterations': config.get('PASSWORD_HASH_PBKDF2_ITERATIONS', 600000)}
+    if algorithm == 'scrypt':
+        return {'algorithm': 'scrypt', 'n': config.get('PASSWORD_HASH_SCRYPT_N', 2 ** 15),
+                'r': config.get('PASSWORD_HASH_SCRYPT_R', 8), 'p': config.get('PASSWORD_HASH_SCRYPT_P', 1)}
+    if algorithm == 'argon2':
+        if Argon2Hasher is None:
+            raise RuntimeError("PASSWORD_HASH_ALGORITHM = 'argon2' needs the argon2-cffi package.")
+        return {'algorithm': 'argon2', 'time_cost': config.get('PASSWORD_HASH_ARGON2_TIME_COST', 3),
+                'memory_cost': config.get('PASSWORD_HASH_ARGON2_MEMORY_COST', 65536),
+                'parallelism': config.get('PASSWORD_HASH_ARGON2_PARALLELISM', 1)}
+    raise ValueError(f"Unknown PASSWORD_HASH_ALGORITHM: {algorithm}")
+
+def _werkzeug_method(policy):
+    if policy['algorithm'] == 'pbkdf2':
+        return f"pbkdf2:sha256:{policy['iterations']}"
+    return f"scrypt:{policy['n']}:{policy['r']}:{policy['p']}"
+
+def _argon2(policy):
+    return Argon2Hasher(time_cost=policy['time_cost'], memory_cost=policy['memory_cost'],
+                        parallelism=policy['parallelism'])
+
+
+#  Worker functions. Module level so the process pool can pickle them.
+
+def hash_password(password, policy):
+    if policy['algorithm'] == 'argon2':
+        return _argon2(policy).hash(password)
+    return generate_password_hash(password, method=_werkzeug_method(policy))
+
+def needs_rehash(stored_hash, policy):
+    """True when `stored_hash` wasn't made with the current algorithm and cost."""
+    if policy['algorithm'] == 'argon2':
+        return not stored_hash.startswith('$argon2') or _argon2(policy).check_needs_rehash(stored_hash)
+    # werkzeug hashes look like 'pbkdf2:sha256:600000$salt$hash' or 'scrypt:32768:8:1$salt$hash'
+    return stored_hash.split('$', 1)[0] != _werkzeug_method(policy)
+
+def verify_password(stored_hash, password, policy):
+    """
+    Returns (matches, new_hash). new_hash is set when the password matched but
+    the stored hash uses outdated parameters, so the caller can save it.
+    """
+    if stored_hash.startswith('$argon2'):
+        if Argon2Hasher is None:
+            return False, None
+        try:
+            matches = Argon2Hasher().verify(stored_hash, password)
+        except (VerificationError, InvalidHashError):
+            matches = False
+    else:
+        matches = check_password_hash(stored_hash, password)
+    if matches and needs_rehash(stored_hash, policy):
+        return True, hash_password(password, policy)
+    return matches, None
+
+
+def _in_worker():
+    """
+    True inside a pool worker, including while it re-imports the parent's
+    __main__ (the flag multiprocessing itself checks), where an unguarded
+    script's module-level hashing must not start a nested pool.
+    """
+    return multiprocessing.parent_process() is not None or \
+        getattr(multiprocessing.current_process(), '_inheriting', False)
+
+def _worker_context():
+    """Forkserver (spawn where unavailable) context whose server preloads this module alone."""
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+class PasswordHashingService:
+    """
+    Runs hashing on a bounded process pool so CPU-bound hashes never hold the
+    request threads' GIL. At most `max_pending` hashes may be queued or running;
+    callers wait up to `queue_timeout` seconds for a slot and then get
+    HashingBusy instead of piling up behind a login burst.
+    executor='inline' hashes in the calling thread (scripts, tests).
+    """
+
+    def __init__(self, policy, workers=2, max_pending=8, queue_timeout=0.5, executor='process'):
+        self.policy = policy
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.executor = executor
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._counter_lock = threading.Lock()
+        self.counters = {"pending": 0, "peak_pending": 0, "completed": 0, "failed": 0, "rejected": 0, "rehashed": 0,
+                         "total_seconds": 0.0}
+
+    def _get_pool(self):
+        # Created on first use, after any pre-fork of the web server. Workers are forked
+        # from a fresh forkserver process that has only this module loaded, so they
+        # don't inherit (and outlive the server holding) its listening socket. Like spawn,
+        # each worker still re-imports the parent's __main__ script, which is why the pool
+        # is only the default under APP_ENV=production (a server entry point such as gunicorn).
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_worker_context())
+        return self._pool
+
+    def _run(self, fn, *args):
+        if self.executor == 'inline' or _in_worker():
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._counter_lock:
+                self.counters["rejected"] += 1
+            raise HashingBusy("Too many password hashing requests in progress. Please retry shortly.")
+        started = time.perf_counter()
+        with self._counter_lock:
+            self.counters["pending"] += 1
+            self.counters["peak_pending"] = max(self.counters["peak_pending"], self.counters["pending"])
+        succeeded = False
+        pool = self._get_pool()
+        try:
+            result = pool.submit(fn, *args).result()
+            succeeded = True
+            return result
+        except BrokenProcessPool:
+            # A worker died; reap the broken pool and start a fresh one for the next call
+            with self._pool_lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            self._slots.release()
+            with self._counter_lock:
+                self.counters["pending"] -= 1
+                if succeeded:
+                    self.counters["completed"] += 1
+                    self.counters["total_seconds"] += time.perf_counter() - started
+                else:
+                    self.counters["failed"] += 1
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.policy)
+
+    def verify(self, stored_hash, password):
+        """Returns (matches, new_hash_or_None); see verify_password()."""
+        matches, new_hash = self._run(verify_password, stored_hash, password, self.policy)
+        if new_hash:
+            with self._counter_lock:
+                self.counters["rehashed"] += 1
+        return matches, new_hash
+
+    def stats(self):
+        with self._counter_lock:
+            data = dict(self.counters)
+        data["queued"] = max(0, data["pending"] - self.workers) # waiting for a pool process
+        data["mean_ms"] = round(data.pop("total_seconds") / data["completed"] * 1000, 2) if data["completed"] else None
+        data.update(algorithm=self.policy['algorithm'], executor=self.executor, workers=self.workers,
+                    max_pending=self.max_pending)
+        return data
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+
+def create_password_hashing_service(config):
+    """
+    PASSWORD_HASH_EXECUTOR defaults to 'process' under APP_ENV=production and to
+    'inline' elsewhere, so scripts, tests and the development server never run
+    their __main__ module again in pool workers.
+    """
+    workers = config.get('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1))
+    environment = config.get('APP_ENV') or os.environ.get('APP_ENV', 'development')
+    return PasswordHashingService(
+        policy_from_config(config),
+        workers=workers,
+        max_pending=config.get('PASSWORD_HASH_MAX_PENDING', workers * 4),
+        queue_timeout=config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 0.5),
+        executor=config.get('PASSWORD_HASH_EXECUTOR', 'process' if environment == 'production' else 'inline'),
+    )
@@ -0,0 +1,163 @@
+# app/services/product_filters.py
+
+import bisect
+import threading
+from collections import namedtuple
+from flask import current_app
+from app import db
+from app.models.product import Product
+from app.services import catalog_events
+
+# Range-filterable columns: query parameter suffix -> column. `min_<suffix>`
+# and `max_<suffix>` are inclusive bounds. Each column leads a (column, id)
+# index on Product, so a range can be answered with an index range scan.
+RANGE_COLUMNS = {
+    'price': Product.price,
+    'rating': Product.rating,
+    'rating_count': Product.rating_count,
+    'discount_percentage': Product.discount_percentage,
+}
+
+RangeFilter = namedtuple('RangeFilter', 'key low high')
+
+# Planned predicates, most selective first. sort_by_index=False means the page
+# should be sorted after filtering rather than read in index order (see plan_range_filters).
+RangePlan = namedtuple('RangePlan', 'filters sort_by_index')
+
+# Databases whose planners keep no value histograms, so they can't tell how selective a range is
+NO_HISTOGRAM_DIALECTS = ('sqlite', 'mysql')
+
+# Sample size for selectivity estimates; refreshed after catalog writes
+STATS_SAMPLE_SIZE = 2000
+
+
+def parse_range_filters(args):
+    """
+    Reads min_/max_ bounds from request args into RangeFilters (one per
+    column). Raises ValueError for non-numeric or inverted bounds.
+    """
+    filters = []
+    for key in RANGE_COLUMNS:
+        bounds = []
+        for prefix in ('min', 'max'):
+            raw = args.get(f'{prefix}_{key}')
+            if raw is None or raw == '':
+                bounds.append(None)
+                continue
+            try:
+                bounds.append(float(raw))
+            except ValueError:
+                raise ValueError(f"{prefix}_{key} must be a number.")
+        low, high = bounds
+        if low is not None and high is not None and low > high:
+            raise ValueError(f"min_{key} cannot be greater than max_{key}.")
+        if low is not None or high is not None:
+            filters.append(RangeFilter(key, low, high))
+    return filters
+
+
+#  Selectivity estimates
+#  A sorted sample of each column, so the planner can tell a narrow price band
+#  from a "rating >= 1" that matches nearly everything.
+
+_stats_lock = threading.Lock()
+_stats_caches = []
+
+def _invalidate(upserted, deleted_ids):
+    for extensions in _stats_caches:
+        extensions.pop('range_filter_stats', None)
+
+def column_samples():
+    """Sorted non-NULL sample values per range column, plus the sampled row count."""
+    extensions = current_app.extensions
+    samples = extensions.get('range_filter_stats')
+    if samples is not None:
+        return samples
+    with _stats_lock:
+        samples = extensions.get('range_filter_stats')
+        if samples is None:
+            total = db.session.query(db.func.count(Product.id)).scalar() or 0
+            step = max(1, total // STATS_SAMPLE_SIZE)
+            rows = db.session.query(*RANGE_COLUMNS.values()).filter(Product.id % step == 0).all()
+            samples = {
+                key: sorted(row[index] for row in rows if row[index] is not None)
+                for index, key in enumerate(RANGE_COLUMNS)
+            }
+            samples['_rows'] = len(rows)
+            samples['_total'] = total
+            extensions['range_filter_stats'] = samples
+            if not any(cache is extensions for cache in _stats_caches):
+                _stats_caches.append(extensions)
+            catalog_events.subscribe(_invalidate)
+    return samples
+
+def estimate_selectivity(range_filter, samples):
+    """Estimated fraction of products matching range_filter (NULLs never match)."""
+    values, rows = samples[range_filter.key], samples['_rows']
+    if not rows:
+        return 1.0
+    start = bisect.bisect_left(values, range_filter.low) if range_filter.low is not None else 0
+    end = bisect.bisect_right(values, range_filter.high) if range_filter.high is not None else len(values)
+    return max(end - start, 0) / rows
+
+
+def plan_range_filters(filters, sort_key=None, limit=None, samples=None):
+    """
+    Orders range predicates most selective first, so the query is driven from
+    the best (column, id) index; a range on the sort column wins when it is
+    nearly as selective, because its index also delivers the ORDER BY.
+
+    With a sort on another column and a LIMIT, reading the sort index in
+    order finds `limit` matches after about limit / selectivity rows, while
+    driving from the range reads selectivity * total rows and sorts them.
+    SQLite and MySQL can't estimate that selectivity and tend to walk the sort
+    index, which scans most of the table for a rare match, so the plan says
+    when to sort after filtering instead (sort_by_index=False).
+    """
+    if not filters:
+        return RangePlan([], True)
+    samples = samples if samples is not None else column_samples()
+    scored = [(estimate_selectivity(f, samples), f) for f in filters]
+
+    def _cost(item):
+        selectivity, range_filter = item
+        # Reading rows already in order is worth a few times more rows scanned
+        return selectivity / 4 if range_filter.key == sort_key else selectivity
+    scored.sort(key=_cost)
+    selectivity, driving = scored[0]
+
+    sort_by_index = True
+    if sort_key is not None and limit and driving.key != sort_key:
+        dialect = db.session.get_bind(mapper=Product.__mapper__).dialect.name
+        if dialect in NO_HISTOGRAM_DIALECTS:
+            sort_by_index = selectivity * selectivity * samples['_total'] >= limit
+    return RangePlan([range_filter for _, range_filter in scored], sort_by_index)
+
+def _range_predicate(column, range_filter):
+    if range_filter.low is not None and range_filter.high is not None:
+        return column.between(range_filter.low, range_filter.high)
+    if range_filter.low is not None:
+        return column >= range_filter.low
+    return column <= range_filter.high
+
+def range_predicates(filters, pin_first=False):
+    """
+    SQL predicates for planned RangeFilters. With pin_first, only the first
+    (driving) predicate compares the bare column; the others compare
+    `column + 0`, which no index can serve, so the planner can't wander off
+    to a less selective index.
+    """
+    predicates = []
+    for position, range_filter in enumerate(filters):
+        column = RANGE_COLUMNS[range_filter.key]
+        if pin_first and position > 0:
+            column = column + 0
+        predicates.append(_range_predicate(column, range_filter))
+    return predicates
+
+def apply_range_filters(query, plan):
+    """Adds a RangePlan's predicates to a Product query."""
+    if not plan.filters:
+        return query
+    dialect = db.session.get_bind(mapper=Product.__mapper__).dialect.name
+    return query.filter(*range_predicates(plan.filters, pin_first=dialect in NO_HISTOGRAM_DIALECTS))
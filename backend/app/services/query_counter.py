@@ -0,0 +1,26 @@
+# app/services/query_counter.py
+
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import db
+
+@contextmanager
+def count_queries(engine=None):
+    """
+    Records every SQL statement sent to `engine` (default: db.engine) inside the block.
+
+        with count_queries() as statements:
+            client.get('/api/cart', headers=auth)
+        assert len(statements) == 1, statements
+    """
+    engine = engine or db.engine
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', _record)
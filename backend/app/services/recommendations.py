@@ -0,0 +1,321 @@
+# app/services/recommendations.py
+"""
+Precomputed product recommendations.
+
+Two lists per product, stored in the product_recommendation table and read
+back by primary key (see ProductRecommendation):
+
+- 'similar': the products closest in category path, name tokens and price
+  band. Scored with NumPy one category group at a time, and inside large
+  groups only against neighbours in price order, so the job stays roughly
+  linear in the catalog size.
+- 'bought_together': products that share carts with it, by co-occurrence
+  count over CartItem.
+
+Run offline after bulk loads (`python -m app.services.recommendations`), and
+with --incremental after smaller changes: it only recomputes the products
+without a list, which includes products written since the last run (their
+lists are dropped as soon as the write commits).
+"""
+
+import math
+import time
+from collections import Counter, defaultdict
+import numpy as np
+from flask import current_app
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import aliased
+from app import db
+from app.models.cart import CartItem
+from app.models.product import PRODUCT_COLUMNS, Product
+from app.models.recommendation import ProductRecommendation
+from app.services import catalog_events
+from app.services.search_index import tokenize
+from app.services.taxonomy import CATEGORY_SEPARATOR
+
+SIMILAR = 'similar'
+BOUGHT_TOGETHER = 'bought_together'
+
+# Weights of the three similarity signals (each in [0, 1])
+SIMILARITY_WEIGHTS = {"category": 0.4, "name": 0.4, "price": 0.2}
+# Prices this many times apart get no price band credit
+PRICE_BAND_RATIO = 4.0
+# Products scored per block; each is compared with the block and half a block either side in price order
+SIMILARITY_BLOCK = 1024
+INSERT_CHUNK_ROWS = 5000
+
+
+#  Similar products
+
+def _category_groups(paths, min_size):
+    """
+    Group key per product: the deepest prefix of its category path shared by
+    at least `min_size` products, so products in small leaf categories are
+    compared with their siblings instead of having nothing to compare with.
+    """
+    prefix_counts = Counter()
+    split_paths = [tuple(path.split(CATEGORY_SEPARATOR)) if path else () for path in paths]
+    for segments in split_paths:
+        for depth in range(len(segments) + 1):
+            prefix_counts[segments[:depth]] += 1
+    keys = []
+    for segments in split_paths:
+        depth = len(segments)
+        while depth > 0 and prefix_counts[segments[:depth]] < min_size:
+            depth -= 1
+        keys.append(segments[:depth])
+    return split_paths, keys
+
+def _path_similarity(paths):
+    """Shared leading categories / the longer path's length, for every pair of distinct paths."""
+    similarity = np.zeros((len(paths), len(paths)), dtype=np.float32)
+    for i, a in enumerate(paths):
+        for j, b in enumerate(paths):
+            shared = 0
+            for x, y in zip(a, b):
+                if x != y:
+                    break
+                shared += 1
+            similarity[i, j] = shared / max(len(a), len(b), 1)
+    return similarity
+
+
+class _NameVectors:
+    """Binary TF-IDF name token vectors (unit length), densified for a few thousand rows at a time."""
+
+    def __init__(self, token_lists):
+        token_ids, indptr, indices = {}, [0], []
+        for tokens in token_lists:
+            for token in sorted(set(tokens)):
+                indices.append(token_ids.setdefault(token, len(token_ids)))
+            indptr.append(len(indices))
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        document_frequency = np.bincount(self.indices, minlength=len(token_ids))
+        idf = (np.log((1 + len(token_lists)) / (1 + document_frequency)) + 1).astype(np.float32)
+        weights = idf[self.indices]
+        row_of_entry = np.repeat(np.arange(len(token_lists)), np.diff(self.indptr))
+        norms = np.sqrt(np.bincount(row_of_entry, weights=weights * weights, minlength=len(token_lists)))
+        self.weights = (weights / norms[row_of_entry]).astype(np.float32)
+
+    def dense(self, positions):
+        """(len(positions) x local vocabulary) rows for the given products."""
+        starts, ends = self.indptr[positions], self.indptr[positions + 1]
+        lengths = ends - starts
+        entries = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)]) if lengths.any() \
+            else np.empty(0, dtype=np.int64)
+        vocabulary, columns = np.unique(self.indices[entries], return_inverse=True)
+        matrix = np.zeros((len(positions), len(vocabulary)), dtype=np.float32)
+        matrix[np.repeat(np.arange(len(positions)), lengths), columns] = self.weights[entries]
+        return matrix
+
+    def similarity(self, scored, candidates):
+        """Cosine similarity matrix (scored x candidates)."""
+        vectors = self.dense(np.concatenate([scored, candidates]))
+        return vectors[:len(scored)] @ vectors[len(scored):].T
+
+
+def compute_similar(rows, top_n=10, targets=None, block=SIMILARITY_BLOCK):
+    """
+    Yields (product_id, [(similar_id, score), ...] best first) from
+    (id, name, category, price) rows covering the catalog. Listings with the
+    product's own name (the same item sold twice) are skipped. With `targets`
+    (a set of product ids), only their lists are computed, against the same
+    candidates a full run would use.
+    """
+    rows = list(rows)
+    if len(rows) < 2:
+        return
+    ids = np.asarray([row[0] for row in rows], dtype=np.int64)
+    name_tokens = [tokenize(row[1]) for row in rows]
+    name_keys = [' '.join(tokens) for tokens in name_tokens]
+    names = _NameVectors(name_tokens)
+    split_paths, group_keys = _category_groups([row[2] for row in rows], min_size=top_n + 1)
+    distinct_paths = sorted(set(split_paths))
+    path_position = {path: i for i, path in enumerate(distinct_paths)}
+    path_index = np.asarray([path_position[path] for path in split_paths], dtype=np.int64)
+    path_similarity = _path_similarity(distinct_paths)
+    prices = np.asarray([np.nan if row[3] is None or row[3] <= 0 else row[3] for row in rows], dtype=np.float64)
+    log_prices = np.log(prices).astype(np.float32)
+    price_order = np.nan_to_num(log_prices, nan=np.inf)     # missing prices sort last
+    target_mask = np.isin(ids, list(targets)) if targets is not None else None
+
+    # Products scored in each group, and everything under the group's category
+    # prefix they are compared with (a product moved up to its parent category
+    # is compared with all of the parent's products)
+    assigned, members = defaultdict(list), defaultdict(list)
+    for position, key in enumerate(group_keys):
+        assigned[key].append(position)
+    for position, segments in enumerate(split_paths):
+        for depth in range(len(segments) + 1):
+            if segments[:depth] in assigned:
+                members[segments[:depth]].append(position)
+
+    weights = SIMILARITY_WEIGHTS
+    for key, scored_positions in assigned.items():
+        # Price order, so a window of neighbours shares a price band
+        scored_positions = np.asarray(scored_positions, dtype=np.int64)
+        scored_positions = scored_positions[np.argsort(price_order[scored_positions], kind='stable')]
+        group = np.asarray(members[key], dtype=np.int64)
+        group = group[np.argsort(price_order[group], kind='stable')]
+        if len(group) < 2:
+            continue
+        for start in range(0, len(scored_positions), block):
+            scored = scored_positions[start:start + block]
+            if target_mask is not None:
+                scored = scored[target_mask[scored]]
+                if not len(scored):
+                    continue
+            if len(group) <= 3 * block:
+                candidates = group
+            else:
+                low = np.searchsorted(price_order[group], price_order[scored[0]], side='left') - block // 2
+                high = np.searchsorted(price_order[group], price_order[scored[-1]], side='right') + block // 2
+                candidates = group[max(0, low):high]
+
+            name_similarity = names.similarity(scored, candidates)
+            category_similarity = path_similarity[np.ix_(path_index[scored], path_index[candidates])]
+            price_gap = np.abs(log_prices[scored][:, None] - log_prices[candidates][None, :])
+            price_similarity = np.nan_to_num(np.clip(1 - price_gap / np.float32(math.log(PRICE_BAND_RATIO)), 0, 1),
+                                             nan=0.0)
+            scores = (weights["name"] * name_similarity + weights["category"] * category_similarity
+                      + weights["price"] * price_similarity)
+            scores[scored[:, None] == candidates[None, :]] = -np.inf
+
+            # Twice the list length, to have spares for the duplicate listings dropped below
+            keep = min(2 * top_n, len(candidates) - 1)
+            best = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            order = np.argsort(-best_scores, axis=1, kind='stable')
+            best, best_scores = np.take_along_axis(best, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+            for row, position in enumerate(scored):
+                seen, similar = {name_keys[position]}, []
+                for column, score in zip(best[row], best_scores[row]):
+                    other = candidates[column]
+                    if name_keys[other] in seen:
+                        continue
+                    seen.add(name_keys[other])
+                    similar.append((int(ids[other]), float(score)))
+                    if len(similar) == top_n:
+                        break
+                yield int(ids[position]), similar
+
+
+#  Frequently bought together
+
+def compute_bought_together(top_n=10, min_carts=2):
+    """
+    {product_id: [(other_id, confidence), ...] best first} from products
+    sharing carts: confidence is the share of the product's carts that also
+    hold the other product. Pairs seen in fewer than `min_carts` carts are ignored.
+    """
+    item, other = aliased(CartItem), aliased(CartItem)
+    pair_counts = (
+        db.session.query(item.product_id, other.product_id, db.func.count())
+        .join(other, db.and_(other.cart_id == item.cart_id, other.product_id != item.product_id))
+        .group_by(item.product_id, other.product_id)
+        .having(db.func.count() >= min_carts)
+        .all()
+    )
+    cart_counts = dict(
+        db.session.query(CartItem.product_id, db.func.count(db.distinct(CartItem.cart_id)))
+        .group_by(CartItem.product_id).all()
+    )
+    lists = defaultdict(list)
+    for product_id, other_id, carts in pair_counts:
+        lists[product_id].append((other_id, carts / cart_counts[product_id]))
+    return {pid: sorted(pairs, key=lambda pair: (-pair[1], pair[0]))[:top_n] for pid, pairs in lists.items()}
+
+
+#  Storage
+
+def _write(connection, kind, lists, replace_ids=None):
+    """Replaces the stored lists of `kind`: all of them, or only those of `replace_ids`."""
+    table = ProductRecommendation.__table__
+    statement = delete(table).where(table.c.kind == kind)
+    if replace_ids is not None:
+        replace_ids = list(replace_ids)
+        for start in range(0, len(replace_ids), INSERT_CHUNK_ROWS):
+            connection.execute(statement.where(table.c.product_id.in_(replace_ids[start:start + INSERT_CHUNK_ROWS])))
+    else:
+        connection.execute(statement)
+    batch, written = [], 0
+    for product_id, recommended in lists:
+        written += 1
+        batch.extend({"product_id": product_id, "kind": kind, "rank": rank, "recommended_id": other_id,
+                      "score": score} for rank, (other_id, score) in enumerate(recommended))
+        if len(batch) >= INSERT_CHUNK_ROWS:
+            connection.execute(insert(table), batch)
+            batch = []
+    if batch:
+        connection.execute(insert(table), batch)
+    return written
+
+def refresh_recommendations(incremental=False):
+    """
+    Recomputes the stored recommendation lists. A full run replaces every
+    list; an incremental one computes 'similar' only for products without a
+    list and recounts 'bought_together' (one aggregate query either way).
+    Returns the number of products given each kind of list.
+    """
+    config = current_app.config
+    top_n = config.get('RECOMMENDATION_TOP_N', 10)
+    catalog = db.session.query(Product.id, Product.name, Product.category, Product.price).order_by(Product.id).all()
+    targets = None
+    if incremental:
+        listed = db.session.query(ProductRecommendation.product_id).filter(
+            ProductRecommendation.kind == SIMILAR, ProductRecommendation.rank == 0)
+        targets = {row.id for row in catalog} - {product_id for (product_id,) in listed}
+    bought_together = compute_bought_together(top_n, min_carts=config.get('RECOMMENDATION_MIN_CARTS', 2))
+
+    with db.engine.begin() as connection:
+        similar_count = _write(connection, SIMILAR, compute_similar(catalog, top_n, targets=targets),
+                               replace_ids=targets) if targets is None or targets else 0
+        together_count = _write(connection, BOUGHT_TOGETHER, bought_together.items())
+    return {SIMILAR: similar_count, BOUGHT_TOGETHER: together_count}
+
+def _on_catalog_change(upserted, deleted_ids):
+    # A changed product's 'similar' list is stale: drop it so the next
+    # incremental run recomputes it. Deleted products also leave other lists.
+    # (A bulk load reports no ids; run the job after it.)
+    changed = list(set(upserted) | set(deleted_ids))
+    if not changed:
+        return
+    table = ProductRecommendation.__table__
+    with db.engine.begin() as connection:
+        connection.execute(delete(table).where(table.c.kind == SIMILAR, table.c.product_id.in_(changed)))
+        if deleted_ids:
+            connection.execute(delete(table).where(table.c.product_id.in_(list(deleted_ids))))
+            connection.execute(delete(table).where(table.c.recommended_id.in_(list(deleted_ids))))
+
+catalog_events.subscribe(_on_catalog_change)
+
+
+#  Serving
+
+def recommended_products(product_id, kind, limit=10):
+    """The stored `kind` list of a product as plain product rows, best first: one primary key range read."""
+    return (
+        db.session.query(*PRODUCT_COLUMNS)
+        .join(ProductRecommendation, ProductRecommendation.recommended_id == Product.id)
+        .filter(ProductRecommendation.product_id == product_id, ProductRecommendation.kind == kind)
+        .order_by(ProductRecommendation.rank)
+        .limit(limit)
+        .all()
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Recompute the product recommendation tables.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only compute 'similar' lists for products that have none")
+    args = parser.parse_args()
+
+    from app import create_app
+    with create_app().app_context():
+        db.create_all()
+        started = time.perf_counter()
+        counts = refresh_recommendations(incremental=args.incremental)
+        print(f"Stored similar products for {counts[SIMILAR]} and bought-together lists for "
+              f"{counts[BOUGHT_TOGETHER]} products in {time.perf_counter() - started:.1f}s.")
@@ -0,0 +1,129 @@
+# app/services/replicas.py
+
+import itertools
+import threading
+import time
+from functools import wraps
+from flask import current_app
+from sqlalchemy import exc
+from app import db
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+# Errors that mean "this replica is unusable right now" (connection refused,
+# database missing or locked, pool exhausted) rather than a bug in the query.
+REPLICA_ERRORS = (exc.OperationalError, exc.InterfaceError, exc.TimeoutError)
+
+
+class ReplicaRouter:
+    """Round-robins reads over the replica binds, skipping replicas that recently failed."""
+
+    def __init__(self, bind_keys, retry_after=30):
+        self.bind_keys = list(bind_keys)
+        self.retry_after = retry_after
+        self._turn = itertools.count()
+        self._down_until = {}
+        self._lock = threading.Lock()
+        self.counters = {"replica_reads": 0, "fallbacks": 0}
+
+    def choose(self):
+        """A healthy replica bind key, or None to read from the primary."""
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.bind_keys)):
+                key = self.bind_keys[next(self._turn) % len(self.bind_keys)]
+                if self._down_until.get(key, 0) <= now:
+                    self.counters["replica_reads"] += 1
+                    return key
+        return None
+
+    def mark_down(self, key):
+        with self._lock:
+            self._down_until[key] = time.monotonic() + self.retry_after
+            self.counters["fallbacks"] += 1
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return dict(self.counters, replicas={
+                key: 'down' if self._down_until.get(key, 0) > now else 'up' for key in self.bind_keys
+            })
+
+
+def configure_replicas(app):
+    """
+    Registers every URI in SQLALCHEMY_REPLICA_URIS as a bind ('replica_1', ...)
+    so it gets an engine and pool like the primary. Call before configure_engine().
+    """
+    uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for number, uri in enumerate(uris, start=1):
+        binds[f'{REPLICA_BIND_PREFIX}{number}'] = uri
+    if uris:
+        app.config['SQLALCHEMY_BINDS'] = binds
+        app.extensions['replica_router'] = ReplicaRouter(
+            [f'{REPLICA_BIND_PREFIX}{number}' for number in range(1, len(uris) + 1)],
+            retry_after=app.config.get('REPLICA_RETRY_AFTER', 30),
+        )
+
+def run_on_replica(fn, *args, **kwargs):
+    """
+    Calls fn with db.session reads routed to a replica. If the replica fails,
+    it is skipped for REPLICA_RETRY_AFTER seconds and fn runs again on the
+    primary, so fn must be safe to repeat (read-only).
+    """
+    router = current_app.extensions.get('replica_router')
+    replica = router.choose() if router else None
+    session = db.session()
+    if replica is None or session.info.get('replica'):
+        return fn(*args, **kwargs) # no healthy replica, or already routed by an outer call
+
+    session.info['replica'] = replica
+    try:
+        return fn(*args, **kwargs)
+    except REPLICA_ERRORS as error:
+        session.rollback()
+        session.info['replica'] = None
+        router.mark_down(replica)
+        current_app.logger.warning("Replica %s failed (%s); reading from the primary.", replica, getattr(error, "orig", None) or error)
+        return fn(*args, **kwargs)
+    finally:
+        session.info['replica'] = None
+
+def iter_on_replica(fn, *args, **kwargs):
+    """
+    Generator version of run_on_replica for streamed responses: iterates
+    fn(*args, **kwargs) with reads routed to a replica. A replica failure
+    before the first item falls back to the primary; after that, items were
+    already sent, so the error is raised.
+    """
+    router = current_app.extensions.get('replica_router')
+    replica = router.choose() if router else None
+    session = db.session()
+    if replica is None or session.info.get('replica'):
+        yield from fn(*args, **kwargs)
+        return
+
+    session.info['replica'] = replica
+    started = False
+    try:
+        for item in fn(*args, **kwargs):
+            started = True
+            yield item
+    except REPLICA_ERRORS as error:
+        session.rollback()
+        session.info['replica'] = None
+        router.mark_down(replica)
+        if started:
+            raise
+        current_app.logger.warning("Replica %s failed (%s); reading from the primary.", replica, getattr(error, "orig", None) or error)
+        yield from fn(*args, **kwargs)
+    finally:
+        session.info['replica'] = None
+
+def read_only(view):
+    """Serves a read-only view from a replica when one is configured."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return run_on_replica(view, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,187 @@
+# app/services/response_cache.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, make_response, request
+from app.services import catalog_events
+
+
+class ResponseCache:
+    """
+    Rendered catalog responses keyed by (catalog version, normalized request).
+    The version starts at the process start time and is bumped on every product
+    write, so entries from an older catalog are never served again.
+    """
+
+    def __init__(self, max_age=60):
+        self.max_age = max_age
+        self._counter_lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    def _count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def version(self):
+        raise NotImplementedError
+
+    def bump(self):
+        raise NotImplementedError
+
+    def get(self, version, key):
+        """Returns (body, mimetype) or None."""
+        raise NotImplementedError
+
+    def set(self, version, key, body, mimetype):
+        raise NotImplementedError
+
+    def stats(self):
+        with self._counter_lock:
+            return dict(self.counters, backend=type(self).__name__, version=self.version())
+
+
+class MemoryResponseCache(ResponseCache):
+    """
+    Per-process LRU. Each worker has its own version, so ETags differ between
+    workers; writes made by other processes reach it through the shared
+    catalog version check (catalog_events.sync_version).
+    """
+
+    def __init__(self, max_entries=2048, max_age=60):
+        super().__init__(max_age)
+        self.max_entries = max_entries
+        self._version = int(time.time() * 1000)
+        self._entries = OrderedDict()   # (version, key) -> (body, mimetype)
+        self._lock = threading.Lock()
+
+    def version(self):
+        return self._version
+
+    def bump(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def get(self, version, key):
+        with self._lock:
+            entry = self._entries.get((version, key))
+            if entry is not None:
+                self._entries.move_to_end((version, key))
+            return entry
+
+    def set(self, version, key, body, mimetype):
+        with self._lock:
+            if version != self._version:
+                return # rendered from a catalog that changed meanwhile
+            self._entries[(version, key)] = (body, mimetype)
+            self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisResponseCache(ResponseCache):
+    """
+    Shared cache for multi-worker deployments. The catalog version lives in
+    Redis too, so every worker agrees on it and on ETags.
+    """
+
+    def __init__(self, url, ttl=300, max_age=60, prefix='catalog:'):
+        super().__init__(max_age)
+        import redis  # optional dependency, only needed for this backend
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client.setnx(f'{prefix}version', int(time.time() * 1000))
+
+    def version(self):
+        return int(self._client.get(f'{self.prefix}version') or 0)
+
+    def bump(self):
+        # Old entries become unreachable and expire on their own
+        self._client.incr(f'{self.prefix}version')
+
+    def get(self, version, key):
+        raw = self._client.get(f'{self.prefix}response:{version}:{key}')
+        if raw is None:
+            return None
+        mimetype, _, body = raw.partition(b'\n')
+        return body, mimetype.decode()
+
+    def set(self, version, key, body, mimetype):
+        self._client.setex(f'{self.prefix}response:{version}:{key}', self.ttl, mimetype.encode() + b'\n' + body)
+
+
+_caches = []
+
+def _bump_versions(upserted, deleted_ids):
+    for cache in _caches:
+        cache.bump()
+
+def create_response_cache(config):
+    """Builds the cache selected by RESPONSE_CACHE_BACKEND ('memory', 'redis' or 'none')."""
+    backend = config.get('RESPONSE_CACHE_BACKEND', 'memory')
+    max_age = config.get('RESPONSE_CACHE_MAX_AGE', 60)
+    if backend == 'none':
+        return None
+    if backend == 'redis':
+        cache = RedisResponseCache(config.get('RESPONSE_CACHE_REDIS_URL', 'redis://localhost:6379/0'),
+                                   ttl=config.get('RESPONSE_CACHE_TTL', 300), max_age=max_age)
+    elif backend == 'memory':
+        cache = MemoryResponseCache(max_entries=config.get('RESPONSE_CACHE_MAX_ENTRIES', 2048), max_age=max_age)
+    else:
+        raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend}")
+    _caches.append(cache)
+    catalog_events.subscribe(_bump_versions)
+    return cache
+
+
+def _request_key():
+    """Path plus sorted, non-empty query args, so equivalent URLs share an entry."""
+    args = sorted((k, v) for k, v in request.args.items(multi=True) if v != '')
+    return f'{request.path}?{urlencode(args)}'
+
+def _etag(version, key):
+    # Strong ETag: the body is fully determined by the catalog version and the request
+    return hashlib.sha1(f'{version}:{key}'.encode()).hexdigest()
+
+def cached_response(view):
+    """
+    Caches a catalog GET view's 200 responses and answers If-None-Match with
+    304 before the view (and the ORM) runs. Other statuses are never cached.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.response_cache
+        if cache is None:
+            return view(*args, **kwargs)
+
+        version = cache.version()
+        key = _request_key()
+        etag = _etag(version, key)
+        cache_control = f'public, max-age={cache.max_age}'
+
+        if etag in request.if_none_match:
+            cache._count("not_modified")
+            response = current_app.response_class(status=304)
+        else:
+            entry = cache.get(version, key)
+            if entry is not None:
+                cache._count("hits")
+                response = current_app.response_class(entry[0], mimetype=entry[1])
+                response.headers['X-Cache'] = 'HIT'
+            else:
+                cache._count("misses")
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                cache.set(version, key, response.get_data(), response.mimetype)
+                response.headers['X-Cache'] = 'MISS'
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        return response
+    return wrapper
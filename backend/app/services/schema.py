@@ -0,0 +1,108 @@
+# app/services/schema.py
+
+from collections import defaultdict
+from sqlalchemy import delete, exc, func, inspect, select, update
+from sqlalchemy.schema import CreateColumn
+from app import db
+from app.models.cart import CartItem
+
+def merge_duplicate_cart_items(connection):
+    """
+    Folds repeated (cart_id, product_id) rows, which carts written before
+    uq_cart_item_cart_product existed can hold, into the oldest row with the
+    summed quantity. Returns the number of rows removed.
+    """
+    table = CartItem.__table__
+    duplicated = select(table.c.cart_id, table.c.product_id).group_by(
+        table.c.cart_id, table.c.product_id).having(func.count() > 1).subquery()
+    rows = connection.execute(
+        select(table.c.id, table.c.cart_id, table.c.product_id, table.c.quantity)
+        .join(duplicated, (table.c.cart_id == duplicated.c.cart_id) & (table.c.product_id == duplicated.c.product_id))
+        .order_by(table.c.id)
+    ).all()
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row.cart_id, row.product_id].append(row)
+    removed = []
+    for keep, *extra in groups.values():
+        connection.execute(update(table).where(table.c.id == keep.id).values(
+            quantity=keep.quantity + sum(row.quantity for row in extra)))
+        removed += [row.id for row in extra]
+    if removed:
+        connection.execute(delete(table).where(table.c.id.in_(removed)))
+    return len(removed)
+
+def ensure_columns():
+    """
+    Adds nullable columns declared on the models that an existing table lacks
+    (create_all() never alters tables). Runs before ensure_indexes(), which may index them.
+    """
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            try:
+                with db.engine.begin() as connection:
+                    spec = CreateColumn(column).compile(dialect=connection.dialect)
+                    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {spec}")
+            except (exc.OperationalError, exc.ProgrammingError):
+                # Another worker starting at the same time may have added it first
+                if column.name not in {c['name'] for c in inspect(db.engine).get_columns(table.name)}:
+                    raise
+
+# Data fixes an index needs before it can be created on an existing database
+_BEFORE_INDEX = {'uq_cart_item_cart_product': merge_duplicate_cart_items}
+
+def ensure_indexes():
+    """
+    Creates any index declared on the models that is missing from an existing
+    database (tables that don't exist yet are skipped). db.create_all() only
+    creates missing tables, so indexes added to a model later need this. Like
+    ensure_columns(), it runs when the app starts (SCHEMA_CHECK_ON_STARTUP), from
+    seed_data.py and from `python -m app.services.schema`.
+    """
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                with db.engine.begin() as connection:
+                    if index.name in _BEFORE_INDEX:
+                        _BEFORE_INDEX[index.name](connection)
+                    index.create(connection)
+            except (exc.OperationalError, exc.ProgrammingError):
+                # Another worker starting at the same time may have created it first
+                if index.name not in {i['name'] for i in inspect(db.engine).get_indexes(table.name)}:
+                    raise
+
+def analyze_tables():
+    """
+    Refreshes the planner's table and index statistics (SQLite only records
+    them on ANALYZE), so range filters pick the most selective index.
+    Run after bulk loads.
+    """
+    with db.engine.begin() as connection:
+        if connection.dialect.name == 'mysql':
+            for table in db.metadata.sorted_tables:
+                connection.exec_driver_sql(f"ANALYZE TABLE {table.name}")
+        else:
+            connection.exec_driver_sql("ANALYZE")
+
+if __name__ == "__main__":
+    from app import create_app
+    with create_app().app_context():
+        db.create_all()
+        ensure_columns()
+        ensure_indexes()
+        analyze_tables()
+        print("Schema is up to date.")
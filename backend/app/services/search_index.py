@@ -0,0 +1,217 @@
+# app/services/search_index.py
+
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+from flask import current_app
+from app import db
+from app.models.product import Product
+from app.services import catalog_events
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Field weights: a keyword in the product name counts more than one buried in the description.
+FIELD_WEIGHTS = {"name": 3, "category": 2, "description": 1}
+
+def normalize_token(token):
+    """Very small plural folding so 'laptops' and 'laptop' share a posting list."""
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+def tokenize(text):
+    """Splits free text into normalized index terms."""
+    if not text:
+        return []
+    return [normalize_token(t) for t in _TOKEN_RE.findall(text.lower())]
+
+
+class InvertedIndex:
+    """
+    Term -> posting list (product id -> weighted term frequency) over
+    Product.name, category and description, ranked with BM25.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, max_prefix_terms=50):
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_terms = max_prefix_terms
+        self._postings = {}     # term -> {product_id: tf}
+        self._doc_terms = {}    # product_id -> Counter(term -> tf), needed for incremental removal
+        self._doc_len = {}      # product_id -> weighted document length
+        self._total_len = 0
+        self._vocab = []        # sorted terms, rebuilt lazily for prefix lookups
+        self._vocab_dirty = True
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._doc_len)
+
+    #  Building / incremental maintenance
+
+    def _terms_for(self, product):
+        terms = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(product.get(field)):
+                terms[term] += weight
+        return terms
+
+    def add(self, product):
+        """Indexes (or re-indexes) a product given as a dict with id/name/category/description."""
+        product_id = product["id"]
+        terms = self._terms_for(product)
+        with self._lock:
+            self._remove_locked(product_id)
+            for term, tf in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    self._vocab_dirty = True
+                postings[product_id] = tf
+            doc_len = sum(terms.values())
+            self._doc_terms[product_id] = terms
+            self._doc_len[product_id] = doc_len
+            self._total_len += doc_len
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove_locked(product_id)
+
+    def _remove_locked(self, product_id):
+        terms = self._doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._vocab_dirty = True
+        self._total_len -= self._doc_len.pop(product_id, 0)
+
+    def apply_changes(self, upserted, deleted_ids):
+        """catalog_events subscriber: keeps the index in step with committed product writes."""
+        with self._lock:
+            for product_id in deleted_ids:
+                self._remove_locked(product_id)
+            for product in upserted.values():
+                self.add(product)
+
+    def build(self, rows):
+        """Bulk-loads the index from an iterable of (id, name, category, description) rows."""
+        with self._lock:
+            for product_id, name, category, description in rows:
+                self.add({"id": product_id, "name": name, "category": category, "description": description})
+
+    #  Querying
+
+    def _postings_for(self, term):
+        """Exact posting list, or the union over vocabulary terms starting with `term`."""
+        postings = self._postings.get(term)
+        if postings is not None:
+            return postings
+        if self._vocab_dirty:
+            self._vocab = sorted(self._postings)
+            self._vocab_dirty = False
+        merged = {}
+        start = bisect_left(self._vocab, term)
+        for vocab_term in self._vocab[start:start + self.max_prefix_terms]:
+            if not vocab_term.startswith(term):
+                break
+            for product_id, tf in self._postings[vocab_term].items():
+                merged[product_id] = max(tf, merged.get(product_id, 0))
+        return merged
+
+    def _match_locked(self, keywords):
+        """(ids of products containing every keyword, the keywords' posting lists)."""
+        terms = list(dict.fromkeys(t for kw in keywords for t in tokenize(kw)))
+        if not terms:
+            return set(), []
+        posting_lists = [self._postings_for(term) for term in terms]
+        if any(not postings for postings in posting_lists):
+            return set(), []
+
+        # Intersect starting from the rarest term so the candidate set shrinks fastest.
+        posting_lists.sort(key=len)
+        candidates = set(posting_lists[0])
+        for postings in posting_lists[1:]:
+            candidates = {pid for pid in candidates if pid in postings}
+            if not candidates:
+                break
+        return candidates, posting_lists
+
+    def matching_ids(self, keywords):
+        """Ids of every product containing all keywords, unranked (cheaper than search(limit=None))."""
+        with self._lock:
+            return self._match_locked(keywords)[0]
+
+    def search(self, keywords, limit=20):
+        """
+        Returns [(product_id, score), ...] for products containing every keyword,
+        best BM25 score first. `limit=None` returns all matches.
+        """
+        with self._lock:
+            candidates, posting_lists = self._match_locked(keywords)
+            if not candidates:
+                return []
+
+            total_docs = len(self._doc_len)
+            avg_len = (self._total_len / total_docs) if total_docs else 1.0
+            k1, b = self.k1, self.b
+            idfs = [math.log(1 + (total_docs - len(p) + 0.5) / (len(p) + 0.5)) for p in posting_lists]
+
+            scored = []
+            for pid in candidates:
+                norm = k1 * (1 - b + b * self._doc_len.get(pid, avg_len) / avg_len)
+                score = 0.0
+                for idf, postings in zip(idfs, posting_lists):
+                    tf = postings[pid]
+                    score += idf * tf * (k1 + 1) / (tf + norm)
+                scored.append((score, pid))
+
+        if limit is None:
+            scored.sort(reverse=True)
+        else:
+            scored = heapq.nlargest(limit, scored)
+        return [(pid, score) for score, pid in scored]
+
+
+_build_lock = threading.Lock()
+_caches = []    # extensions dicts of the apps holding a product index
+
+def _on_catalog_change(upserted, deleted_ids):
+    for extensions in _caches:
+        index = extensions.get('product_index')
+        if index is None:
+            continue
+        if upserted or deleted_ids:
+            index.apply_changes(upserted, deleted_ids)
+        else:
+            # A bulk load or another process's write: rebuild from the database on next use
+            extensions.pop('product_index', None)
+
+def get_product_index():
+    """Returns the app's product index, building it from the database on first use."""
+    extensions = current_app.extensions
+    index = extensions.get('product_index')
+    if index is not None:
+        return index
+    with _build_lock:
+        index = extensions.get('product_index')
+        if index is None:
+            index = InvertedIndex()
+            rows = db.session.query(
+                Product.id, Product.name, Product.category, Product.description
+            ).yield_per(2000)
+            index.build(rows)
+            extensions['product_index'] = index
+            if not any(cache is extensions for cache in _caches):
+                _caches.append(extensions)
+            catalog_events.subscribe(_on_catalog_change)
+    return index
@@ -0,0 +1,487 @@
+# app/services/semantic_index.py
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import numpy as np
+from flask import current_app
+from app import db
+from app.models.product import Product
+from app.services import catalog_events
+from app.services.search_index import FIELD_WEIGHTS, tokenize
+
+try:
+    import fcntl
+except ImportError: # Windows: builds by several processes aren't serialized
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+# Words that carry no product meaning in shopper phrasing ("something for my phone")
+STOP_WORDS = frozenset("""
+    a an and any are as at be best buy can cheap do find for from get good have how i in is it looking me my need
+    of old on one or order please show some something that the this to today want what when where which who why
+    with you your
+""".split())
+
+INDEX_FILES = ('vectors.npy', 'ids.npy', 'basis.npy', 'vocabulary.json')
+SCORE_CHUNK_ROWS = 262144   # rows of the memory-mapped matrix scored per matmul
+# Catching up re-reads products updated this many seconds before the last sync,
+# since updated_at values come from the clocks of several processes
+CATCH_UP_OVERLAP = 5
+
+
+def _title_terms(name, category):
+    return {t for text in (name, (category or '').replace('|', ' ')) for t in tokenize(text)}
+
+def _document_terms(name, category, description):
+    terms = Counter()
+    for field, text in (("name", name), ("category", (category or '').replace('|', ' ')), ("description", description)):
+        for term in tokenize(text):
+            if term not in STOP_WORDS:
+                terms[term] += FIELD_WEIGHTS[field]
+    return terms
+
+
+class _SparseRows:
+    """Just enough CSR matrix (rows of term weights) for the SVD and for projections."""
+
+    def __init__(self, indptr, indices, data, n_cols):
+        self.indptr, self.indices, self.data, self.n_cols = indptr, indices, data, n_cols
+        self.n_rows = len(indptr) - 1
+        self._csc = None
+
+    def dot(self, dense):
+        """self @ dense"""
+        return _segment_sums(self.indptr, self.indices, self.data, dense)
+
+    def tdot(self, dense):
+        """self.T @ dense, through a column-major copy built on first use"""
+        if self._csc is None:
+            order = np.argsort(self.indices, kind='stable')
+            rows = np.repeat(np.arange(self.n_rows), np.diff(self.indptr))[order]
+            colptr = np.concatenate(([0], np.cumsum(np.bincount(self.indices, minlength=self.n_cols))))
+            self._csc = (colptr, rows, self.data[order])
+        return _segment_sums(*self._csc, dense)
+
+
+def _segment_sums(ptr, gather, weights, dense, max_nnz=1 << 20):
+    """
+    out[i] = sum(weights[j] * dense[gather[j]] for j in ptr[i]:ptr[i+1]), in
+    blocks of about max_nnz nonzeros so the gathered rows stay small.
+    """
+    segments = len(ptr) - 1
+    out = np.zeros((segments, dense.shape[1]), dtype=np.float32)
+    dense = np.asarray(dense, dtype=np.float32)
+    first = 0
+    while first < segments:
+        last = max(first + 1, int(np.searchsorted(ptr, ptr[first] + max_nnz, side='right')) - 1)
+        last = min(last, segments)
+        lo, hi = ptr[first], ptr[last]
+        if hi > lo:
+            starts = ptr[first:last] - lo
+            nonempty = np.diff(ptr[first:last + 1]) > 0
+            products = weights[lo:hi, None] * dense[gather[lo:hi]]
+            out[first:last][nonempty] = np.add.reduceat(products, starts[nonempty], axis=0)
+        first = last
+    return out
+
+
+def _randomized_svd_basis(matrix, dims, power_iterations=2, oversample=10, seed=0):
+    """Top-`dims` right singular vectors (terms x dims) of `matrix` (Halko et al., randomized range finder)."""
+    rng = np.random.default_rng(seed)
+    width = min(dims + oversample, matrix.n_cols, matrix.n_rows)
+    sample = matrix.dot(rng.standard_normal((matrix.n_cols, width), dtype=np.float32))
+    for _ in range(power_iterations):
+        sample, _ = np.linalg.qr(sample)
+        sample, _ = np.linalg.qr(matrix.dot(matrix.tdot(sample)))
+    basis, _ = np.linalg.qr(sample)
+    _, _, right = np.linalg.svd(matrix.tdot(basis).T, full_matrices=False)
+    return right[:dims].T
+
+
+class SemanticIndex:
+    """
+    LSI-style dense product vectors: TF-IDF over the product text, reduced to
+    `dims` dimensions with a truncated SVD. Vectors are unit length, so a dot
+    product is the cosine similarity. The matrix is memory-mapped from disk;
+    products added or changed after the build are folded in with the same
+    term basis and kept in a small in-memory overlay. `synced_through` is the
+    latest Product.updated_at the index reflects.
+    """
+
+    def __init__(self, ids, vectors, basis, terms, idf, title_terms=(), synced_through=None):
+        self.ids = ids                      # sorted product ids, aligned with vector rows
+        self.vectors = vectors              # (products x dims) float32, usually a memmap
+        self.basis = basis                  # (terms x dims) float32
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.idf = idf
+        self.title_terms = set(title_terms) # terms seen in some product name or category
+        self.synced_through = synced_through
+        self.source_mtime = None            # vocabulary.json's mtime when loaded from or saved to disk
+        self._dead = np.zeros(len(ids), dtype=bool)     # rows replaced by the overlay or deleted
+        self._overlay = {}                              # product id -> folded-in vector
+        self._overlay_matrix = None
+        self._lock = threading.Lock()
+
+    @property
+    def dims(self):
+        return self.basis.shape[1]
+
+    def __len__(self):
+        return int(len(self.ids) - self._dead.sum() + len(self._overlay))
+
+    #  Building
+
+    @classmethod
+    def build(cls, rows, dims=128, min_df=2, max_terms=20000, fit_sample=20000, seed=0):
+        """
+        Builds the index from (id, name, category, description) rows. The SVD
+        is fitted on at most `fit_sample` products; every product is then
+        projected onto the fitted basis.
+        """
+        ids, docs = [], []
+        document_frequency = Counter()
+        title_terms = set()
+        for product_id, name, category, description in rows:
+            terms = _document_terms(name, category, description)
+            ids.append(product_id)
+            docs.append(terms)
+            document_frequency.update(terms.keys())
+            title_terms |= _title_terms(name, category)
+
+        vocabulary = [t for t, df in document_frequency.most_common(max_terms) if df >= min_df]
+        vocabulary.sort()
+        term_ids = {term: i for i, term in enumerate(vocabulary)}
+        idf = np.array([math.log((1 + len(docs)) / (1 + document_frequency[t])) + 1 for t in vocabulary],
+                       dtype=np.float32)
+
+        order = np.argsort(np.asarray(ids, dtype=np.int64), kind='stable')
+        ids = np.asarray(ids, dtype=np.int64)[order]
+        docs = [docs[i] for i in order]
+        matrix = _tfidf_rows(docs, term_ids, idf)
+
+        dims = max(1, min(dims, len(vocabulary), len(docs)))
+        if len(docs) > fit_sample:
+            sample = np.sort(np.random.default_rng(seed).choice(len(docs), fit_sample, replace=False))
+            fit_matrix = _tfidf_rows([docs[i] for i in sample], term_ids, idf)
+        else:
+            fit_matrix = matrix
+        basis = _randomized_svd_basis(fit_matrix, dims, seed=seed).astype(np.float32) if vocabulary \
+            else np.zeros((0, dims), dtype=np.float32)
+        return cls(ids, _normalize(matrix.dot(basis)), basis, vocabulary, idf,
+                   title_terms=title_terms.intersection(term_ids))
+
+    def save(self, directory):
+        """Writes the index files (atomically replacing older ones; live memmaps keep the old data)."""
+        os.makedirs(directory, exist_ok=True)
+        vocabulary = {"terms": sorted(self.term_ids, key=self.term_ids.get), "idf": self.idf.tolist(),
+                      "title_terms": sorted(self.title_terms), "built_at": time.time(),
+                      "synced_through": self.synced_through.isoformat() if self.synced_through else None}
+        for name, write in (
+            ('vectors.npy', lambda f: np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32))),
+            ('ids.npy', lambda f: np.save(f, self.ids)),
+            ('basis.npy', lambda f: np.save(f, self.basis)),
+            ('vocabulary.json', lambda f: f.write(json.dumps(vocabulary).encode())),
+        ):
+            path = os.path.join(directory, name)
+            temporary = f'{path}.{os.getpid()}.tmp' # never shared with another process's save
+            with open(temporary, 'wb') as handle:
+                write(handle)
+            os.replace(temporary, path)
+        self.source_mtime = os.path.getmtime(os.path.join(directory, 'vocabulary.json'))
+
+    @classmethod
+    def load(cls, directory):
+        """Opens a saved index, memory-mapping the product vectors. None if it was never built."""
+        if not all(os.path.exists(os.path.join(directory, name)) for name in INDEX_FILES):
+            return None
+        source_mtime = os.path.getmtime(os.path.join(directory, 'vocabulary.json'))
+        with open(os.path.join(directory, 'vocabulary.json')) as handle:
+            vocabulary = json.load(handle)
+        synced_through = vocabulary.get("synced_through")
+        index = cls(
+            np.load(os.path.join(directory, 'ids.npy')),
+            np.load(os.path.join(directory, 'vectors.npy'), mmap_mode='r'),
+            np.load(os.path.join(directory, 'basis.npy')),
+            vocabulary["terms"], np.asarray(vocabulary["idf"], dtype=np.float32),
+            title_terms=vocabulary.get("title_terms", ()),
+            synced_through=datetime.fromisoformat(synced_through) if synced_through else None,
+        )
+        index.source_mtime = source_mtime
+        return index
+
+    #  Incremental maintenance
+
+    def fold_in(self, documents):
+        """Unit vectors for {product_id: Counter of terms} in the existing basis (new words are ignored)."""
+        product_ids = list(documents)
+        matrix = _tfidf_rows([documents[pid] for pid in product_ids], self.term_ids, self.idf)
+        return dict(zip(product_ids, _normalize(matrix.dot(self.basis))))
+
+    def apply_changes(self, upserted, deleted_ids):
+        """catalog_events subscriber: folds changed products into the overlay and hides deleted ones."""
+        vectors = self.fold_in({
+            pid: _document_terms(p.get("name"), p.get("category"), p.get("description"))
+            for pid, p in upserted.items()
+        }) if upserted else {}
+        with self._lock:
+            changed = set(upserted) | set(deleted_ids)
+            positions = np.searchsorted(self.ids, np.fromiter(changed, dtype=np.int64))
+            positions = positions[positions < len(self.ids)]
+            self._dead = self._dead.copy()
+            self._dead[positions[np.isin(self.ids[positions], list(changed))]] = True
+            for product_id in deleted_ids:
+                self._overlay.pop(product_id, None)
+            self._overlay.update(vectors)
+            self._overlay_matrix = None
+            for p in upserted.values():
+                self.title_terms |= _title_terms(p.get("name"), p.get("category")).intersection(self.term_ids)
+
+    def known_ids(self):
+        """Sorted ids of the products the index currently answers for."""
+        with self._lock:
+            base = self.ids[~self._dead]
+            overlay = np.fromiter(self._overlay, dtype=np.int64, count=len(self._overlay))
+        return np.union1d(base, overlay)
+
+    #  Querying
+
+    def _query_terms(self, text_or_terms):
+        words = text_or_terms if isinstance(text_or_terms, (list, tuple)) else [text_or_terms]
+        return Counter(t for word in words for t in tokenize(word) if t not in STOP_WORDS)
+
+    def names_products(self, text_or_terms):
+        """
+        Whether the query uses a word from some product name or category, as
+        opposed to words only found in descriptions ("weather", "today"). A
+        cheap guard before treating free-form chat as a product search.
+        """
+        return any(term in self.title_terms for term in self._query_terms(text_or_terms))
+
+    def query_vector(self, text_or_terms):
+        """Unit query vector for free text or a list of words (None when no word is known)."""
+        terms = self._query_terms(text_or_terms)
+        known = {t: tf for t, tf in terms.items() if t in self.term_ids}
+        if not known:
+            return None
+        vector = _normalize(_tfidf_rows([known], self.term_ids, self.idf).dot(self.basis))[0]
+        return vector if vector.any() else None
+
+    def top_k(self, queries, k=20, min_score=0.0):
+        """
+        Batched cosine top-k: for each query vector (rows of `queries`), the
+        [(product_id, score), ...] of the k most similar products scoring at
+        least min_score, best first. The matrix is scored in chunks, so memory
+        stays bounded however large the catalog is.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            dead, overlay, overlay_matrix = self._dead, self._overlay, self._overlay_matrix
+            if overlay and overlay_matrix is None:
+                overlay_ids = np.fromiter(overlay, dtype=np.int64)
+                overlay_matrix = self._overlay_matrix = (overlay_ids, np.stack([overlay[i] for i in overlay_ids]))
+
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        chunks = [(self.ids[s:s + SCORE_CHUNK_ROWS], self.vectors[s:s + SCORE_CHUNK_ROWS], dead[s:s + SCORE_CHUNK_ROWS])
+                  for s in range(0, len(self.ids), SCORE_CHUNK_ROWS)]
+        if overlay_matrix is not None:
+            chunks.append((overlay_matrix[0], overlay_matrix[1], None))
+        for ids, vectors, chunk_dead in chunks:
+            scores = np.asarray(vectors, dtype=np.float32) @ queries.T      # (rows x queries)
+            if chunk_dead is not None and chunk_dead.any():
+                scores[chunk_dead] = -np.inf
+            keep = min(k, len(ids))
+            top = np.argpartition(-scores, keep - 1, axis=0)[:keep].T if keep else np.empty((len(queries), 0), int)
+            best_ids = np.concatenate([best_ids, ids[top]], axis=1)
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores.T, top, axis=1)], axis=1)
+
+        results = []
+        for row_ids, row_scores in zip(best_ids, best_scores):
+            ranked = np.argsort(-row_scores, kind='stable')[:k]
+            results.append([(int(row_ids[i]), float(row_scores[i])) for i in ranked if row_scores[i] >= min_score])
+        return results
+
+    def search(self, text_or_terms, limit=20, min_score=0.0):
+        """[(product_id, score), ...] most similar to a query, best first."""
+        vector = self.query_vector(text_or_terms)
+        if vector is None:
+            return []
+        return self.top_k(vector, k=limit, min_score=min_score)[0]
+
+
+def _tfidf_rows(documents, term_ids, idf):
+    """Sublinear-tf TF-IDF rows, L2-normalized, for Counters of terms."""
+    indptr, indices, data = [0], [], []
+    for terms in documents:
+        row = sorted((term_ids[t], tf) for t, tf in terms.items() if t in term_ids)
+        weights = [(1 + math.log(tf)) * idf[i] for i, tf in row]
+        norm = math.sqrt(sum(w * w for w in weights)) or 1.0
+        indices.extend(i for i, _ in row)
+        data.extend(w / norm for w in weights)
+        indptr.append(len(indices))
+    return _SparseRows(np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int64),
+                       np.asarray(data, dtype=np.float32), len(term_ids))
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def index_directory(app=None):
+    app = app or current_app
+    return app.config.get('SEMANTIC_INDEX_DIR') or os.path.join(app.instance_path, 'semantic')
+
+def _latest_update():
+    return db.session.query(db.func.max(Product.updated_at)).scalar()
+
+def _index_rows(query):
+    return query.with_entities(Product.id, Product.name, Product.category, Product.description)
+
+def catch_up(index):
+    """
+    Brings a loaded index up to the database: folds in the products updated
+    since `synced_through` (or added without an updated_at, like COPY loads)
+    and drops deleted ones. Returns the number of products changed.
+    """
+    latest = _latest_update() # read first: anything written meanwhile is caught next time
+    changed = {}
+    updated = Product.query.filter(Product.updated_at.isnot(None))
+    if index.synced_through is not None:
+        updated = updated.filter(Product.updated_at >= index.synced_through - timedelta(seconds=CATCH_UP_OVERLAP))
+    for product_id, name, category, description in _index_rows(updated).yield_per(5000):
+        changed[product_id] = {"name": name, "category": category, "description": description}
+
+    stored_ids = np.fromiter((product_id for (product_id,) in
+                              db.session.query(Product.id).order_by(Product.id).yield_per(50000)), dtype=np.int64)
+    known_ids = index.known_ids()
+    added = [int(product_id) for product_id in np.setdiff1d(stored_ids, known_ids) if int(product_id) not in changed]
+    for start in range(0, len(added), 5000):
+        chunk = Product.query.filter(Product.id.in_(added[start:start + 5000]))
+        for product_id, name, category, description in _index_rows(chunk):
+            changed[product_id] = {"name": name, "category": category, "description": description}
+    deleted = {int(product_id) for product_id in np.setdiff1d(known_ids, stored_ids)}
+
+    if changed or deleted:
+        index.apply_changes(changed, deleted)
+    index.synced_through = latest
+    return len(changed) + len(deleted)
+
+@contextmanager
+def _exclusive_build(directory):
+    """Serializes index builds across the processes sharing `directory`."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'build.lock'), 'w') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX) # released when the file is closed
+        yield
+
+def _build_and_save(directory):
+    config = current_app.config
+    started = time.perf_counter()
+    synced_through = _latest_update() # before reading rows, so later writes are caught up on
+    rows = _index_rows(Product.query).yield_per(5000)
+    index = SemanticIndex.build(rows, dims=config.get('SEMANTIC_DIMENSIONS', 128),
+                                fit_sample=config.get('SEMANTIC_FIT_SAMPLE', 20000))
+    index.synced_through = synced_through
+    index.save(directory)
+    log.info("Built semantic index of %d products in %.1fs", len(index), time.perf_counter() - started)
+    return index
+
+def build_semantic_index(directory=None):
+    """Builds the index from the database and saves it (the offline step; run after bulk loads)."""
+    directory = directory or index_directory()
+    with _exclusive_build(directory):
+        return _build_and_save(directory)
+
+
+_load_lock = threading.Lock()
+_caches = []    # extensions dicts of the apps holding a loaded semantic index
+
+def _on_catalog_change(upserted, deleted_ids):
+    for extensions in _caches:
+        index = extensions.get('semantic_index')
+        if index is None:
+            continue
+        if upserted or deleted_ids:
+            index.apply_changes(upserted, deleted_ids)
+        else:
+            # A bulk load (seed_data.py) or another process's write only says "anything
+            # may have changed": catch up from the database on next use
+            extensions['semantic_index_behind'] = True
+
+def _saved_mtime(directory):
+    path = os.path.join(directory, 'vocabulary.json')
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+def _load_or_build(directory):
+    """The index saved in `directory`; a missing one is built first if SEMANTIC_INDEX_AUTOBUILD is on."""
+    index = SemanticIndex.load(directory)
+    if index is not None or not current_app.config.get('SEMANTIC_INDEX_AUTOBUILD', False):
+        return index
+    with _exclusive_build(directory):
+        # Another worker may have built it while this one waited for the lock
+        return SemanticIndex.load(directory) or _build_and_save(directory)
+
+def _is_current(extensions):
+    if extensions.get('semantic_index') is not None:
+        return not extensions.get('semantic_index_behind')
+    missing_at = extensions.get('semantic_index_missing_at')
+    return missing_at is not None and \
+        time.monotonic() - missing_at < current_app.config.get('SEMANTIC_INDEX_RECHECK_INTERVAL', 60)
+
+def get_semantic_index():
+    """
+    The app's semantic index, loaded from SEMANTIC_INDEX_DIR (instance/semantic)
+    on first use and kept up to date: products written in this process are
+    folded in on commit; after changes made elsewhere (other workers,
+    seed_data.py) a newer build on disk is loaded, and products updated since
+    the index was synced are folded in. None while no index has been built:
+    build it offline with `python -m app.services.semantic_index` (seed_data.py
+    does after loading); it is looked for again every SEMANTIC_INDEX_RECHECK_INTERVAL
+    seconds (default 60). SEMANTIC_INDEX_AUTOBUILD (default off) builds it in the request instead.
+    """
+    extensions = current_app.extensions
+    if _is_current(extensions):
+        return extensions.get('semantic_index')
+    with _load_lock:
+        if _is_current(extensions):
+            return extensions.get('semantic_index')
+        directory = index_directory()
+        index = extensions.get('semantic_index')
+        if index is None or index.source_mtime != _saved_mtime(directory):
+            index = _load_or_build(directory) or index
+        if index is None:
+            if 'semantic_index_missing_at' not in extensions:
+                log.warning("No semantic index in %s; run `python -m app.services.semantic_index`.", directory)
+            extensions['semantic_index_missing_at'] = time.monotonic()
+            return None
+        # Cleared first, so a change announced while catching up triggers another pass
+        extensions['semantic_index_behind'] = False
+        started = time.perf_counter()
+        changed = catch_up(index)
+        if changed:
+            log.info("Folded %d changed products into the semantic index in %.1fs",
+                     changed, time.perf_counter() - started)
+        extensions['semantic_index'] = index
+        if not any(cache is extensions for cache in _caches):
+            _caches.append(extensions)
+        catalog_events.subscribe(_on_catalog_change)
+    return index
+
+
+if __name__ == "__main__":
+    from app import create_app
+    with create_app().app_context():
+        started = time.perf_counter()
+        index = build_semantic_index()
+        print(f"Indexed {len(index)} products in {index.dims} dimensions in {time.perf_counter() - started:.1f}s "
+              f"({index_directory()}).")
@@ -0,0 +1,21 @@
+# app/services/serialization.py
+
+from app.models.product import PRODUCT_COLUMNS, PRODUCT_FIELDS
+
+def product_rows(query):
+    """
+    Runs a Product query for plain row tuples instead of ORM instances: no
+    identity map, instance state or attribute instrumentation per row. Rows
+    still expose the columns as attributes (row.id, row.price).
+    """
+    return query.with_entities(*PRODUCT_COLUMNS).all()
+
+def rows_to_dicts(rows):
+    """Product-shaped dicts (same keys as Product.to_dict) from product_rows()."""
+    return [dict(zip(PRODUCT_FIELDS, row)) for row in rows]
+
+def row_to_dict(row):
+    return dict(zip(PRODUCT_FIELDS, row))
+
+def products_to_dicts(products):
+    return [product.to_dict() for product in products]
@@ -0,0 +1,144 @@
+# app/services/taxonomy.py
+
+import re
+import threading
+from flask import current_app
+from sqlalchemy import func, or_
+from app import db
+from app.models.product import Product
+from app.services import catalog_events
+
+CATEGORY_SEPARATOR = '|'
+
+def slugify(segment):
+    """'Computers&Accessories' -> 'computers-and-accessories'"""
+    segment = segment.strip().lower().replace('&', '-and-')
+    return re.sub(r'[^a-z0-9]+', '-', segment).strip('-')
+
+
+class CategoryNode:
+    """One level of a pipe-delimited category path such as 'Electronics|Headphones'."""
+
+    def __init__(self, node_id, name, parent=None):
+        self.id = node_id        # normalized id, e.g. 'electronics/headphones'
+        self.name = name         # display name, e.g. 'Headphones'
+        self.paths = set()       # raw prefixes of Product.category spelling this node, e.g.
+                                 # 'Electronics|Headphones' and 'Electronics | Headphones'
+        self.parent = parent
+        self.count = 0           # products in this node or below
+        self.children = {}
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'count': self.count,
+            'children': [child.to_dict() for child in sorted(self.children.values(), key=lambda n: n.name)]
+        }
+
+
+class CategoryTaxonomy:
+    """Category tree with per-node product counts, built from one GROUP BY query."""
+
+    def __init__(self, category_counts):
+        self.roots = {}
+        self.nodes = {}
+        self._by_slug = {}       # slug of the node's own name -> [nodes]
+        self.total_products = 0
+        for category, count in category_counts:
+            self._add_path(category, count)
+
+    def _add_path(self, category, count):
+        self.total_products += count
+        if not category:
+            return
+        siblings, parent = self.roots, None
+        segments = category.split(CATEGORY_SEPARATOR)
+        for depth, segment in enumerate(segments):
+            name = segment.strip()
+            slug = slugify(name)
+            if not slug:
+                continue
+            node = siblings.get(slug)
+            if node is None:
+                node_id = f'{parent.id}/{slug}' if parent else slug
+                node = siblings[slug] = self.nodes[node_id] = CategoryNode(node_id, name, parent)
+                self._by_slug.setdefault(slug, []).append(node)
+            node.paths.add(CATEGORY_SEPARATOR.join(segments[:depth + 1]))
+            node.count += count
+            siblings, parent = node.children, node
+
+    def path_nodes(self, category):
+        """The nodes along a stored category path, root first ([] for an empty path)."""
+        nodes, siblings = [], self.roots
+        for segment in (category or '').split(CATEGORY_SEPARATOR):
+            node = siblings.get(slugify(segment.strip()))
+            if node is None:
+                continue
+            nodes.append(node)
+            siblings = node.children
+        return nodes
+
+    def to_list(self):
+        return [node.to_dict() for node in sorted(self.roots.values(), key=lambda n: n.name)]
+
+    def names(self):
+        """Every distinct category name at any depth, sorted."""
+        return sorted({node.name for node in self.nodes.values()})
+
+    def resolve(self, value):
+        """
+        Maps a category id or a free-text category name to the matching nodes:
+        exact id first, then nodes named exactly `value`, then nodes whose name
+        contains it. Returns [] when nothing matches.
+        """
+        value = (value or '').strip()
+        if value in self.nodes:
+            return [self.nodes[value]]
+        slug = slugify(value)
+        if not slug:
+            return []
+        if slug in self._by_slug:
+            return list(self._by_slug[slug])
+        return [node for name_slug, nodes in self._by_slug.items() if slug in name_slug for node in nodes]
+
+
+_build_lock = threading.Lock()
+_caches = []    # extensions dicts of the apps holding a cached taxonomy
+
+def _invalidate(upserted, deleted_ids):
+    # Catalog writes change counts (and possibly the tree); rebuild lazily on next use.
+    for extensions in _caches:
+        extensions.pop('category_taxonomy', None)
+
+def get_taxonomy():
+    """Returns the cached category taxonomy for the current app, building it if needed."""
+    extensions = current_app.extensions
+    taxonomy = extensions.get('category_taxonomy')
+    if taxonomy is not None:
+        return taxonomy
+    with _build_lock:
+        taxonomy = extensions.get('category_taxonomy')
+        if taxonomy is None:
+            rows = db.session.query(Product.category, func.count(Product.id)).group_by(Product.category).all()
+            taxonomy = extensions['category_taxonomy'] = CategoryTaxonomy(rows)
+            if not any(cache is extensions for cache in _caches):
+                _caches.append(extensions)
+            catalog_events.subscribe(_invalidate)
+    return taxonomy
+
+def category_filter(value):
+    """
+    SQL filter for a category id or name. Matches are prefix tests on every stored
+    spelling of the path ('Electronics|Headphones' or 'Electronics|Headphones|...'),
+    which an index on Product.category can serve; unknown names fall back to a
+    substring match.
+    """
+    nodes = get_taxonomy().resolve(value)
+    if not nodes:
+        return Product.category.ilike(f'%{value}%')
+    clauses = []
+    for path in sorted({path for node in nodes for path in node.paths}):
+        clauses.append(Product.category == path)
+        clauses.append(Product.category.startswith(path + CATEGORY_SEPARATOR, autoescape=True))
+    return or_(*clauses)
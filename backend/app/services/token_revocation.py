@@ -0,0 +1,237 @@
+# app/services/token_revocation.py
+
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import delete, exc, insert, or_, select
+from app import db
+from app.models.revoked_token import RevokedToken
+
+# Incremental syncs re-read this many seconds before the previous sync, so a
+# revocation committed slightly out of order is still picked up.
+SYNC_OVERLAP = 5
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings: no false negatives, `error_rate` false positives."""
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationStore:
+    """
+    Revoked JWT ids, kept until the token's own expiry. Each worker holds a
+    bloom filter of the revoked ids, refreshed from the backend at most every
+    `sync_interval` seconds, so checking a token that was never revoked
+    (almost every request) needs no I/O. A filter hit is confirmed against the
+    backend. A logout on another worker is seen after at most one sync interval.
+    """
+
+    def __init__(self, sync_interval=5, purge_interval=3600, bloom_capacity=100000, bloom_error_rate=0.001):
+        self.sync_interval = sync_interval
+        self.purge_interval = purge_interval
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self._bloom = BloomFilter(bloom_capacity, bloom_error_rate)
+        self._lock = threading.Lock()
+        self._synced_at = None      # monotonic time of the last sync; None forces a full reload
+        self._sync_since = None     # epoch seconds the next incremental sync reads from
+        self._purged_at = time.monotonic()
+        self.counters = {"checks": 0, "bloom_negatives": 0, "lookups": 0, "false_positives": 0, "syncs": 0, "purged": 0}
+
+    def _count(self, name, amount=1):
+        self.counters[name] += amount # CPython's GIL keeps this close enough for metrics
+
+    # Backend interface
+    def _store(self, jti, token_type, expires_at):
+        raise NotImplementedError
+
+    def _lookup(self, jti):
+        raise NotImplementedError
+
+    def _fetch_since(self, since):
+        """jtis revoked at or after `since` (epoch seconds), or every unexpired one for None."""
+        raise NotImplementedError
+
+    def _purge(self):
+        """Deletes expired revocations and returns how many were removed."""
+        raise NotImplementedError
+
+    def revoke(self, jti, token_type, expires_at=None):
+        """Revokes a token until `expires_at` (the token's `exp`, epoch seconds; None = forever)."""
+        self._store(jti, token_type, expires_at)
+        with self._lock:
+            self._bloom.add(jti)
+
+    def is_revoked(self, jti):
+        self._count("checks")
+        self._maybe_sync()
+        if jti not in self._bloom:
+            self._count("bloom_negatives")
+            return False
+        self._count("lookups")
+        revoked = self._lookup(jti)
+        if not revoked:
+            self._count("false_positives")
+        return revoked
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if self._synced_at is not None and now - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if self._synced_at is not None and now - self._synced_at < self.sync_interval:
+                return
+            started = time.time()
+            full = self._synced_at is None
+            if now - self._purged_at >= self.purge_interval:
+                self._count("purged", self._purge())
+                self._purged_at = now
+                full = True # bloom filters can't forget; rebuild without the purged ids
+            if full:
+                jtis = self._fetch_since(None)
+                bloom = BloomFilter(max(self.bloom_capacity, 2 * len(jtis)), self.bloom_error_rate)
+            else:
+                jtis = self._fetch_since(self._sync_since)
+                bloom = self._bloom
+            for jti in jtis:
+                bloom.add(jti)
+            self._bloom = bloom
+            self._count("syncs")
+            self._sync_since = started - SYNC_OVERLAP
+            # Over capacity the false-positive rate climbs; the next sync rebuilds a bigger filter
+            self._synced_at = None if bloom.count > bloom.capacity else now
+
+    def stats(self):
+        return dict(self.counters, backend=type(self).__name__, bloom_entries=self._bloom.count,
+                    bloom_capacity=self._bloom.capacity)
+
+
+def _as_datetime(epoch):
+    return datetime.utcfromtimestamp(epoch) if epoch is not None else None
+
+class SqlRevocationStore(RevocationStore):
+    """Revocations in the `revoked_token` table of the app database (SQLite, Postgres, MySQL)."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._table_ready = False
+
+    def _connect(self):
+        # Own short transactions on the engine, independent of the request's db.session
+        if not self._table_ready:
+            RevokedToken.__table__.create(db.engine, checkfirst=True)
+            self._table_ready = True
+        return db.engine.begin()
+
+    def _store(self, jti, token_type, expires_at):
+        try:
+            with self._connect() as connection:
+                connection.execute(insert(RevokedToken.__table__).values(
+                    jti=jti, token_type=token_type, revoked_at=datetime.utcnow(), expires_at=_as_datetime(expires_at)
+                ))
+        except exc.IntegrityError:
+            pass # already revoked
+
+    def _lookup(self, jti):
+        table = RevokedToken.__table__
+        with self._connect() as connection:
+            return connection.execute(
+                select(table.c.id).where(table.c.jti == jti, self._unexpired(table))
+            ).first() is not None
+
+    @staticmethod
+    def _unexpired(table):
+        return or_(table.c.expires_at.is_(None), table.c.expires_at > datetime.utcnow())
+
+    def _fetch_since(self, since):
+        table = RevokedToken.__table__
+        statement = select(table.c.jti).where(self._unexpired(table))
+        if since is not None:
+            statement = statement.where(table.c.revoked_at >= _as_datetime(since))
+        with self._connect() as connection:
+            return connection.execute(statement).scalars().all()
+
+    def _purge(self):
+        table = RevokedToken.__table__
+        with self._connect() as connection:
+            return connection.execute(delete(table).where(table.c.expires_at < datetime.utcnow())).rowcount
+
+
+class RedisRevocationStore(RevocationStore):
+    """
+    Revocations in Redis, shared by every worker. Two sorted sets: one scored by
+    expiry (lookups, full reloads, purging) and one by revocation time
+    (incremental syncs, trimmed to the last purge interval).
+    """
+
+    def __init__(self, url, prefix='jwt:revoked:', **kwargs):
+        super().__init__(**kwargs)
+        import redis  # optional dependency, only needed for this backend
+        self._client = redis.Redis.from_url(url)
+        self._by_expiry = f'{prefix}expiry'
+        self._by_revoked_at = f'{prefix}recent'
+
+    def _store(self, jti, token_type, expires_at):
+        pipeline = self._client.pipeline()
+        pipeline.zadd(self._by_expiry, {jti: expires_at if expires_at is not None else float('inf')})
+        pipeline.zadd(self._by_revoked_at, {jti: time.time()})
+        pipeline.execute()
+
+    def _lookup(self, jti):
+        expires_at = self._client.zscore(self._by_expiry, jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def _fetch_since(self, since):
+        if since is None:
+            members = self._client.zrangebyscore(self._by_expiry, f'({time.time()}', '+inf')
+        else:
+            members = self._client.zrangebyscore(self._by_revoked_at, since, '+inf')
+        return [member.decode() for member in members]
+
+    def _purge(self):
+        now = time.time()
+        pipeline = self._client.pipeline()
+        pipeline.zremrangebyscore(self._by_expiry, '-inf', now)
+        pipeline.zremrangebyscore(self._by_revoked_at, '-inf', now - max(self.purge_interval, self.sync_interval * 10))
+        return pipeline.execute()[0]
+
+
+def create_revocation_store(config):
+    """Builds the store selected by JWT_REVOCATION_BACKEND ('sql' or 'redis')."""
+    backend = config.get('JWT_REVOCATION_BACKEND', 'sql')
+    options = {
+        "sync_interval": config.get('JWT_REVOCATION_SYNC_INTERVAL', 5),
+        "purge_interval": config.get('JWT_REVOCATION_PURGE_INTERVAL', 3600),
+        "bloom_capacity": config.get('JWT_REVOCATION_BLOOM_CAPACITY', 100000),
+        "bloom_error_rate": config.get('JWT_REVOCATION_BLOOM_ERROR_RATE', 0.001),
+    }
+    if backend == 'redis':
+        return RedisRevocationStore(config.get('JWT_REVOCATION_REDIS_URL', 'redis://localhost:6379/0'), **options)
+    if backend == 'sql':
+        return SqlRevocationStore(**options)
+    raise ValueError(f"Unknown JWT_REVOCATION_BACKEND: {backend}")
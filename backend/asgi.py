@@ -0,0 +1,76 @@
+"""
+ASGI entry point. Serves the same Flask app (blueprints, JWT auth and all)
+from an ASGI server's event loop:
+
+    uvicorn asgi:app --host 127.0.0.1 --port 5000 --workers 4
+
+Connections, slow clients and request bodies are handled on the event loop;
+each request's view runs in its own thread through asgiref's public
+WsgiToAsgi adapter, at most ASGI_THREADS (default 15) at a time. Keep it at
+or below the database pool size (pool_size + max_overflow) so threads never
+queue for a connection.
+"""
+
+import asyncio
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from app import create_app
+
+
+async def _read_request(receive):
+    """Receives the whole request body, so a slow upload never holds a request slot."""
+    messages = []
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request" or not message.get("more_body"):
+            return messages
+
+
+class AsgiApp:
+    """ASGI adapter for the Flask app with lifespan support."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.max_requests = flask_app.config.get('ASGI_THREADS', 15)
+        self._slots = None  # created on the server's event loop
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _http(self, scope, receive, send):
+        messages = await _read_request(receive)
+
+        async def replay():
+            return messages.pop(0) if messages else await receive()
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_requests)
+        async with self._slots:
+            # WsgiToAsgi runs the app thread-sensitively, which would put every request on
+            # one shared thread; a context of its own gives each request its own thread
+            async with ThreadSensitiveContext():
+                await self.wsgi(scope, replay, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.get_running_loop().run_in_executor(None, self._shutdown)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _shutdown(self):
+        self.flask_app.password_hasher.shutdown()
+
+
+flask_app = create_app()
+app = AsgiApp(flask_app)
@@ -0,0 +1,162 @@
+"""
+Replays chatbot transcripts one /chatbot/converse call at a time versus in
+/chatbot/converse/batch requests.
+
+Starts the app on a synthetic catalog (like benchmarks/suite.py) with
+CHATBOT_BATCH_REPLAY on, logs in `--users` benchmark users and builds a
+reproducible transcript per user: searches drawn from a small phrase pool (so
+users repeat each other's searches, as real transcripts do), follow-ups on
+the results and cart commands. Each transcript starts by clearing the cart, so
+both modes answer from the same state; the report counts later replies that differ.
+From the backend directory:
+
+    python -m benchmarks.batch_replay --size 200000 [--skip-seed] [--users 50] [--messages 40] [--output replay.json]
+"""
+
+import argparse
+import http.client
+import json
+import random
+import subprocess
+import sys
+import time
+from benchmarks.load_compare import _call, _wait_for_port
+from benchmarks.suite import SEARCH_PHRASES, SERVERS, login_users
+from benchmarks.synthetic_catalog import seed_catalog, use_database
+
+FOLLOW_UPS = [
+    "tell me about the 2nd one",
+    "add the first one to cart",
+    "similar to the 3rd one",
+    "show my cart",
+]
+
+def build_transcripts(user_ids, messages, phrases, seed):
+    """{user_id: [message, ...]}; about half the messages are searches over `phrases`."""
+    rng = random.Random(seed)
+    transcripts = {}
+    for user_id in user_ids:
+        transcript = ["clear cart"]
+        while len(transcript) < messages:
+            phrase = rng.choice(phrases)
+            transcript.append(rng.choice([f"show me {phrase}", f"find {phrase} under 5000"]))
+            transcript.append(rng.choice(FOLLOW_UPS))
+        transcripts[user_id] = transcript[:messages]
+    return transcripts
+
+def replay_sequential(host, port, tokens, transcripts):
+    """Every message as its own /converse request; returns (seconds, {user_id: [reply text, ...]})."""
+    replies = {}
+    connection = http.client.HTTPConnection(host, port, timeout=120)
+    started = time.perf_counter()
+    try:
+        for user_id, transcript in transcripts.items():
+            replies[user_id] = []
+            for message in transcript:
+                status, data = _call(connection, "POST", "/chatbot/converse", {"message": message}, tokens[user_id])
+                if status != 200:
+                    raise RuntimeError(f"/chatbot/converse: HTTP {status} {data[:200]}")
+                replies[user_id].append(json.loads(data)["response"])
+    finally:
+        connection.close()
+    return time.perf_counter() - started, replies
+
+def replay_batched(host, port, token, transcripts, batch_size):
+    """Whole conversations in /converse/batch replay requests of up to `batch_size` messages."""
+    batches, batch, size = [], [], 0
+    for user_id, transcript in transcripts.items():
+        if batch and size + len(transcript) > batch_size:
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append({"user_id": user_id, "messages": transcript})
+        size += len(transcript)
+    batches.append(batch)
+
+    replies = {}
+    connection = http.client.HTTPConnection(host, port, timeout=600)
+    started = time.perf_counter()
+    try:
+        for batch in batches:
+            status, data = _call(connection, "POST", "/chatbot/converse/batch", {"conversations": batch}, token)
+            if status != 200:
+                raise RuntimeError(f"/chatbot/converse/batch: HTTP {status} {data[:200]}")
+            for conversation in json.loads(data)["conversations"]:
+                replies[conversation["user_id"]] = [reply["response"] for reply in conversation["replies"]]
+    finally:
+        connection.close()
+    return time.perf_counter() - started, replies
+
+def _user_id(connection, token):
+    status, data = _call(connection, "GET", "/auth/protected", token=token)
+    if status != 200:
+        raise RuntimeError(f"/auth/protected: HTTP {status}")
+    return json.loads(data)["user_id"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=200_000, help="synthetic catalog size (products)")
+    parser.add_argument("--database", default="sqlite:////tmp/sales_chatbot_bench.db")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the catalog already in --database")
+    parser.add_argument("--server", choices=sorted(SERVERS), default="sync")
+    parser.add_argument("--port", type=int, default=5058)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=40, help="messages per user transcript")
+    parser.add_argument("--phrases", type=int, default=30, help="distinct search phrases the transcripts draw from")
+    parser.add_argument("--batch-size", type=int, default=5000, help="messages per batch request (CHATBOT_BATCH_MAX_MESSAGES)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="JSON report path ('-' for stdout)")
+    args = parser.parse_args()
+
+    host, port = "127.0.0.1", args.port
+    if not args.skip_seed:
+        use_database(args.database)
+        from app import create_app
+        with create_app().app_context():
+            seed_catalog(args.size)
+    code = ("from config import Config\n"
+            f"Config.CHATBOT_BATCH_REPLAY = True\nConfig.CHATBOT_BATCH_MAX_MESSAGES = {args.batch_size}\n"
+            + SERVERS[args.server].format(database=args.database, port=port, keep_cache=False))
+    server = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        _wait_for_port(port)
+        tokens = login_users(host, port, args.users)
+        connection = http.client.HTTPConnection(host, port, timeout=60)
+        try:
+            tokens = {_user_id(connection, token): token for token in tokens}
+        finally:
+            connection.close()
+        phrases = random.Random(args.seed).sample(SEARCH_PHRASES, min(args.phrases, len(SEARCH_PHRASES)))
+        transcripts = build_transcripts(sorted(tokens), args.messages, phrases, args.seed)
+
+        # Warm the search indexes and caches so neither mode pays for building them
+        replay_sequential(host, port, tokens, dict(list(transcripts.items())[:1]))
+        sequential_seconds, sequential = replay_sequential(host, port, tokens, transcripts)
+        batched_seconds, batched = replay_batched(host, port, next(iter(tokens.values())), transcripts, args.batch_size)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    total = sum(len(transcript) for transcript in transcripts.values())
+    mismatches = sum(a != b for user_id in transcripts for a, b in zip(sequential[user_id][1:], batched[user_id][1:]))
+    report = {
+        "meta": {"database": args.database, "server": args.server, "users": args.users,
+                 "messages_per_user": args.messages, "phrases": len(phrases), "batch_size": args.batch_size},
+        "messages": total,
+        "sequential_seconds": round(sequential_seconds, 2),
+        "batched_seconds": round(batched_seconds, 2),
+        "sequential_messages_per_second": round(total / sequential_seconds, 1),
+        "batched_messages_per_second": round(total / batched_seconds, 1),
+        "mismatched_replies": mismatches,
+    }
+    print(f"{total} messages: {report['sequential_seconds']} s one by one, {report['batched_seconds']} s batched "
+          f"({mismatches} differing replies)", file=sys.stderr)
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Micro-benchmark for the chatbot intent router. Also checks that every sample
+message gets its expected intent (exits non-zero otherwise).
+
+Run from the backend directory:
+    python -m benchmarks.bench_intents [--repeat N]
+"""
+
+import argparse
+import sys
+import timeit
+from app.services.intents import classify
+
+# message -> the intent it must classify as; a mismatch fails the run
+SAMPLE_MESSAGES = {
+    "hello": "greeting",
+    "thanks!": "gratitude",
+    "show me usb cables": "search",
+    "find earphones over 1000": "search",
+    "search for tvs between 20000 and 50000": "search",
+    "show me products in category electronics under 5000": "search",
+    "find mobiles by brand samsung": "search",
+    "add the 2nd one to cart": "add_to_cart",
+    "add apple macbook pro to cart": "add_to_cart",
+    "what's in my cart?": "view_cart",
+    "show my cart": "view_cart",
+    "remove earphones from cart": "remove_from_cart",
+    "tell me more about the third one": "product_details",
+    "specs of iphone 13": "product_details",
+    "similar to the 2nd one": "similar_products",
+    "what goes with the first one": "bought_together",
+    "list categories": "list_categories",
+    "checkout": "checkout",
+    "something the bot does not understand at all": "unrecognized",
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20000, help="classifications per message")
+    args = parser.parse_args()
+
+    print(f"{'message':<55} {'intent':<18} {'us/msg':>8}")
+    total = 0.0
+    wrong = []
+    for message, expected in SAMPLE_MESSAGES.items():
+        intent, _ = classify(message)
+        if intent != expected:
+            wrong.append(f"{message!r}: {intent}, expected {expected}")
+        seconds = timeit.timeit(lambda: classify(message), number=args.repeat)
+        per_message_us = seconds / args.repeat * 1e6
+        total += per_message_us
+        print(f"{message[:55]:<55} {intent:<18} {per_message_us:8.2f}")
+    print(f"{'mean':<74} {total / len(SAMPLE_MESSAGES):8.2f}")
+    if wrong:
+        sys.exit("Misclassified:\n  " + "\n  ".join(wrong))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Product-name resolution: the old ILIKE substring lookup versus the fuzzy name index.
+
+Samples product names from the catalog and asks both for each one as a shopper
+might type it: the full name, its first three words, and its first three words
+with one letter dropped (a typo). A lookup counts as resolved when the product
+it returns has every one of those words (without the typo) in its name; partial
+names often fit several products. Run from the backend directory:
+
+    python -m benchmarks.bench_name_resolution [--database sqlite:////tmp/sales_chatbot_bench.db] [--samples 200]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from benchmarks.synthetic_catalog import use_database
+
+def _typo(text, rng):
+    """Drops one letter from the longest word."""
+    words = text.split()
+    longest = max(range(len(words)), key=lambda i: len(words[i]))
+    word = words[longest]
+    if len(word) > 3:
+        position = rng.randrange(1, len(word) - 1)
+        words[longest] = word[:position] + word[position + 1:]
+    return " ".join(words)
+
+def queries_for(name, rng):
+    leading = " ".join(name.lower().split()[:3])
+    return {"full": name.lower(), "leading words": leading, "leading words, typo": _typo(leading, rng)}
+
+def _timed(lookup, query):
+    started = time.perf_counter()
+    product_id = lookup(query)
+    return time.perf_counter() - started, product_id
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database", help="SQLAlchemy URI (default: the one in config.py)")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    use_database(args.database)
+    from app import create_app, db
+    from app.models.product import Product
+    from app.services.name_index import get_name_index, normalize_name, resolve_product_name
+
+    with create_app().app_context():
+        started = time.perf_counter()
+        get_name_index().match("warm up")
+        print(f"name index built in {time.perf_counter() - started:.2f} s")
+
+        rng = random.Random(args.seed)
+        names = dict(db.session.query(Product.id, Product.name))
+        sample = rng.sample(sorted(names), min(args.samples, len(names)))
+
+        def ilike(query):
+            row = db.session.query(Product.id).filter(Product.name.ilike(f'%{query}%')).first()
+            return row[0] if row else None
+
+        def index(query):
+            match = resolve_product_name(query)
+            return match[0] if match else None
+
+        print(f"{'query':<22} {'lookup':<8} {'resolved':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for kind in ("full", "leading words", "leading words, typo"):
+            for label, lookup in (("ilike", ilike), ("index", index)):
+                timings, resolved = [], 0
+                for product_id in sample:
+                    queries = queries_for(names[product_id], rng)
+                    seconds, found = _timed(lookup, queries[kind])
+                    timings.append(seconds * 1000)
+                    meant = queries["leading words"] if kind == "leading words, typo" else queries[kind]
+                    resolved += found is not None and \
+                        set(normalize_name(meant).split()) <= set(normalize_name(names[found]).split())
+                timings.sort()
+                print(f"{kind:<22} {label:<8} {resolved / len(sample):>8.0%} "
+                      f"{statistics.median(timings):>8.3f} {timings[int(len(timings) * 0.95) - 1]:>8.3f}")
+
+if __name__ == "__main__":
+    main()
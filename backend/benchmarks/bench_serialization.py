@@ -0,0 +1,70 @@
+"""
+Compares the old and new product serialization paths.
+
+old: ORM instances, to_dict() walking __table__.columns, Flask's stdlib JSON provider
+new: plain Core rows zipped with precomputed field names, orjson provider
+
+Run from the backend directory against a seeded database:
+    python -m benchmarks.bench_serialization [--repeat N]
+"""
+
+import argparse
+import timeit
+from flask.json.provider import DefaultJSONProvider
+from app import create_app
+from app.json_provider import OrjsonProvider, orjson
+from app.models.product import Product
+from app.routes.chatbot import _extract_search_params, _iter_product_search
+from app.services.fulltext import get_search_backend
+from app.services.serialization import product_rows, rows_to_dicts
+
+def legacy_to_dict(product):
+    """Product.to_dict() as it was before the precomputed accessors."""
+    return {col.name: getattr(product, col.name) for col in product.__table__.columns}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="responses built per case")
+    args = parser.parse_args()
+
+    if orjson is None:
+        raise SystemExit("orjson is not installed; nothing to compare.")
+
+    app = create_app()
+    stdlib_json = DefaultJSONProvider(app)
+    fast_json = OrjsonProvider(app)
+
+    with app.test_request_context():
+        def products_old(per_page):
+            products = Product.query.order_by(Product.id).limit(per_page).all()
+            return stdlib_json.response({"products": [legacy_to_dict(p) for p in products], "per_page": per_page})
+
+        def products_new(per_page):
+            rows = product_rows(Product.query.order_by(Product.id).limit(per_page))
+            return fast_json.response({"products": rows_to_dicts(rows), "per_page": per_page})
+
+        search_params = _extract_search_params("show me usb cables")
+        def chatbot_old():
+            # The chatbot search as it was: full ORM instances
+            products = get_search_backend("memory").search(Product.query, ["usb", "cables"])
+            return stdlib_json.response({"response": "Here are some products:", "products": [legacy_to_dict(p) for p in products]})
+
+        def chatbot_new():
+            products = list(_iter_product_search(search_params))
+            return fast_json.response({"response": "Here are some products:", "products": rows_to_dicts(products)})
+
+        cases = [
+            ("/products/ per_page=20", lambda: products_old(20), lambda: products_new(20)),
+            ("/products/ per_page=100", lambda: products_old(100), lambda: products_new(100)),
+            ("/chatbot/converse search (20 products)", chatbot_old, chatbot_new),
+        ]
+
+        print(f"{'response':<42} {'old ms':>8} {'new ms':>8} {'speedup':>8}")
+        for label, old, new in cases:
+            assert old().get_json() == new().get_json(), label # same payload either way
+            old_ms = timeit.timeit(old, number=args.repeat) / args.repeat * 1e3
+            new_ms = timeit.timeit(new, number=args.repeat) / args.repeat * 1e3
+            print(f"{label:<42} {old_ms:8.3f} {new_ms:8.3f} {old_ms / new_ms:7.2f}x")
+
+if __name__ == "__main__":
+    main()
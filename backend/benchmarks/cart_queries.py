@@ -0,0 +1,61 @@
+"""
+Query-count harness for the cart read paths.
+
+Creates a throwaway user with a few cart items against the configured
+database, then asserts that each cart-reading request costs exactly one
+SQL round trip. Run from the backend directory:
+    python -m benchmarks.cart_queries
+"""
+
+import uuid
+from app import create_app, db
+from app.models.product import Product
+from app.services.query_counter import count_queries
+
+EXPECTED_STATEMENTS = {
+    "GET /api/cart": 1,
+    "POST /chatbot/converse 'view cart'": 1,
+}
+
+def main():
+    app = create_app()
+    client = app.test_client()
+    suffix = uuid.uuid4().hex[:8]
+    credentials = {"username": f"bench_{suffix}", "email": f"bench_{suffix}@example.com", "password": "bench-password"}
+
+    with app.app_context():
+        db.create_all()
+        product_ids = [pid for (pid,) in db.session.query(Product.id).limit(3)]
+    if not product_ids:
+        raise SystemExit("No products found; run seed_data.py first.")
+
+    client.post('/auth/register', json=credentials)
+    token = client.post('/auth/login', json=credentials).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    for product_id in product_ids:
+        client.post('/api/cart/add', json={"product_id": product_id, "quantity": 2}, headers=headers)
+
+    requests = {
+        "GET /api/cart": lambda: client.get('/api/cart', headers=headers),
+        "POST /chatbot/converse 'view cart'": lambda: client.post(
+            '/chatbot/converse', json={"message": "view cart"}, headers=headers),
+    }
+
+    failures = 0
+    with app.app_context():
+        for label, send in requests.items():
+            with count_queries() as statements:
+                response = send()
+            expected = EXPECTED_STATEMENTS[label]
+            status = "ok" if len(statements) == expected and response.status_code == 200 else "FAIL"
+            failures += status == "FAIL"
+            print(f"{status:<5} {label:<40} {len(statements)} statement(s), expected {expected}")
+            if status == "FAIL":
+                for statement in statements:
+                    print("      ", " ".join(statement.split())[:160])
+
+    client.delete('/api/cart/clear', headers=headers)
+    raise SystemExit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Checks that /products/ range filters and sorts are served by indexes.
+
+Runs each case through the real view (response cache off) on a large
+synthetic catalog, captures the page query it issues and prints the
+database's plan for it. Exits non-zero when a case isn't driven by the
+expected index or needs a sort step it shouldn't. SQLite and PostgreSQL.
+From the backend directory:
+
+    python -m benchmarks.explain_filters [--size 200000] [--database sqlite:////tmp/sales_chatbot_bench.db]
+"""
+
+import argparse
+import sys
+from sqlalchemy import event
+from benchmarks.synthetic_catalog import seed_catalog, use_database
+
+# (query string, index expected to drive the page query, ORDER BY served by that index)
+CASES = [
+    ("min_price=1000&max_price=1500&sort=price", "ix_product_price_id", True),
+    ("min_rating=4.8&sort=-rating", "ix_product_rating_id", True),
+    ("min_discount_percentage=65&sort=-discount_percentage", "ix_product_discount_percentage_id", True),
+    # A rare range under the default id order: drive from it and sort the few matches
+    ("min_rating_count=20000&min_rating=3", "ix_product_rating_count_id", False),
+    ("min_price=100&max_price=100000&min_rating=4.9&sort=rating", "ix_product_rating_id", True),
+    ("category=SmartWatches&min_price=20000&sort=price", "ix_product_price_id", True),
+    ("category=Mice&min_rating=4.5&sort=-rating", "ix_product_rating_id", True),
+    ("max_price=75&sort=-rating_count", "ix_product_price_id", False),
+]
+
+
+def _page_query(client, engine, query_string):
+    """Issues GET /products/?<query_string>&count=none and returns its page SELECT with parameters."""
+    captured = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "LIMIT" in statement.upper():
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        response = client.get(f"/products/?{query_string}&count=none&per_page=20")
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+    if response.status_code != 200:
+        raise RuntimeError(f"{query_string}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+    return captured[-1]
+
+def _plan(connection, statement, parameters):
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        return [row[-1] for row in rows]
+    return [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()]
+
+def check(plan, index, ordered):
+    """(ok, reason) for a plan that should use `index` and, if `ordered`, skip the sort step."""
+    text = "\n".join(plan)
+    if index not in text:
+        return False, f"does not use {index}"
+    if ordered and ("TEMP B-TREE FOR ORDER BY" in text or "Sort Key" in text):
+        return False, "needs a separate sort step"
+    return True, "ok"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=200_000, help="seed this many products if the catalog is smaller")
+    parser.add_argument("--database", default="sqlite:////tmp/sales_chatbot_bench.db")
+    args = parser.parse_args()
+
+    use_database(args.database)
+    from app import create_app, db
+    from app.models.product import Product
+    app = create_app()
+    app.response_cache = None
+    failures = 0
+    with app.app_context():
+        if (db.session.query(db.func.count(Product.id)).scalar() or 0) < args.size:
+            print(f"Seeding {args.size} synthetic products...")
+            seed_catalog(args.size)
+        client = app.test_client()
+        for query_string, index, ordered in CASES:
+            statement, parameters = _page_query(client, db.engine, query_string)
+            with db.engine.connect() as connection:
+                plan = _plan(connection, statement, parameters)
+            ok, reason = check(plan, index, ordered)
+            failures += not ok
+            print(f"[{'PASS' if ok else 'FAIL'}] {query_string}: {reason}")
+            for line in plan:
+                print(f"         {line}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
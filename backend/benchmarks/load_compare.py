@@ -0,0 +1,138 @@
+"""
+Load-test comparison of the sync (threaded WSGI) and ASGI deployments.
+
+Starts each server in turn against the configured database, then runs
+--concurrency keep-alive clients for --duration seconds with a mix of
+catalog listings, cart reads and chatbot messages. The response cache is
+disabled in both servers (unless --keep-cache) so every request reaches the
+views. Needs uvicorn for the ASGI run. From the backend directory:
+
+    python -m benchmarks.load_compare [--concurrency 200] [--duration 15]
+"""
+
+import argparse
+import http.client
+import json
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+SERVERS = {
+    "sync": (
+        "from app import create_app\n"
+        "app = create_app()\n"
+        "app.response_cache = app.response_cache if {keep_cache} else None\n"
+        "app.run(host='127.0.0.1', port={port}, threaded=True)\n"
+    ),
+    "asgi": (
+        "import uvicorn\n"
+        "from asgi import app, flask_app\n"
+        "flask_app.response_cache = flask_app.response_cache if {keep_cache} else None\n"
+        "uvicorn.run(app, host='127.0.0.1', port={port}, log_level='warning', backlog=4096)\n"
+    ),
+}
+
+CHATBOT_MESSAGES = ["show me usb cables", "find earphones under 1000", "list categories", "view cart",
+                    "search for smart watches between 2000 and 5000"]
+USER = {"username": "loadtest", "email": "loadtest@example.com", "password": "loadtest-password"}
+
+def _wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+def _call(connection, method, path, body=None, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = connection.getresponse()
+    data = response.read()
+    return response.status, data
+
+def _login(port):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    _call(connection, "POST", "/auth/register", USER)
+    status, data = _call(connection, "POST", "/auth/login", {"email": USER["email"], "password": USER["password"]})
+    if status != 200:
+        raise RuntimeError(f"login failed: {status} {data[:200]}")
+    return json.loads(data)["access_token"]
+
+def _next_request(rng, token):
+    roll = rng.random()
+    if roll < 0.6:
+        sort = rng.choice(["id", "-price", "rating"])
+        return "products", "GET", f"/products/?per_page=20&page={rng.randint(1, 50)}&sort={sort}", None
+    if roll < 0.8:
+        return "cart", "GET", "/api/cart", None
+    return "chatbot", "POST", "/chatbot/converse", {"message": rng.choice(CHATBOT_MESSAGES)}
+
+def _client(port, token, stop_at, results, seed):
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    while time.monotonic() < stop_at:
+        group, method, path, body = _next_request(rng, token)
+        started = time.perf_counter()
+        try:
+            status, _ = _call(connection, method, path, body, token)
+        except (OSError, http.client.HTTPException):
+            status = None
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        results.append((group, status, time.perf_counter() - started))
+    connection.close()
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))] * 1000 if values else float("nan")
+
+def run(mode, port, concurrency, duration, keep_cache):
+    code = SERVERS[mode].format(port=port, keep_cache=keep_cache)
+    server = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_for_port(port)
+        token = _login(port)
+        results = []
+        stop_at = time.monotonic() + duration
+        clients = [threading.Thread(target=_client, args=(port, token, stop_at, results, i), daemon=True)
+                   for i in range(concurrency)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+def report(mode, results, duration):
+    for group in ("products", "cart", "chatbot", "all"):
+        rows = [r for r in results if group == "all" or r[0] == group]
+        latencies = sorted(r[2] for r in rows if r[1] == 200)
+        errors = sum(1 for r in rows if r[1] != 200)
+        print(f"{mode:<5} {group:<9} {len(rows):>8} {errors:>7} {len(latencies) / duration:>9.1f} "
+              f"{_percentile(latencies, 0.50):>8.1f} {_percentile(latencies, 0.95):>8.1f} {_percentile(latencies, 0.99):>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--modes", default="sync,asgi")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--keep-cache", action="store_true", help="leave the catalog response cache on")
+    args = parser.parse_args()
+
+    print(f"{'mode':<5} {'endpoint':<9} {'requests':>8} {'errors':>7} {'ok req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for mode in args.modes.split(","):
+        results = run(mode, args.port, args.concurrency, args.duration, args.keep_cache)
+        report(mode, results, args.duration)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Time to first byte of /chatbot/converse versus /chatbot/converse/stream.
+
+Starts the app on a synthetic catalog (like benchmarks/suite.py), logs in a
+benchmark user and sends the same chatbot messages to both endpoints in
+turn, one at a time. For each request it records when the first body byte
+arrived, when the first product card arrived (the `product` event for the
+stream; the whole body for the JSON endpoint) and when the response was
+complete. Prints p50/p95 per endpoint and writes them as JSON. From the
+backend directory:
+
+    python -m benchmarks.stream_ttfb --size 200000 [--skip-seed] [--rounds 20] [--output ttfb.json]
+"""
+
+import argparse
+import http.client
+import json
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+from benchmarks.load_compare import _wait_for_port
+from benchmarks.suite import SERVERS, _percentile_ms, login_users
+from benchmarks.synthetic_catalog import seed_catalog, use_database
+
+MESSAGES = [
+    "show me wireless earbuds",
+    "find smart watch under 5000",
+    "show me products in category Routers",
+    "search for gaming mouse by brand logitech",
+    "cheap earbuds for running",
+    "show me fast charger over 500",
+]
+ENDPOINTS = ("/chatbot/converse", "/chatbot/converse/stream")
+
+
+def _timed_request(connection, path, token, message):
+    """(first byte, first product, complete) seconds for one chatbot request; None when no product was sent."""
+    body = json.dumps({"message": message})
+    started = time.perf_counter()
+    connection.request("POST", path, body=body, headers={"Content-Type": "application/json",
+                                                         "Authorization": f"Bearer {token}"})
+    response = connection.getresponse()
+    if response.status != 200:
+        raise RuntimeError(f"{path}: HTTP {response.status} {response.read()[:200]!r}")
+    if not path.endswith("/stream"):
+        data = response.read()
+        first_byte = complete = time.perf_counter() - started
+        return first_byte, complete if json.loads(data)["products"] else None, complete
+
+    first_byte = first_product = None
+    while True:
+        line = response.readline()
+        if not line:
+            break
+        now = time.perf_counter() - started
+        if first_byte is None:
+            first_byte = now
+        if first_product is None and line.startswith(b"event: product"):
+            first_product = now
+    return first_byte, first_product, time.perf_counter() - started
+
+def measure(host, port, token, messages, rounds):
+    """{endpoint: {"first_byte": [...], "first_product": [...], "complete": [...]}} in seconds."""
+    timings = {path: {"first_byte": [], "first_product": [], "complete": []} for path in ENDPOINTS}
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        for _ in range(rounds):
+            for message in messages:
+                for path in ENDPOINTS:
+                    for key, value in zip(("first_byte", "first_product", "complete"),
+                                          _timed_request(connection, path, token, message)):
+                        if value is not None:
+                            timings[path][key].append(value)
+    finally:
+        connection.close()
+    return timings
+
+def summarize(timings):
+    return {
+        path: {
+            f"{key}_{label}_ms": _percentile_ms(sorted(values), fraction)
+            for key, values in series.items()
+            for label, fraction in (("p50", 0.50), ("p95", 0.95))
+        }
+        for path, series in timings.items()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=200_000, help="synthetic catalog size (products)")
+    parser.add_argument("--database", default="sqlite:////tmp/sales_chatbot_bench.db")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the catalog already in --database")
+    parser.add_argument("--url", help="measure an already running instance instead of starting one")
+    parser.add_argument("--server", choices=sorted(SERVERS), default="sync")
+    parser.add_argument("--port", type=int, default=5057)
+    parser.add_argument("--rounds", type=int, default=20, help="times each message is sent to each endpoint")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured rounds first (index builds, caches)")
+    parser.add_argument("--output", default="-", help="JSON report path ('-' for stdout)")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = "127.0.0.1", args.port
+        if not args.skip_seed:
+            use_database(args.database)
+            from app import create_app
+            with create_app().app_context():
+                seed_catalog(args.size)
+        code = SERVERS[args.server].format(database=args.database, port=port, keep_cache=False)
+        server = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        if server is not None:
+            _wait_for_port(port)
+        token = login_users(host, port, 1)[0]
+        measure(host, port, token, MESSAGES, args.warmup)
+        report = summarize(measure(host, port, token, MESSAGES, args.rounds))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(f"{'endpoint':<26} {'first byte p50/p95':>20} {'first product p50/p95':>23} {'complete p50/p95':>18}",
+          file=sys.stderr)
+    for path, stats in report.items():
+        cells = [f"{stats[f'{key}_p50_ms']}/{stats[f'{key}_p95_ms']}" for key in ("first_byte", "first_product", "complete")]
+        print(f"{path:<26} {cells[0]:>20} {cells[1]:>23} {cells[2]:>18}", file=sys.stderr)
+    report = {"meta": {"target": args.url or f"{args.server} server on {args.database}", "rounds": args.rounds,
+                       "messages": MESSAGES}, "endpoints": report}
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Reproducible end-to-end benchmark of the backend.
+
+Seeds a synthetic catalog (benchmarks/synthetic_catalog.py) into a separate
+database, starts the app against it, registers --users users and logs them in
+through /auth, then replays a weighted mix of catalog browsing, chatbot
+conversations and cart mutations from --concurrency keep-alive clients.
+Reports requests, errors, throughput and p50/p95/p99 latency per scenario as
+JSON, so runs can be diffed or tracked over time. From the backend directory:
+
+    python -m benchmarks.suite --size 100000 --duration 30 --output results.json
+
+Use --url to replay against an already running instance (no seeding), and
+--skip-seed to reuse a catalog seeded by an earlier run.
+"""
+
+import argparse
+import http.client
+import json
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+from benchmarks.load_compare import _call, _wait_for_port
+from benchmarks.synthetic_catalog import CATEGORIES, NOUNS, seed_catalog, use_database
+
+SERVERS = {
+    "sync": (
+        "from benchmarks.synthetic_catalog import use_database\n"
+        "use_database({database!r})\n"
+        "from app import create_app\n"
+        "app = create_app()\n"
+        "app.response_cache = app.response_cache if {keep_cache} else None\n"
+        "app.run(host='127.0.0.1', port={port}, threaded=True)\n"
+    ),
+    "asgi": (
+        "from benchmarks.synthetic_catalog import use_database\n"
+        "use_database({database!r})\n"
+        "import uvicorn\n"
+        "from asgi import app, flask_app\n"
+        "flask_app.response_cache = flask_app.response_cache if {keep_cache} else None\n"
+        "uvicorn.run(app, host='127.0.0.1', port={port}, log_level='warning', backlog=4096)\n"
+    ),
+}
+
+SEARCH_PHRASES = sorted({noun.lower() for nouns in NOUNS.values() for noun in nouns})
+CATEGORY_NAMES = sorted({category.rsplit("|", 1)[-1] for category in CATEGORIES})
+
+# scenario -> weight; the share of requests each scenario gets
+DEFAULT_MIX = {
+    "products.browse": 25,
+    "products.filtered": 15,
+    "products.detail": 10,
+    "chatbot.search": 12,
+    "chatbot.details": 6,
+    "chatbot.add_to_cart": 4,
+    "cart.view": 12,
+    "cart.add": 8,
+    "cart.update": 4,
+    "cart.remove": 4,
+}
+
+
+class Client:
+    """One simulated shopper: a keep-alive connection, a JWT and the ids of its own cart items."""
+
+    def __init__(self, host, port, token, catalog_size, seed):
+        self.host, self.port = host, port
+        self.token = token
+        self.catalog_size = catalog_size
+        self.rng = random.Random(seed)
+        self.cart_item_ids = []
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+
+    def request(self, method, path, body=None):
+        try:
+            status, data = _call(self.connection, method, path, body, self.token)
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            return None, b""
+        return status, data
+
+    def _product_id(self):
+        return self.rng.randint(1, self.catalog_size)
+
+    def run(self, scenario):
+        """Runs one scenario; returns the HTTP status (None on a connection error)."""
+        rng = self.rng
+        if scenario == "products.browse":
+            sort = rng.choice(["id", "price", "-price", "rating", "-rating_count"])
+            return self.request("GET", f"/products/?per_page=20&page={rng.randint(1, 25)}&sort={sort}")[0]
+        if scenario == "products.filtered":
+            params = f"name={quote(rng.choice(SEARCH_PHRASES))}&per_page=20&count=cached"
+            if rng.random() < 0.5:
+                params += f"&category={quote(rng.choice(CATEGORY_NAMES))}"
+            if rng.random() < 0.5:
+                params += f"&sort={rng.choice(['price', '-rating'])}"
+            return self.request("GET", f"/products/?{params}")[0]
+        if scenario == "products.detail":
+            return self.request("GET", f"/products/{self._product_id()}")[0]
+        if scenario == "chatbot.search":
+            message = f"show me {rng.choice(SEARCH_PHRASES)} under {rng.choice([500, 1000, 5000, 20000])}"
+            return self.request("POST", "/chatbot/converse", {"message": message})[0]
+        if scenario == "chatbot.details":
+            return self.request("POST", "/chatbot/converse",
+                                {"message": f"tell me more about the {rng.choice(['1st', '2nd', '3rd'])} one"})[0]
+        if scenario == "chatbot.add_to_cart":
+            return self.request("POST", "/chatbot/converse", {"message": "add the 1st one to cart"})[0]
+        if scenario == "cart.view":
+            return self.request("GET", "/api/cart")[0]
+        if scenario == "cart.add":
+            status, data = self.request("POST", "/api/cart/add", {"product_id": self._product_id(), "quantity": 1})
+            if status == 200:
+                self.cart_item_ids.append(json.loads(data)["cart_item"]["id"])
+            return status
+        if scenario == "cart.update":
+            if not self.cart_item_ids:
+                return self.run("cart.add")
+            item_id = rng.choice(self.cart_item_ids)
+            return self.request("PUT", f"/api/cart/update/{item_id}", {"quantity": rng.randint(1, 5)})[0]
+        if scenario == "cart.remove":
+            if not self.cart_item_ids:
+                return self.run("cart.add")
+            item_id = self.cart_item_ids.pop(rng.randrange(len(self.cart_item_ids)))
+            return self.request("DELETE", f"/api/cart/remove/{item_id}")[0]
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+    def close(self):
+        self.connection.close()
+
+
+def login_users(host, port, count):
+    """Registers (if needed) and logs in `count` benchmark users; returns their access tokens."""
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    tokens = []
+    try:
+        for number in range(count):
+            user = {"username": f"bench{number}", "email": f"bench{number}@example.com", "password": "bench-password"}
+            _call(connection, "POST", "/auth/register", user)
+            status, data = _call(connection, "POST", "/auth/login", {"email": user["email"], "password": user["password"]})
+            if status != 200:
+                raise RuntimeError(f"login failed for {user['email']}: {status} {data[:200]}")
+            tokens.append(json.loads(data)["access_token"])
+    finally:
+        connection.close()
+    return tokens
+
+def catalog_size(host, port):
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        status, data = _call(connection, "GET", "/products/?per_page=1")
+    finally:
+        connection.close()
+    if status != 200:
+        raise RuntimeError(f"could not read the catalog: {status}")
+    return json.loads(data)["total_products"]
+
+def replay(host, port, tokens, size, mix, concurrency, duration, warmup, seed):
+    """Runs the mix for warmup + duration seconds; returns (scenario, status, seconds) for the measured part."""
+    scenarios, weights = list(mix), list(mix.values())
+    results = []
+    measure_from = time.monotonic() + warmup
+    stop_at = measure_from + duration
+
+    def _worker(number):
+        client = Client(host, port, tokens[number % len(tokens)], size, seed * 10_000 + number)
+        local = []
+        try:
+            while True:
+                scenario = client.rng.choices(scenarios, weights)[0]
+                started = time.monotonic()
+                if started >= stop_at:
+                    break
+                status = client.run(scenario)
+                if started >= measure_from:
+                    local.append((scenario, status, time.monotonic() - started))
+        finally:
+            client.close()
+            results.extend(local) # list.extend is atomic under the GIL
+
+    workers = [threading.Thread(target=_worker, args=(number,), daemon=True) for number in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+def _percentile_ms(values, fraction):
+    return round(values[min(len(values) - 1, int(fraction * len(values)))] * 1000, 2) if values else None
+
+def summarize(results, duration):
+    def _stats(rows):
+        latencies = sorted(seconds for _, status, seconds in rows if status is not None and status < 400)
+        return {
+            "requests": len(rows),
+            "errors": len(rows) - len(latencies),
+            "throughput_rps": round(len(latencies) / duration, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+            "p50_ms": _percentile_ms(latencies, 0.50),
+            "p95_ms": _percentile_ms(latencies, 0.95),
+            "p99_ms": _percentile_ms(latencies, 0.99),
+        }
+    by_scenario = {}
+    for row in results:
+        by_scenario.setdefault(row[0], []).append(row)
+    return {scenario: _stats(rows) for scenario, rows in sorted(by_scenario.items())}, _stats(results)
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _print_table(report, stream=sys.stderr):
+    print(f"{'scenario':<22} {'requests':>8} {'errors':>7} {'ok req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}", file=stream)
+    for name, stats in list(report["scenarios"].items()) + [("all", report["total"])]:
+        cells = [stats[key] if stats[key] is not None else float("nan") for key in ("p50_ms", "p95_ms", "p99_ms")]
+        print(f"{name:<22} {stats['requests']:>8} {stats['errors']:>7} {stats['throughput_rps']:>9.1f} "
+              f"{cells[0]:>8.1f} {cells[1]:>8.1f} {cells[2]:>8.1f}", file=stream)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=10_000, help="synthetic catalog size (products)")
+    parser.add_argument("--database", default="sqlite:////tmp/sales_chatbot_bench.db",
+                        help="SQLAlchemy URI of the benchmark database (replaced when seeding)")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the catalog already in --database")
+    parser.add_argument("--url", help="benchmark an already running instance instead of starting one")
+    parser.add_argument("--server", choices=sorted(SERVERS), default="sync")
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--no-cache", action="store_true", help="disable the catalog response cache")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5, help="seconds replayed before measuring")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", help='JSON object overriding scenario weights, e.g. \'{"cart.add": 0}\'')
+    parser.add_argument("--output", default="-", help="JSON report path ('-' for stdout)")
+    args = parser.parse_args()
+
+    mix = dict(DEFAULT_MIX, **json.loads(args.mix)) if args.mix else dict(DEFAULT_MIX)
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        parser.error(f"unknown scenarios in --mix: {', '.join(sorted(unknown))}")
+    mix = {scenario: weight for scenario, weight in mix.items() if weight > 0}
+
+    seed_seconds = None
+    server = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = "127.0.0.1", args.port
+        if not args.skip_seed:
+            use_database(args.database)
+            from app import create_app
+            with create_app().app_context():
+                seed_seconds = round(seed_catalog(args.size, seed=args.seed), 2)
+        code = SERVERS[args.server].format(database=args.database, port=port, keep_cache=not args.no_cache)
+        server = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        if server is not None:
+            _wait_for_port(port)
+        size = catalog_size(host, port)
+        tokens = login_users(host, port, args.users)
+        results = replay(host, port, tokens, size, mix, args.concurrency, args.duration, args.warmup, args.seed)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    scenarios, total = summarize(results, args.duration)
+    report = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "target": args.url or f"{args.server} server on {args.database}",
+            "catalog_size": size,
+            "seed_seconds": seed_seconds,
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "seed": args.seed,
+            "response_cache": not args.no_cache,
+            "mix": mix,
+        },
+        "scenarios": scenarios,
+        "total": total,
+    }
+    _print_table(report)
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Seeds a synthetic product catalog of any size for benchmarking.
+
+Products get realistic names, pipe-delimited category paths, prices,
+discounts and ratings drawn from a seeded RNG, so the same --size and --seed
+always produce the same catalog. Rows go through Product's table in chunks
+(Core executemany, like seed_data.py) to keep 1M-row catalogs practical.
+Replaces every table in the configured database. From the backend directory:
+
+    python -m benchmarks.synthetic_catalog --size 100000 [--database sqlite:////tmp/bench.db]
+"""
+
+import argparse
+import random
+import time
+from sqlalchemy import insert
+
+CATEGORIES = [
+    "Electronics|Mobiles&Accessories|Smartphones&BasicMobiles|Smartphones",
+    "Electronics|Mobiles&Accessories|MobileAccessories|Chargers|WallChargers",
+    "Electronics|Headphones,Earbuds&Accessories|Headphones|In-Ear",
+    "Electronics|HomeTheater,TV&Video|Televisions|SmartTelevisions",
+    "Electronics|WearableTechnology|SmartWatches",
+    "Computers&Accessories|Accessories&Peripherals|Cables&Accessories|Cables|USBCables",
+    "Computers&Accessories|Accessories&Peripherals|Keyboards,Mice&InputDevices|Mice",
+    "Computers&Accessories|NetworkingDevices|Routers",
+    "Computers&Accessories|ExternalDevices&DataStorage|PenDrives",
+    "Home&Kitchen|Kitchen&HomeAppliances|SmallKitchenAppliances|MixerGrinders",
+    "Home&Kitchen|Kitchen&HomeAppliances|Vacuum,Cleaning&Ironing|Irons,Steamers&Accessories|Irons|SteamIrons",
+    "Home&Kitchen|Heating,Cooling&AirQuality|WaterHeaters&Geysers|InstantWaterHeaters",
+    "OfficeProducts|OfficePaperProducts|Paper|Stationery|Pens,Pencils&WritingSupplies|Pens&Refills",
+    "Toys&Games|Arts&Crafts|Drawing&PaintingSupplies|ColouringPens&Markers",
+]
+BRANDS = ["boAt", "Samsung", "Apple", "Sony", "Mi", "OnePlus", "Philips", "Portronics", "Ambrane", "Zebronics",
+          "JBL", "Logitech", "HP", "TP-Link", "SanDisk", "Pigeon", "Bajaj", "Havells", "Classmate", "Noise"]
+NOUNS = {
+    "Smartphones": ["5G Smartphone", "Android Phone", "Mobile Phone"],
+    "WallChargers": ["Fast Charger", "USB-C Wall Adapter", "Dual Port Charger"],
+    "In-Ear": ["Wireless Earbuds", "Wired Earphones", "Bluetooth Neckband"],
+    "SmartTelevisions": ["4K Smart TV", "HD Ready LED TV", "QLED Google TV"],
+    "SmartWatches": ["Smart Watch", "Fitness Band", "AMOLED Smartwatch"],
+    "USBCables": ["USB Type-C Cable", "Lightning Cable", "Micro USB Cable"],
+    "Mice": ["Wireless Mouse", "Gaming Mouse", "Ergonomic Mouse"],
+    "Routers": ["WiFi Router", "Mesh WiFi System", "Dual Band Router"],
+    "PenDrives": ["Pen Drive", "USB 3.0 Flash Drive", "OTG Pen Drive"],
+    "MixerGrinders": ["Mixer Grinder", "Juicer Mixer Grinder", "Hand Blender"],
+    "SteamIrons": ["Steam Iron", "Dry Iron", "Garment Steamer"],
+    "InstantWaterHeaters": ["Instant Geyser", "Water Heater", "Storage Geyser"],
+    "Pens&Refills": ["Gel Pen Set", "Ball Pen Pack", "Fountain Pen"],
+    "ColouringPens&Markers": ["Sketch Pens", "Permanent Markers", "Brush Pens"],
+}
+ADJECTIVES = ["Pro", "Lite", "Max", "Plus", "Neo", "Ultra", "Mini", "Prime", "Air", "Nova"]
+PRICE_RANGES = {"Smartphones": (6999, 79999), "SmartTelevisions": (9999, 99999), "SmartWatches": (999, 29999),
+                "Routers": (799, 12999), "MixerGrinders": (1499, 8999), "InstantWaterHeaters": (2499, 12999)}
+DEFAULT_PRICE_RANGE = (99, 4999)
+
+
+def generate_products(size, seed=0, start=0):
+    """Yields `size` synthetic product rows (dicts keyed by Product column) starting at number `start`."""
+    rng = random.Random(seed * 1_000_003 + start)
+    for number in range(start, start + size):
+        category = rng.choice(CATEGORIES)
+        leaf = category.rsplit("|", 1)[-1]
+        brand = rng.choice(BRANDS)
+        name = f"{brand} {rng.choice(ADJECTIVES)} {rng.randint(1, 999)} {rng.choice(NOUNS[leaf])}"
+        low, high = PRICE_RANGES.get(leaf, DEFAULT_PRICE_RANGE)
+        original_price = float(round(rng.uniform(low, high)))
+        discount = float(rng.choice((0, 5, 10, 15, 20, 25, 30, 40, 50, 60, 70)))
+        yield {
+            "name": name,
+            "category": category,
+            "description": f"{name} by {brand}. {leaf.replace('&', ' and ')} with {rng.choice(ADJECTIVES).lower()} "
+                           f"build quality, {rng.randint(1, 3)} year warranty.",
+            "price": float(round(original_price * (100 - discount) / 100)),
+            "original_price": original_price,
+            "discount_percentage": discount,
+            "rating": round(rng.triangular(2.5, 5.0, 4.2), 1),
+            "rating_count": int(rng.paretovariate(1.2) * 20),
+            "image_url": f"https://example.com/images/{number}.jpg",
+            "product_url": f"https://example.com/products/{number}",
+        }
+
+def seed_catalog(size, seed=0, chunksize=5000):
+    """Drops and recreates every table, then inserts `size` synthetic products. Needs an app context."""
+    from app import db
+    from app.models.product import Product
+    from app.services import catalog_events
+    from app.services.fulltext import ensure_search_schema
+    from app.services.schema import analyze_tables, ensure_indexes
+
+    db.drop_all()
+    db.create_all()
+    ensure_indexes()
+    started = time.perf_counter()
+    for start in range(0, size, chunksize):
+        rows = list(generate_products(min(chunksize, size - start), seed=seed, start=start))
+        with db.engine.begin() as connection:
+            connection.execute(insert(Product.__table__), rows)
+    ensure_search_schema() # (re)builds the full-text index over the new rows
+    analyze_tables()
+    catalog_events.notify()
+    return time.perf_counter() - started
+
+def use_database(uri):
+    """Points create_app() at `uri` instead of config.py's database."""
+    if uri:
+        from config import Config
+        Config.SQLALCHEMY_DATABASE_URI = uri
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunksize", type=int, default=5000)
+    parser.add_argument("--database", help="SQLAlchemy URI (default: the one in config.py)")
+    args = parser.parse_args()
+
+    use_database(args.database)
+    from app import create_app
+    with create_app().app_context():
+        elapsed = seed_catalog(args.size, seed=args.seed, chunksize=args.chunksize)
+    print(f"Seeded {args.size} products in {elapsed:.2f}s ({args.size / max(elapsed, 1e-9):,.0f} rows/sec).")
+
+if __name__ == "__main__":
+    main()
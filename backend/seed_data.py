@@ -1,38 +1,164 @@
+import argparse
+import csv
+import io
+import os
+import time
 import pandas as pd
+from sqlalchemy import bindparam, insert, select, update
 from app import create_app, db
-from app.models.product import Product  
-import os
+from app.models.product import Product
+from app.services import catalog_events
+from app.services.fulltext import ensure_search_schema
+from app.services.recommendations import refresh_recommendations
+from app.services.schema import analyze_tables, ensure_columns, ensure_indexes
+from app.services.semantic_index import build_semantic_index
+
+CSV_PATH = "cleaned_amazon_products.csv"
+CHUNK_SIZE = 5000
+
+# CSV column -> Product column
+COLUMN_MAP = {
+    "name": "name",
+    "category": "category",
+    "description": "description",
+    "discounted_price": "price",
+    "actual_price": "original_price",
+    "discount_percentage": "discount_percentage",
+    "rating": "rating",
+    "rating_count": "rating_count",
+    "image_url": "image_url",
+    "product_url": "product_url",
+}
+NUMERIC_COLUMNS = ["price", "original_price", "discount_percentage", "rating", "rating_count"]
+PRODUCT_COLUMNS = list(COLUMN_MAP.values())
+
+def _coerce_chunk(df):
+    """
+    Renames CSV columns to Product columns and coerces the numeric ones in bulk.
+    Raw dumps carry values like '₹1,099', '64%' or '24,269'; anything that still
+    isn't a number becomes NULL.
+    """
+    df = df.rename(columns=COLUMN_MAP)[PRODUCT_COLUMNS]
+    for col in NUMERIC_COLUMNS:
+        if df[col].dtype == object:
+            df[col] = df[col].astype(str).str.replace(r'[^0-9.\-]', '', regex=True)
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df["rating_count"] = df["rating_count"].round().astype("Int64")
+    # Later rows win when a dump repeats a product_url (rows without one are all kept)
+    df = df[df["product_url"].isna() | ~df.duplicated(subset="product_url", keep="last")]
+    return df.astype(object).where(df.notna(), None)
+
+def _insert_batch(connection, records):
+    """Plain executemany INSERT through SQLAlchemy Core (no ORM objects)."""
+    connection.execute(insert(Product.__table__), records)
+
+def _copy_batch(connection, df):
+    """Postgres fast path: stream the chunk through COPY ... FROM STDIN."""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, quoting=csv.QUOTE_MINIMAL)
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY product ({', '.join(PRODUCT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
 
-app = create_app()
+def _upsert_batch(connection, records):
+    """
+    Updates products whose product_url already exists and inserts the rest.
+    Rows without a product_url can't be matched on a later run, so they are
+    skipped rather than inserted again each time. Only one indexed lookup per
+    chunk, independent of the SQL dialect. Returns (inserted, updated, skipped).
+    """
+    table = Product.__table__
+    skipped = sum(1 for r in records if not r["product_url"])
+    records = [r for r in records if r["product_url"]]
+    urls = [r["product_url"] for r in records]
+    existing = dict(connection.execute(
+        select(table.c.product_url, table.c.id).where(table.c.product_url.in_(urls))
+    ).all()) if urls else {}
 
-def load_data():
-    csv_path = "cleaned_amazon_products.csv"  #
+    updates = [dict(r, _id=existing[r["product_url"]]) for r in records if r["product_url"] in existing]
+    inserts = [r for r in records if r["product_url"] not in existing]
+
+    if updates:
+        connection.execute(
+            update(table).where(table.c.id == bindparam("_id")).values(
+                {col: bindparam(col) for col in PRODUCT_COLUMNS}
+            ),
+            updates,
+        )
+    if inserts:
+        _insert_batch(connection, inserts)
+    return len(inserts), len(updates), skipped
+
+def load_data(csv_path=CSV_PATH, mode="replace", chunksize=CHUNK_SIZE, app=None):
+    """
+    Streams the catalog CSV into the product table in chunks.
+    mode='replace' drops and recreates every table (the original behaviour);
+    mode='upsert' keeps existing data and refreshes products keyed on product_url.
+    """
     if not os.path.exists(csv_path):
         print("CSV file not found.")
         return
 
-    df = pd.read_csv(csv_path)
-
+    app = app or create_app()
     with app.app_context():
-        db.drop_all()     
-        db.create_all()   
-
-        for _, row in df.iterrows():
-            product = Product(
-                name=row["name"],
-                category=row["category"],
-                description=row["description"],
-                price=row["discounted_price"],
-                original_price=row["actual_price"],
-                discount_percentage=row["discount_percentage"],
-                rating=row["rating"],
-                rating_count=row["rating_count"],
-                image_url=row["image_url"],
-                product_url=row["product_url"]
-            )
-            db.session.add(product)
-        db.session.commit()
-        print(f"Inserted {len(df)} products.")
+        if mode == "replace":
+            db.drop_all()
+        db.create_all()
+        ensure_columns() # create_all() doesn't add new columns or indexes to existing tables
+        ensure_indexes()
+
+        use_copy = mode == "replace" and db.engine.dialect.name == "postgresql"
+        started = time.perf_counter()
+        inserted = updated = skipped = 0
+
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=str, keep_default_na=False, na_values=[""]):
+            chunk_started = time.perf_counter()
+            df = _coerce_chunk(chunk)
+            with db.engine.begin() as connection:
+                if use_copy:
+                    _copy_batch(connection, df)
+                    inserted += len(df)
+                elif mode == "upsert":
+                    new_rows, changed_rows, skipped_rows = _upsert_batch(connection, df.to_dict("records"))
+                    inserted += new_rows
+                    updated += changed_rows
+                    skipped += skipped_rows
+                else:
+                    _insert_batch(connection, df.to_dict("records"))
+                    inserted += len(df)
+            elapsed = time.perf_counter() - chunk_started
+            print(f"  chunk of {len(df)} rows in {elapsed:.2f}s ({len(df) / max(elapsed, 1e-9):,.0f} rows/sec)")
+
+        ensure_search_schema() # drop_all() also dropped the full-text triggers/indexes
+        analyze_tables() # planner statistics for the range filters
+        elapsed = time.perf_counter() - started
+        # Built before announcing the load, so running servers load this build
+        # instead of folding every product into their old one
+        index = build_semantic_index()
+        index_elapsed = time.perf_counter() - started - elapsed
+        with db.engine.begin() as connection:
+            catalog_events.bump_version(connection) # running servers drop their caches on their next check
+        catalog_events.notify() # Core writes skip the ORM events
+        total = inserted + updated
+        print(f"Inserted {inserted} and updated {updated} products in {elapsed:.2f}s "
+              f"({total / max(elapsed, 1e-9):,.0f} rows/sec).")
+        if skipped:
+            print(f"Skipped {skipped} rows without a product_url (upsert mode matches on it).")
+        # Core writes don't drop stale recommendation lists; recompute all of them
+        counts = refresh_recommendations()
+        print(f"Stored similar products for {counts['similar']} products.")
+        print(f"Built the semantic index of {len(index)} products in {index_elapsed:.1f}s.")
 
 if __name__ == "__main__":
-    load_data()
+    parser = argparse.ArgumentParser(description="Load the product catalog from CSV.")
+    parser.add_argument("csv_path", nargs="?", default=CSV_PATH)
+    parser.add_argument("--mode", choices=["replace", "upsert"], default="replace",
+                        help="replace: drop and recreate all tables; upsert: refresh in place keyed on product_url")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    load_data(args.csv_path, mode=args.mode, chunksize=args.chunksize)
@@ -3,13 +3,35 @@ import React, { useState, useEffect } from "react";
 import { useProductStore } from "../stores/useProductStore";
 import { useAuthStore } from "../stores/useAuthStore";
 
+// Query parameters understood by GET /products/ (ranges are inclusive)
+export interface ProductFilters {
+  name?: string;
+  category?: string;
+  min_price?: number;
+  max_price?: number;
+  min_rating?: number;
+  min_discount_percentage?: number;
+  sort?: string;
+}
+
 interface FilterProps {
-  onApplyFilters: (params: {
-    name?: string;
-    category?: string;
-    min_price?: number;
-    max_price?: number;
-  }) => void;
+  onApplyFilters: (params: ProductFilters) => void;
+}
+
+const SORT_OPTIONS = [
+  { value: "", label: "Relevance / Newest" },
+  { value: "price", label: "Price: Low to High" },
+  { value: "-price", label: "Price: High to Low" },
+  { value: "-rating", label: "Top Rated" },
+  { value: "-rating_count", label: "Most Reviewed" },
+  { value: "-discount_percentage", label: "Biggest Discount" },
+];
+
+interface CategoryNode {
+  id: string;
+  name: string;
+  count: number;
+  children: CategoryNode[];
 }
 
 const Filter: React.FC<FilterProps> = ({ onApplyFilters }) => {
@@ -17,11 +39,16 @@ const Filter: React.FC<FilterProps> = ({ onApplyFilters }) => {
   const [selectedCategory, setSelectedCategory] = useState("");
   const [minPrice, setMinPrice] = useState<string>("");
   const [maxPrice, setMaxPrice] = useState<string>("");
+  const [minRating, setMinRating] = useState<string>("");
+  const [minDiscount, setMinDiscount] = useState<string>("");
+  const [sort, setSort] = useState<string>("");
 
   const productStore = useProductStore();
   const authStore = useAuthStore();
 
-  const [availableCategories, setAvailableCategories] = useState<string[]>([]);
+  const [availableCategories, setAvailableCategories] = useState<
+    { id: string; label: string }[]
+  >([]);
   const API_BASE_URL = "http://127.0.0.1:5000";
 
   useEffect(() => {
@@ -30,18 +57,22 @@ const Filter: React.FC<FilterProps> = ({ onApplyFilters }) => {
         return;
       }
       try {
-        const response = await fetch(`${API_BASE_URL}/products`); // Fetching products to get categories
+        // Category tree with per-node product counts; node ids are used as filter values
+        const response = await fetch(`${API_BASE_URL}/products/categories`);
         if (!response.ok) throw new Error("Failed to fetch categories");
-        const products = await response.json();
-        const uniqueCategories = new Set<string>();
-        products.forEach((p: any) => {
-          if (p.category) {
-            p.category
-              .split("|")
-              .forEach((cat: string) => uniqueCategories.add(cat.trim()));
-          }
-        });
-        setAvailableCategories(Array.from(uniqueCategories).sort());
+        const data = await response.json();
+        const options: { id: string; label: string }[] = [];
+        const walk = (nodes: CategoryNode[], depth: number) => {
+          nodes.forEach((node) => {
+            options.push({
+              id: node.id,
+              label: `${"\u00A0\u00A0".repeat(depth)}${node.name} (${node.count})`,
+            });
+            walk(node.children, depth + 1);
+          });
+        };
+        walk(data.categories || [], 0);
+        setAvailableCategories(options);
       } catch (err) {
         console.error("Failed to load categories:", err);
       }
@@ -50,18 +81,16 @@ const Filter: React.FC<FilterProps> = ({ onApplyFilters }) => {
   }, [authStore.isAuthenticated, authStore.isLoading]); // Rerun when auth status changes
 
   const handleApplyFilters = () => {
-    const filters: {
-      name?: string;
-      category?: string;
-      min_price?: number;
-      max_price?: number;
-    } = {};
+    const filters: ProductFilters = {};
     if (searchTerm) filters.name = searchTerm;
     if (selectedCategory) filters.category = selectedCategory;
     if (minPrice && !isNaN(parseFloat(minPrice)))
       filters.min_price = parseFloat(minPrice);
     if (maxPrice && !isNaN(parseFloat(maxPrice)))
       filters.max_price = parseFloat(maxPrice);
+    if (minRating) filters.min_rating = parseFloat(minRating);
+    if (minDiscount) filters.min_discount_percentage = parseFloat(minDiscount);
+    if (sort) filters.sort = sort;
     onApplyFilters(filters);
   };
 
@@ -70,6 +99,9 @@ const Filter: React.FC<FilterProps> = ({ onApplyFilters }) => {
     setSelectedCategory("");
     setMinPrice("");
     setMaxPrice("");
+    setMinRating("");
+    setMinDiscount("");
+    setSort("");
     onApplyFilters({}); // Apply empty filters to clear results
   };
 
@@ -111,8 +143,8 @@ const Filter: React.FC<FilterProps> = ({ onApplyFilters }) => {
           >
             <option value="">All Categories</option>
             {availableCategories.map((cat) => (
-              <option key={cat} value={cat}>
-                {cat}
+              <option key={cat.id} value={cat.id}>
+                {cat.label}
               </option>
             ))}
           </select>
@@ -151,6 +183,71 @@ const Filter: React.FC<FilterProps> = ({ onApplyFilters }) => {
             className="w-full px-3 py-2 border border-gray-300 rounded-md focus:ring-blue-500 focus:border-blue-500"
           />
         </div>
+
+        <div>
+          <label
+            htmlFor="min-rating"
+            className="block text-sm font-medium text-gray-700 mb-1"
+          >
+            Minimum Rating
+          </label>
+          <select
+            id="min-rating"
+            value={minRating}
+            onChange={(e) => setMinRating(e.target.value)}
+            className="w-full px-3 py-2 border border-gray-300 rounded-md focus:ring-blue-500 focus:border-blue-500 bg-white"
+          >
+            <option value="">Any</option>
+            {["4.5", "4", "3.5", "3"].map((rating) => (
+              <option key={rating} value={rating}>
+                {rating}★ & up
+              </option>
+            ))}
+          </select>
+        </div>
+
+        <div>
+          <label
+            htmlFor="min-discount"
+            className="block text-sm font-medium text-gray-700 mb-1"
+          >
+            Minimum Discount
+          </label>
+          <select
+            id="min-discount"
+            value={minDiscount}
+            onChange={(e) => setMinDiscount(e.target.value)}
+            className="w-full px-3 py-2 border border-gray-300 rounded-md focus:ring-blue-500 focus:border-blue-500 bg-white"
+          >
+            <option value="">Any</option>
+            {["10", "25", "50", "70"].map((discount) => (
+              <option key={discount} value={discount}>
+                {discount}% off or more
+              </option>
+            ))}
+          </select>
+        </div>
+
+        <div>
+          <label
+            htmlFor="sort"
+            className="block text-sm font-medium text-gray-700 mb-1"
+          >
+            Sort By
+          </label>
+          <select
+            id="sort"
+            value={sort}
+            onChange={(e) => setSort(e.target.value)}
+            className="w-full px-3 py-2 border border-gray-300 rounded-md focus:ring-blue-500 focus:border-blue-500 bg-white"
+          >
+            {SORT_OPTIONS.map((option) => (
+              <option key={option.value} value={option.value}>
+                {option.label}
+              </option>
+            ))}
+          </select>
+        </div>
       </div>
 
       <div className="mt-6 flex space-x-3">
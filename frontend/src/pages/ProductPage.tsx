@@ -1,7 +1,7 @@
 // src/pages/ProductsPage.tsx
-import React, { useEffect, useState, useMemo } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import Header from "../components/Header";
-import Filter from "../components/Filter";
+import Filter, { type ProductFilters } from "../components/Filter";
 import ProductCard from "../components/Product";
 import { useProductStore } from "../stores/useProductStore";
 import { useAuthStore } from "../stores/useAuthStore";
@@ -13,62 +13,55 @@ const ProductsPage: React.FC = () => {
     isLoading,
     error,
     fetchProducts,
+    fetchMoreProducts,
     totalProducts,
-    currentPage,
+    hasMore,
+    isLoadingMore,
     productsPerPage,
     setCurrentPage,
     setProductsPerPage,
   } = useProductStore();
+  const loadMoreRef = useRef<HTMLDivElement | null>(null);
   const { isAuthenticated, isLoading: authLoading } = useAuthStore();
   const navigate = useNavigate();
   console.log(products);
 
-  // State to hold active filters (name and category for now)
-  const [appliedFilters, setAppliedFilters] = useState<{
-    name?: string;
-    category?: string;
-    min_price?: number;
-    max_price?: number;
-  }>({});
+  // Active filters, sent to the API as query parameters
+  const [appliedFilters, setAppliedFilters] = useState<ProductFilters>({});
 
-  // Effect to fetch products based on filters and pagination
+  // Effect to fetch the first page whenever filters or page size change
   useEffect(() => {
     if (!authLoading) {
-      // Fetch products with current filters, page, and per_page
       fetchProducts({
         ...appliedFilters,
-        page: currentPage,
+        page: 1,
         per_page: productsPerPage,
       });
     }
-  }, [
-    fetchProducts,
-    appliedFilters,
-    currentPage,
-    productsPerPage,
-    authLoading,
-  ]);
+  }, [fetchProducts, appliedFilters, productsPerPage, authLoading]);
+
+  // Infinite scroll: load the next page when the sentinel below the grid
+  // comes into view. Later pages continue from the API's next_cursor.
+  useEffect(() => {
+    const sentinel = loadMoreRef.current;
+    if (!sentinel || !hasMore) return;
+    const observer = new IntersectionObserver(
+      (entries) => {
+        if (entries[0].isIntersecting) {
+          fetchMoreProducts();
+        }
+      },
+      { rootMargin: "400px" }
+    );
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [fetchMoreProducts, hasMore, products.length]);
 
-  const handleApplyFilters = (filters: {
-    name?: string;
-    category?: string;
-    min_price?: number;
-    max_price?: number;
-  }) => {
+  const handleApplyFilters = (filters: ProductFilters) => {
     setAppliedFilters(filters);
     setCurrentPage(1); // Reset to first page when filters change
   };
 
-  const totalPages = useMemo(() => {
-    return Math.ceil(totalProducts / productsPerPage);
-  }, [totalProducts, productsPerPage]);
-
-  const handlePageChange = (page: number) => {
-    if (page >= 1 && page <= totalPages) {
-      setCurrentPage(page);
-    }
-  };
-
   const handleProductsPerPageChange = (
     e: React.ChangeEvent<HTMLSelectElement>
   ) => {
@@ -122,42 +115,37 @@ const ProductsPage: React.FC = () => {
               ))}
             </div>
 
-            {totalPages > 1 && (
-              <div className="flex justify-center items-center mt-8 space-x-4">
-                <button
-                  onClick={() => handlePageChange(currentPage - 1)}
-                  disabled={currentPage === 1 || isLoading}
-                  className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700 disabled:opacity-50 transition-colors"
-                >
-                  Previous
-                </button>
-
-                <span className="text-gray-700">
-                  Page {currentPage} of {totalPages} (Total {totalProducts}{" "}
-                  products)
-                </span>
+            <div
+              ref={loadMoreRef}
+              className="flex justify-center items-center mt-8 space-x-4"
+            >
+              <span className="text-gray-700">
+                Showing {products.length}
+                {totalProducts !== null && ` of ${totalProducts}`} products
+              </span>
 
+              {hasMore && (
                 <button
-                  onClick={() => handlePageChange(currentPage + 1)}
-                  disabled={currentPage === totalPages || isLoading}
+                  onClick={() => fetchMoreProducts()}
+                  disabled={isLoadingMore}
                   className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700 disabled:opacity-50 transition-colors"
                 >
-                  Next
+                  {isLoadingMore ? "Loading..." : "Load more"}
                 </button>
-
-                <select
-                  value={productsPerPage}
-                  onChange={handleProductsPerPageChange}
-                  className="ml-4 border border-gray-300 rounded-md py-2 px-3 bg-white"
-                  disabled={isLoading}
-                >
-                  <option value={6}>6 per page</option>
-                  <option value={12}>12 per page</option>
-                  <option value={24}>24 per page</option>
-                  <option value={48}>48 per page</option>
-                </select>
-              </div>
-            )}
+              )}
+
+              <select
+                value={productsPerPage}
+                onChange={handleProductsPerPageChange}
+                className="ml-4 border border-gray-300 rounded-md py-2 px-3 bg-white"
+                disabled={isLoading || isLoadingMore}
+              >
+                <option value={6}>6 per page</option>
+                <option value={12}>12 per page</option>
+                <option value={24}>24 per page</option>
+                <option value={48}>48 per page</option>
+              </select>
+            </div>
           </>
         )}
       </main>
@@ -1,5 +1,5 @@
 import { create } from "zustand";
-import axios from "axios";
+import { useAuthStore } from "./useAuthStore";
 
 interface ChatMessageProduct {
   id: number;
@@ -32,6 +32,57 @@ interface ChatbotActions {
 const API_BASE_URL = "http://127.0.0.1:5000";
 URL;
 
+interface StreamEvent {
+  event: string;
+  data: any;
+}
+
+// POSTs a message to the streaming endpoint; refreshes an expired token once
+// (fetch bypasses the axios interceptors in useAuthStore)
+const openStream = async (message: string, retried = false): Promise<Response> => {
+  const token = useAuthStore.getState().accessToken;
+  const response = await fetch(`${API_BASE_URL}/chatbot/converse/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify({ message }),
+  });
+  if (response.status === 401 && !retried) {
+    if (await useAuthStore.getState().refreshAccessToken()) {
+      return openStream(message, true);
+    }
+  }
+  if (!response.ok || !response.body) {
+    throw new Error(`Chatbot request failed (${response.status}).`);
+  }
+  return response;
+};
+
+// Parses Server-Sent Events ("event: x\ndata: {...}\n\n") as they arrive
+async function* readEvents(response: Response): AsyncGenerator<StreamEvent> {
+  const reader = response.body!.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += value;
+    let end;
+    while ((end = buffer.indexOf("\n\n")) !== -1) {
+      const block = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      let event = "message";
+      let data = "";
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      yield { event, data: data ? JSON.parse(data) : null };
+    }
+  }
+}
+
 export const useChatbotStore = create<ChatbotState & ChatbotActions>(
   (set, get) => ({
     // Initial State
@@ -57,25 +108,47 @@ export const useChatbotStore = create<ChatbotState & ChatbotActions>(
         error: null,
       }));
 
-      try {
-        const response = await axios.post(`${API_BASE_URL}/chatbot/converse`, {
-          message: userMessage,
-        });
-        const { response: chatbotText, products } = response.data;
-
-        const chatbotMessage: ChatMessage = {
-          id: Date.now().toString() + "-bot",
-          sender: "chatbot",
-          text: chatbotText,
-          products: products || [],
-          timestamp: new Date().toISOString(),
-        };
+      // The reply is streamed: its text and product cards fill in as they arrive
+      const botMessageId = Date.now().toString() + "-bot";
+      const updateBotMessage = (update: (message: ChatMessage) => ChatMessage) =>
+        set((state) => ({
+          messages: state.messages.map((message) =>
+            message.id === botMessageId ? update(message) : message
+          ),
+        }));
 
+      try {
+        const response = await openStream(userMessage);
         set((state) => ({
-          messages: [...state.messages, chatbotMessage],
-          isLoading: false,
-          isTyping: false,
+          messages: [
+            ...state.messages,
+            {
+              id: botMessageId,
+              sender: "chatbot",
+              text: "",
+              products: [],
+              timestamp: new Date().toISOString(),
+            },
+          ],
         }));
+
+        for await (const { event, data } of readEvents(response)) {
+          if (event === "text") {
+            set({ isTyping: false });
+            updateBotMessage((message) => ({ ...message, text: message.text + data.delta }));
+          } else if (event === "product") {
+            updateBotMessage((message) => ({
+              ...message,
+              products: [...(message.products || []), data],
+            }));
+          } else if (event === "error") {
+            throw new Error(data.message);
+          } else if (event === "done") {
+            break;
+          }
+        }
+
+        set({ isLoading: false, isTyping: false });
       } catch (err: any) {
         const errorMessage =
           err.response?.data?.response ||
@@ -89,7 +162,13 @@ export const useChatbotStore = create<ChatbotState & ChatbotActions>(
           timestamp: new Date().toISOString(),
         };
         set((state) => ({
-          messages: [...state.messages, errorMessageToUser],
+          messages: [
+            // Drop the streamed reply if nothing of it arrived
+            ...state.messages.filter(
+              (message) => message.id !== botMessageId || message.text
+            ),
+            errorMessageToUser,
+          ],
           isLoading: false,
           isTyping: false,
           error: errorMessage,
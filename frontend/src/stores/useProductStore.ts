@@ -17,20 +17,32 @@ interface Product {
 interface ProductState {
   products: Product[];
   selectedProduct: Product | null;
-  totalProducts: number;
+  totalProducts: number | null;
   currentPage: number;
+  nextCursor: string | null;
+  lastParams: FetchProductsParams;
+  hasMore: boolean;
+  isLoadingMore: boolean;
   productsPerPage: number;
   isLoading: boolean;
   error: string | null;
 }
 
+interface FetchProductsParams {
+  name?: string;
+  category?: string;
+  min_price?: number;
+  max_price?: number;
+  min_rating?: number;
+  min_discount_percentage?: number;
+  sort?: string;
+  page?: number;
+  per_page?: number;
+}
+
 interface ProductActions {
-  fetchProducts: (params?: {
-    name?: string;
-    category?: string;
-    page?: number;
-    per_page?: number;
-  }) => Promise<void>;
+  fetchProducts: (params?: FetchProductsParams) => Promise<void>;
+  fetchMoreProducts: () => Promise<void>;
   fetchSingleProduct: (productId: number) => Promise<void>;
   clearSelectedProduct: () => void;
   clearError: () => void;
@@ -40,6 +52,12 @@ interface ProductActions {
 
 const API_BASE_URL = "http://127.0.0.1:5000";
 
+// A cursor means there is a next page; relevance-ranked searches have no
+// cursor, so a full page is taken to mean there may be another one.
+const hasMorePages = (data: any): boolean =>
+  Boolean(data.next_cursor) ||
+  (data.products?.length ?? 0) === data.per_page;
+
 export const useProductStore = create<ProductState & ProductActions>(
   (set, get) => ({
     // Initial State
@@ -47,8 +65,12 @@ export const useProductStore = create<ProductState & ProductActions>(
     selectedProduct: null,
     totalProducts: 0,
     currentPage: 1,
+    nextCursor: null,
+    lastParams: {},
     productsPerPage: 12,
     isLoading: false,
+    hasMore: false,
+    isLoadingMore: false,
     error: null,
 
     // Actions
@@ -68,7 +90,8 @@ export const useProductStore = create<ProductState & ProductActions>(
         };
 
         const response = await axios.get(`${API_BASE_URL}/products/`, {
-          params: fetchParams,
+          // The total only drives the "N products" label, so a recent cached count is fine
+          params: { ...fetchParams, count: "cached" },
         });
 
         // Update state with paginated data and total count
@@ -76,6 +99,9 @@ export const useProductStore = create<ProductState & ProductActions>(
           products: response.data.products || [],
           totalProducts: response.data.total_products,
           currentPage: response.data.page,
+          nextCursor: response.data.next_cursor || null,
+          hasMore: hasMorePages(response.data),
+          lastParams: fetchParams,
           productsPerPage: response.data.per_page,
           isLoading: false,
           error: null,
@@ -90,6 +116,52 @@ export const useProductStore = create<ProductState & ProductActions>(
       }
     },
 
+    // Appends the next page for infinite scroll. Column sorts continue from
+    // next_cursor (keyset pagination); relevance-ranked searches have no
+    // cursor and fall back to the next page number.
+    fetchMoreProducts: async () => {
+      const state = get();
+      if (state.isLoading || state.isLoadingMore || !state.hasMore) {
+        return;
+      }
+      set({ isLoadingMore: true, error: null });
+      try {
+        const { page, ...baseParams } = state.lastParams;
+        const params = state.nextCursor
+          ? { ...baseParams, after: state.nextCursor, count: "none" }
+          : { ...baseParams, page: state.currentPage + 1, count: "cached" };
+
+        const response = await axios.get(`${API_BASE_URL}/products/`, {
+          params,
+        });
+
+        const seen = new Set(get().products.map((p) => p.id));
+        set({
+          products: [
+            ...get().products,
+            ...(response.data.products || []).filter(
+              (p: Product) => !seen.has(p.id)
+            ),
+          ],
+          // count=none returns null; keep the total from the first page
+          totalProducts: response.data.total_products ?? get().totalProducts,
+          currentPage: state.nextCursor
+            ? state.currentPage + 1
+            : response.data.page,
+          nextCursor: response.data.next_cursor || null,
+          hasMore: hasMorePages(response.data),
+          isLoadingMore: false,
+        });
+      } catch (err: any) {
+        const errorMessage =
+          err.response?.data?.message ||
+          err.message ||
+          "Failed to fetch more products.";
+        set({ isLoadingMore: false, error: errorMessage });
+        console.error("Fetch more products error:", errorMessage);
+      }
+    },
+
     fetchSingleProduct: async (productId: number) => {
       set({ isLoading: true, error: null });
       try {